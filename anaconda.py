@@ -452,8 +452,20 @@ if __name__ == "__main__":
     flags.selinux = opts.selinux
     flags.eject = opts.eject
     flags.kexec = opts.kexec
+    flags.pipelined_install = opts.pipelined_install
+    flags.pkgcache = opts.pkgcache
+    flags.pkgcache_size = opts.pkgcache_size
+    flags.live_rsync = opts.live_rsync
+    flags.liveimg_stream = opts.liveimg_stream
+    flags.initramfs_jobs = opts.initramfs_jobs
+    flags.sampler = opts.sampler
     flags.singlelang = opts.singlelang
 
+    # start sampling the resources as early as possible
+    if flags.sampler:
+        from pyanaconda.core.sampler import sampler
+        sampler.start(flags.sampler)
+
     # Switch to tty1 on exception in case something goes wrong during X start.
     # This way if, for example, metacity doesn't start, we switch back to a
     # text console with a traceback instead of being left looking at a blank
@@ -31,7 +31,7 @@ from argparse import ArgumentParser, ArgumentError, HelpFormatter, Namespace, Ac
 from pyanaconda.flags import BootArgs
 from pyanaconda.flags import flags as flags_instance
 
-from pyanaconda.core.constants import DisplayModes, X_TIMEOUT
+from pyanaconda.core.constants import DisplayModes, X_TIMEOUT, RESOURCE_SAMPLER_INTERVAL
 
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
@@ -437,6 +437,18 @@ def getArgumentParser(version_string, boot_cmdline=None):
                     help=help_parser.help_text("armplatform"))
     ap.add_argument("--multilib", dest="multiLib", action="store_true", default=False,
                     help=help_parser.help_text("multilib"))
+    ap.add_argument("--pipelined-install", dest="pipelined_install", action="store_true",
+                    default=False, help=help_parser.help_text("pipelined-install"))
+    ap.add_argument("--pkgcache", dest="pkgcache", default=None, metavar="CACHE_LOCATION",
+                    help=help_parser.help_text("pkgcache"))
+    ap.add_argument("--pkgcache-size", dest="pkgcache_size", default=None, metavar="SIZE",
+                    help=help_parser.help_text("pkgcache-size"))
+    ap.add_argument("--live-rsync", dest="live_rsync", action="store_true",
+                    default=False, help=help_parser.help_text("live-rsync"))
+    ap.add_argument("--liveimg-stream", dest="liveimg_stream", action="store_true",
+                    default=False, help=help_parser.help_text("liveimg-stream"))
+    ap.add_argument("--initramfs-jobs", dest="initramfs_jobs", type=int, default=None,
+                    metavar="JOBS", help=help_parser.help_text("initramfs-jobs"))
 
     ap.add_argument("-m", "--method", dest="method", default=None, metavar="METHOD",
                     help=help_parser.help_text("method"))
@@ -542,6 +554,10 @@ def getArgumentParser(version_string, boot_cmdline=None):
 
     ap.add_argument("--nosave", action=ParseNosave, nargs="?", help=help_parser.help_text("nosave"))
 
+    ap.add_argument("--sampler", dest="sampler", nargs="?", type=float, default=None,
+                    const=RESOURCE_SAMPLER_INTERVAL, metavar="INTERVAL",
+                    help=help_parser.help_text("sampler"))
+
     # Miscellaneous
     ap.add_argument("--nomount", dest="rescue_nomount", action="store_true", default=False,
                     help=help_parser.help_text("nomount"))
@@ -29,6 +29,7 @@ import crypt
 from ordered_set import OrderedSet
 
 from pyanaconda.core import util
+from pyanaconda.core.timeline import timeline
 from blivet.devicelibs import raid
 from blivet.formats.disklabel import DiskLabel
 from pyanaconda.product import productName
@@ -2463,7 +2464,8 @@ def writeBootLoaderFinal(storage, payload, instClass, ksdata):
     storage.bootloader.set_boot_args(storage=storage,
                                      payload=payload)
     try:
-        storage.bootloader.write()
+        with timeline.phase("Write boot loader", "bootloader"):
+            storage.bootloader.write()
     except BootLoaderError as e:
         log.error("bootloader.write failed: %s", e)
         if errorHandler.cb(e) == ERROR_RAISE:
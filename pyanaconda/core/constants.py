@@ -83,6 +83,8 @@ NETWORK_CONNECTED_CHECK_INTERVAL = 0.1  # in seconds
 
 # DBus
 DEFAULT_DBUS_TIMEOUT = -1       # use default
+KICKSTART_DISTRIBUTION_TIMEOUT = 60  # in seconds
+MODULES_STARTUP_TIMEOUT = 30  # in seconds
 
 # Thread names
 THREAD_EXECUTE_STORAGE = "AnaExecuteStorageThread"
@@ -90,12 +92,13 @@ THREAD_STORAGE = "AnaStorageThread"
 THREAD_STORAGE_WATCHER = "AnaStorageWatcher"
 THREAD_CHECK_STORAGE = "AnaCheckStorageThread"
 THREAD_CUSTOM_STORAGE_INIT = "AnaCustomStorageInit"
+THREAD_STORAGE_SNAPSHOT = "AnaStorageSnapshotThread"
 THREAD_WAIT_FOR_CONNECTING_NM = "AnaWaitForConnectingNMThread"
 THREAD_PAYLOAD = "AnaPayloadThread"
 THREAD_PAYLOAD_RESTART = "AnaPayloadRestartThread"
+THREAD_PACKAGE_DOWNLOAD = "AnaPackageDownloadThread"
 THREAD_SYNC_TIME_BASENAME = "AnaSyncTime"
 THREAD_EXCEPTION_HANDLING_TEST = "AnaExceptionHandlingTest"
-THREAD_LIVE_PROGRESS = "AnaLiveProgressThread"
 THREAD_SOFTWARE_WATCHER = "AnaSoftwareWatcher"
 THREAD_CHECK_SOFTWARE = "AnaCheckSoftwareThread"
 THREAD_SOURCE_WATCHER = "AnaSourceWatcher"
@@ -114,6 +117,10 @@ THREAD_ADD_LAYOUTS_INIT = "AnaAddLayoutsInitThread"
 THREAD_NTP_SERVER_CHECK = "AnaNTPserver"
 THREAD_ZFCP_DISCOVER = "AnaZfcpDiscoverThread"
 THREAD_DBUS_TASK = "AnaTaskThread"
+THREAD_RESOURCE_SAMPLER = "AnaResourceSampler"
+
+# the default interval of the resource sampler in seconds
+RESOURCE_SAMPLER_INTERVAL = 1.0
 
 # Geolocation constants
 
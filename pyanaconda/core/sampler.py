@@ -0,0 +1,385 @@
+# Sampler of the system resources.
+#
+# Copyright (C) 2018 Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+"""Sampler of the system resources.
+
+The sampler is a thread that periodically reads the usage of CPU, memory,
+block I/O and network from procfs. Every sample is tagged with the names
+of the installation tasks that were running at the time.
+
+The samples are kept in a ring buffer and contain only differences
+since the previous sample and only the processes and threads that were
+active in that time, so they stay small even for long installations.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple, OrderedDict
+
+from pyanaconda.core import util
+from pyanaconda.core.constants import THREAD_RESOURCE_SAMPLER, RESOURCE_SAMPLER_INTERVAL
+
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
+__all__ = ["ResourceSampler", "sampler", "write_samples", "summarize_samples"]
+
+# the samples of the installation environment
+SAMPLES_FILE = "/tmp/anaconda-resources.json"
+
+# the samples of the installed system
+SAMPLES_TARGET_FILE = "/var/log/anaconda/anaconda-resources.json"
+
+# the maximal number of kept samples
+SAMPLES_CAPACITY = 7200
+
+# a phase is bound by the CPU or disk if it keeps busy at least this many CPUs
+BOUND_CPUS = 0.5
+
+# a phase is bound by the network if it transfers at least this many bytes per second
+BOUND_NETWORK_RATE = 64 * 1024
+
+# (pid, name, CPU ticks, RSS in kB, read bytes, written bytes)
+ProcessSample = namedtuple("ProcessSample", ["pid", "name", "cpu", "rss", "read", "write"])
+
+# (tid, name, CPU ticks)
+ThreadSample = namedtuple("ThreadSample", ["tid", "name", "cpu"])
+
+# time, tasks, (busy, iowait, total) CPU ticks, (received, sent) bytes, processes, threads
+Sample = namedtuple("Sample", ["time", "tasks", "cpu", "net", "processes", "threads"])
+
+# a summary of one installation phase
+PhaseSummary = namedtuple("PhaseSummary", ["name", "duration", "cpu", "iowait", "read", "write",
+                                           "received", "sent", "processes", "bound"])
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", "replace")
+
+
+def read_cpu_times():
+    """Read the system CPU times from /proc/stat.
+
+    :returns: a tuple of busy, iowait and total ticks
+    """
+    fields = [int(f) for f in _read_file("/proc/stat").split("\n", 1)[0].split()[1:9]]
+    user, nice, system, idle, iowait, irq, softirq, steal = fields + [0] * (8 - len(fields))
+    busy = user + nice + system + irq + softirq + steal
+    return busy, iowait, busy + idle + iowait
+
+
+def read_network_bytes():
+    """Read the bytes transferred by all network interfaces except loopback.
+
+    :returns: a tuple of received and sent bytes
+    """
+    received = sent = 0
+
+    for line in _read_file("/proc/net/dev").splitlines()[2:]:
+        name, _sep, data = line.partition(":")
+        if name.strip() == "lo":
+            continue
+        fields = data.split()
+        received += int(fields[0])
+        sent += int(fields[8])
+
+    return received, sent
+
+
+def read_stat(path):
+    """Read a stat file of a process or a thread.
+
+    :returns: a tuple of the name, CPU ticks and RSS in pages
+    """
+    data = _read_file(path)
+    # The name is in parentheses and can contain anything.
+    name = data[data.index("(") + 1:data.rindex(")")]
+    fields = data[data.rindex(")") + 2:].split()
+    return name, int(fields[11]) + int(fields[12]), int(fields[21])
+
+
+def read_io(path):
+    """Read an io file of a process.
+
+    :returns: a tuple of read and written bytes
+    """
+    values = {}
+    for line in _read_file(path).splitlines():
+        key, _sep, value = line.partition(":")
+        values[key] = int(value)
+
+    return values.get("read_bytes", 0), values.get("write_bytes", 0)
+
+
+class ResourceSampler(object):
+    """Sampler of the system resources."""
+
+    def __init__(self, capacity=SAMPLES_CAPACITY):
+        """Create a new sampler.
+
+        :param int capacity: the maximal number of kept samples
+        """
+        self._samples = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._interval = RESOURCE_SAMPLER_INTERVAL
+        self._page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+        self._tasks = []
+        self._previous = {}
+
+    @property
+    def running(self):
+        """Is the sampler running?"""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def samples(self):
+        """A list of the kept samples."""
+        with self._lock:
+            return list(self._samples)
+
+    def start(self, interval=RESOURCE_SAMPLER_INTERVAL):
+        """Start sampling in a daemon thread.
+
+        :param float interval: the interval between samples in seconds
+        """
+        if self.running:
+            return
+
+        log.info("Starting the resource sampler with the interval of %s s.", interval)
+        self._interval = interval
+        self._stop_event.clear()
+        self.sample()
+
+        self._thread = threading.Thread(name=THREAD_RESOURCE_SAMPLER, target=self._run,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        if not self.running:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                self.sample()
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("The resource sampler has failed: %s", e)
+                return
+
+    def task_started(self, task):
+        """Tag the following samples with the task."""
+        with self._lock:
+            self._tasks.append(task.name)
+
+    def task_completed(self, task):
+        """Stop tagging the following samples with the task."""
+        with self._lock:
+            if task.name in self._tasks:
+                self._tasks.remove(task.name)
+
+    def record_task_queue(self, queue):
+        """Tag the samples with the running tasks of the task queue.
+
+        :param queue: an instance of TaskQueue
+        """
+        queue.task_started.connect(self.task_started)
+        queue.task_completed.connect(self.task_completed)
+
+    def _delta(self, key, values, started=False):
+        """Return the difference of the values since the previous sample.
+
+        :param key: a key of the sampled values
+        :param values: a tuple of the cumulative values
+        :param bool started: were the values started from zero since the previous sample?
+        """
+        previous = self._previous.get(key)
+        self._previous[key] = values
+
+        if previous is None:
+            return tuple(values) if started else tuple(0 for _value in values)
+
+        return tuple(value - old for (value, old) in zip(values, previous))
+
+    def sample(self):
+        """Take a sample of the system resources."""
+        timestamp = time.monotonic()
+        previous_keys = set(self._previous)
+        # Processes and threads that appear after the first sample were
+        # started since the previous one, so count all of their usage.
+        started = bool(previous_keys)
+
+        cpu = self._delta("cpu", read_cpu_times())
+        net = self._delta("net", read_network_bytes())
+        processes = []
+        threads = []
+
+        for pid in (int(name) for name in os.listdir("/proc") if name.isdigit()):
+            try:
+                name, ticks, rss = read_stat("/proc/%d/stat" % pid)
+                io = read_io("/proc/%d/io" % pid)
+            except (OSError, ValueError, IndexError):
+                # The process has ended or it isn't accessible.
+                continue
+
+            key = ("process", pid)
+            previous_keys.discard(key)
+            cpu_delta, read_delta, write_delta = self._delta(key, (ticks,) + io, started)
+
+            if cpu_delta or read_delta or write_delta:
+                processes.append(ProcessSample(pid, name, cpu_delta, rss * self._page_kb,
+                                               read_delta, write_delta))
+
+        # Python names of the threads of this process.
+        thread_names = {getattr(t, "native_id", None): t.name for t in threading.enumerate()}
+
+        for tid in (int(name) for name in os.listdir("/proc/self/task")):
+            try:
+                name, ticks, _rss = read_stat("/proc/self/task/%d/stat" % tid)
+            except (OSError, ValueError, IndexError):
+                continue
+
+            key = ("thread", tid)
+            previous_keys.discard(key)
+            cpu_delta, = self._delta(key, (ticks,), started)
+
+            if cpu_delta:
+                threads.append(ThreadSample(tid, thread_names.get(tid, name), cpu_delta))
+
+        # Forget the processes and threads that have ended.
+        for key in previous_keys - {"cpu", "net"}:
+            del self._previous[key]
+
+        with self._lock:
+            sample = Sample(timestamp, tuple(self._tasks), cpu, net,
+                            tuple(processes), tuple(threads))
+            self._samples.append(sample)
+
+        return sample
+
+    def to_json(self):
+        """Return the samples in JSON.
+
+        :rtype: str
+        """
+        samples = [sample._asdict() for sample in self.samples]
+        return json.dumps({
+            "interval": self._interval,
+            "cpus": os.cpu_count(),
+            "clock_ticks": os.sysconf("SC_CLK_TCK"),
+            "samples": samples
+        })
+
+    def write(self, path):
+        """Write the samples to the file.
+
+        :param str path: a path to the file
+        """
+        with util.open_with_perm(path, "w", 0o600) as f:
+            f.write(self.to_json())
+
+
+# the sampler of this installation
+sampler = ResourceSampler()
+
+
+def write_samples(save_to_target=True):
+    """Write the samples of this installation if the sampler is running.
+
+    :param bool save_to_target: whether to save them also to the installed system
+    """
+    if not sampler.running:
+        return
+
+    try:
+        sampler.write(SAMPLES_FILE)
+
+        if save_to_target:
+            path = util.sysroot_path(SAMPLES_TARGET_FILE)
+            util.mkdirChain(os.path.dirname(path))
+            sampler.write(path)
+    except OSError as e:
+        log.error("Failed to write the resource samples: %s", e)
+
+
+def _classify(cpus, iowait, network_rate):
+    """Return the resource that bounds the phase."""
+    if max(cpus, iowait) >= BOUND_CPUS:
+        return "cpu" if cpus >= iowait else "disk"
+    elif network_rate >= BOUND_NETWORK_RATE:
+        return "network"
+    else:
+        return "idle"
+
+
+def summarize_samples(data, top=3):
+    """Summarize the samples by the installation phases.
+
+    The samples without any running task are summarized as the phase
+    called "(no task)". The phase is named after all tasks that were
+    running at the same time.
+
+    :param dict data: the samples loaded from the JSON file
+    :param int top: the number of the top processes by CPU to report
+    :returns: a list of instances of PhaseSummary in the order of their start
+    """
+    phases = OrderedDict()
+    samples = data["samples"]
+    cpus = data["cpus"] or 1
+
+    for (previous, sample) in zip(samples, samples[1:]):
+        name = " + ".join(sample["tasks"]) or "(no task)"
+        phase = phases.setdefault(name, {
+            "duration": 0.0, "cpu": [0, 0, 0], "read": 0, "write": 0,
+            "received": 0, "sent": 0, "processes": {}
+        })
+
+        phase["duration"] += sample["time"] - previous["time"]
+        phase["cpu"] = [a + b for (a, b) in zip(phase["cpu"], sample["cpu"])]
+        phase["received"] += sample["net"][0]
+        phase["sent"] += sample["net"][1]
+
+        for (_pid, process_name, ticks, _rss, read, write) in sample["processes"]:
+            phase["read"] += read
+            phase["write"] += write
+            phase["processes"][process_name] = phase["processes"].get(process_name, 0) + ticks
+
+    summaries = []
+    for (name, phase) in phases.items():
+        busy, iowait, total = phase["cpu"]
+        busy_cpus = busy * cpus / total if total else 0.0
+        iowait_cpus = iowait * cpus / total if total else 0.0
+        duration = phase["duration"] or 1.0
+        network_rate = (phase["received"] + phase["sent"]) / duration
+        processes = sorted(phase["processes"].items(), key=lambda item: -item[1])[:top]
+
+        summaries.append(PhaseSummary(name, phase["duration"], busy_cpus, iowait_cpus,
+                                      phase["read"], phase["write"],
+                                      phase["received"], phase["sent"],
+                                      [process_name for (process_name, _ticks) in processes],
+                                      _classify(busy_cpus, iowait_cpus, network_rate)))
+
+    return summaries
@@ -0,0 +1,174 @@
+# Timeline of the installation.
+#
+# Copyright (C) 2018 Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pyanaconda.core import util
+
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
+__all__ = ["Timeline", "timeline", "write_timeline"]
+
+# the timeline of the installation environment
+TIMELINE_FILE = "/tmp/anaconda-timeline.json"
+
+# the timeline of the installed system
+TIMELINE_TARGET_FILE = "/var/log/anaconda/anaconda-timeline.json"
+
+
+class Timeline(object):
+    """Timeline of installation phases.
+
+    The phases are recorded with monotonic timestamps and thread IDs.
+    The timeline is written in the Chrome trace event format, so it can
+    be displayed by chrome://tracing or Perfetto.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.monotonic()
+        self._events = []
+        self._threads = {}
+        self._spans = {}
+
+    def _now(self):
+        """Return microseconds since the creation of the timeline."""
+        return int((time.monotonic() - self._origin) * 1000000)
+
+    def start(self, name, category, args=None):
+        """Start a phase in the current thread.
+
+        :param str name: a name of the phase
+        :param str category: a category of the phase
+        :param dict args: additional data of the phase or None
+        :returns: an event that should be passed to stop()
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "ts": self._now(),
+        }
+
+        if args:
+            event["args"] = args
+
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+
+        return event
+
+    def stop(self, event):
+        """Stop the phase.
+
+        :param event: an event returned by start()
+        """
+        event["dur"] = self._now() - event["ts"]
+
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def phase(self, name, category, args=None):
+        """Record a phase of the code in the with statement."""
+        event = self.start(name, category, args)
+        try:
+            yield
+        finally:
+            self.stop(event)
+
+    def _start_item(self, item, category):
+        event = self.start(item.name, category)
+
+        with self._lock:
+            self._spans[id(item)] = event
+
+    def _stop_item(self, item):
+        with self._lock:
+            event = self._spans.pop(id(item), None)
+
+        if event:
+            self.stop(event)
+
+    def record_task_queue(self, queue):
+        """Record the task queue and all its tasks and nested queues.
+
+        :param queue: an instance of TaskQueue
+        """
+        queue.started.connect(lambda item: self._start_item(item, "queue"))
+        queue.completed.connect(self._stop_item)
+        queue.queue_started.connect(lambda item: self._start_item(item, "queue"))
+        queue.queue_completed.connect(self._stop_item)
+        queue.task_started.connect(lambda item: self._start_item(item, "task"))
+        queue.task_completed.connect(self._stop_item)
+
+    def to_json(self):
+        """Return the timeline in the Chrome trace event format.
+
+        :rtype: str
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+
+        for tid, name in sorted(threads.items()):
+            events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            })
+
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def write(self, path):
+        """Write the timeline to the file.
+
+        :param str path: a path to the file
+        """
+        with util.open_with_perm(path, "w", 0o600) as f:
+            f.write(self.to_json())
+
+
+# the timeline of this installation
+timeline = Timeline()
+
+
+def write_timeline(save_to_target=True):
+    """Write the timeline of this installation.
+
+    :param bool save_to_target: whether to save it also to the installed system
+    """
+    try:
+        timeline.write(TIMELINE_FILE)
+
+        if save_to_target:
+            path = util.sysroot_path(TIMELINE_TARGET_FILE)
+            util.mkdirChain(os.path.dirname(path))
+            timeline.write(path)
+    except OSError as e:
+        log.error("Failed to write the installation timeline: %s", e)
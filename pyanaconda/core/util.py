@@ -33,10 +33,12 @@ from urllib.parse import quote, unquote
 import gettext
 import signal
 import sys
+import time
 import imp
 import types
 import inspect
 import functools
+from collections import OrderedDict
 
 import requests
 from requests_file import FileAdapter
@@ -61,6 +63,9 @@ from pykickstart.constants import KS_SCRIPT_ONERROR
 
 _child_env = {}
 
+# the maximal length of a line of the streamed output of a program
+PROGRAM_LINE_LIMIT = 64 * 1024
+
 
 def setenv(name, value):
     """ Set an environment variable to be used by child processes.
@@ -340,21 +345,98 @@ def _run_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_ou
     return (proc.returncode, output_string)
 
 
-def execInSysroot(command, argv, stdin=None):
+def _stream_program(argv, root='/', stdin=None, stdout=None, env_prune=None, log_output=True,
+                    binary_output=False, handle_line=None):
+    """ Run an external program and log its output while it is running
+
+        The output is never kept in memory as a whole, so this is suitable for
+        long-running commands with a lot of output. The wall and CPU times of
+        the command are logged when it ends.
+
+        :param argv: The command to run and argument
+        :param root: The directory to chroot to before running command.
+        :param stdin: The file object to read stdin from.
+        :param stdout: Optional file object to write the output to.
+        :param env_prune: environment variable to remove before execution
+        :param log_output: whether to log the output of command
+        :param binary_output: whether to write the output of command to stdout as binary data
+        :param handle_line: a function called with every line of the output, the line
+                            is not logged if the function returns True
+        :return: The return code of the command
+    """
+    start_time = time.monotonic()
+
+    try:
+        proc = startProgram(argv, root=root, stdin=stdin, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, env_prune=env_prune)
+    except OSError as e:
+        with program_log_lock:
+            program_log.error("Error running %s: %s", argv[0], e.strerror)
+        raise
+
+    try:
+        while True:
+            # Limit the length of lines, so a command without line breaks
+            # can't fill the memory.
+            data = proc.stdout.readline(PROGRAM_LINE_LIMIT)
+            if not data:
+                break
+
+            line = data.decode("utf-8", "replace")
+
+            if stdout:
+                if binary_output:
+                    stdout.write(data)
+                elif line.endswith("\n"):
+                    stdout.write(line)
+                else:
+                    stdout.write(line + "\n")
+
+            line = line.strip()
+            if handle_line and handle_line(line):
+                continue
+
+            if log_output:
+                with program_log_lock:
+                    program_log.info(line)
+    finally:
+        proc.stdout.close()
+
+        # Collect the resource usage of the command together with its status.
+        _pid, status, usage = os.wait4(proc.pid, 0)
+        if os.WIFSIGNALED(status):
+            proc.returncode = -os.WTERMSIG(status)
+        else:
+            proc.returncode = os.WEXITSTATUS(status)
+
+    with program_log_lock:
+        program_log.debug("Return code: %d", proc.returncode)
+        program_log.debug("Time: %.2f s, CPU time: %.2f s user, %.2f s system",
+                          time.monotonic() - start_time, usage.ru_utime, usage.ru_stime)
+
+    return proc.returncode
+
+
+def execInSysroot(command, argv, stdin=None, handle_line=None):
     """ Run an external program in the target root.
         :param command: The command to run
         :param argv: The argument list
         :param stdin: The file object to read stdin from.
+        :param handle_line: a function called with every line of the output, the line
+                            is not logged if the function returns True
         :return: The return code of the command
     """
 
-    return execWithRedirect(command, argv, stdin=stdin, root=getSysroot())
+    return execWithRedirect(command, argv, stdin=stdin, root=getSysroot(),
+                            handle_line=handle_line)
 
 
-def execWithRedirect(command, argv, stdin=None, stdout=None,
-                     root='/', env_prune=None, log_output=True, binary_output=False):
+def execWithRedirect(command, argv, stdin=None, stdout=None, root='/', env_prune=None,
+                     log_output=True, binary_output=False, handle_line=None):
     """ Run an external program and redirect the output to a file.
 
+        The output is logged while the program is running.
+
         :param command: The command to run
         :param argv: The argument list
         :param stdin: The file object to read stdin from.
@@ -363,6 +445,8 @@ def execWithRedirect(command, argv, stdin=None, stdout=None,
         :param env_prune: environment variable to remove before execution
         :param log_output: whether to log the output of command
         :param binary_output: whether to treat the output of command as binary data
+        :param handle_line: a function called with every line of the output, the line
+                            is not logged if the function returns True
         :return: The return code of the command
     """
     if flags.testing:
@@ -371,8 +455,9 @@ def execWithRedirect(command, argv, stdin=None, stdout=None,
         return 0
 
     argv = [command] + argv
-    return _run_program(argv, stdin=stdin, stdout=stdout, root=root, env_prune=env_prune,
-                        log_output=log_output, binary_output=binary_output)[0]
+    return _stream_program(argv, stdin=stdin, stdout=stdout, root=root, env_prune=env_prune,
+                           log_output=log_output, binary_output=binary_output,
+                           handle_line=handle_line)
 
 
 def execWithCapture(command, argv, stdin=None, root='/', log_output=True, filter_stderr=False):
@@ -640,15 +725,15 @@ def setup_translations():
     gettext.textdomain("anaconda")
 
 
-def _run_systemctl(command, service, root="/"):
+def _run_systemctl(command, *services, root="/"):
     """
-    Runs 'systemctl command service.service'
+    Runs 'systemctl command service.service ...'
 
     :return: exit status of the systemctl
 
     """
 
-    args = [command, service]
+    args = [command] + list(services)
     if root != "/":
         args += ["--root", root]
 
@@ -675,22 +760,59 @@ def service_running(service):
     return ret == 0
 
 
+def _run_systemctl_batch(command, services, root="/"):
+    """
+    Runs 'systemctl command' for all services at once
+
+    If it fails, the command is run for every service again to find
+    out which services have failed.
+
+    :return: a dictionary of the failed services and their exit statuses
+    """
+    if not services:
+        return {}
+
+    if _run_systemctl(command, *services, root=root) == 0:
+        return {}
+
+    failed = OrderedDict()
+    for service in services:
+        ret = _run_systemctl(command, service, root=root)
+        if ret != 0:
+            failed[service] = ret
+
+    return failed
+
+
+def configure_services(enabled=(), disabled=()):
+    """ Enable and disable systemd services in the sysroot
+
+    The services are disabled first and then enabled, every action
+    with a single systemctl call.
+
+    :param enabled: a list of services to enable
+    :param disabled: a list of services to disable
+    :raise ValueError: if some of the services failed to enable
+    """
+    # we ignore the errors so we can disable services even if they don't
+    # exist, because that's effectively disabled
+    for service in _run_systemctl_batch("disable", list(disabled), root=getSysroot()):
+        log.warning("Disabling %s failed. It probably doesn't exist", service)
+
+    failed = _run_systemctl_batch("enable", list(enabled), root=getSysroot())
+    if failed:
+        raise ValueError("Error enabling service %s" % ", ".join(
+            "%s: %s" % (service, ret) for (service, ret) in failed.items()))
+
+
 def enable_service(service):
     """ Enable a systemd service in the sysroot """
-    ret = _run_systemctl("enable", service, root=getSysroot())
-
-    if ret != 0:
-        raise ValueError("Error enabling service %s: %s" % (service, ret))
+    configure_services(enabled=[service])
 
 
 def disable_service(service):
     """ Disable a systemd service in the sysroot """
-    # we ignore the error so we can disable services even if they don't
-    # exist, because that's effectively disabled
-    ret = _run_systemctl("disable", service, root=getSysroot())
-
-    if ret != 0:
-        log.warning("Disabling %s failed. It probably doesn't exist", service)
+    configure_services(disabled=[service])
 
 
 def dracut_eject(device):
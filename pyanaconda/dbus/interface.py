@@ -22,8 +22,11 @@
 # For more info about DBus specification see:
 # https://dbus.freedesktop.org/doc/dbus-specification.html#introspection-format
 #
+import hashlib
 import inspect
+import os
 import re
+import sys
 
 from inspect import Parameter
 from typing import get_type_hints
@@ -32,8 +35,17 @@ from pydbus.generic import signal
 from pyanaconda.dbus.typing import get_dbus_type
 from pyanaconda.dbus.xml import XMLGenerator
 
+from pyanaconda.anaconda_loggers import get_module_logger
+log = get_module_logger(__name__)
+
 __all__ = ["dbus_class", "dbus_interface", "dbus_signal"]
 
+# set this environment variable to a directory to cache DBus specifications
+DBUS_SPECIFICATION_CACHE_ENV = "ANACONDA_DBUS_CACHE"
+
+# set this environment variable to validate the cached specifications
+DBUS_SPECIFICATION_VALIDATE_ENV = "ANACONDA_DBUS_VALIDATE"
+
 
 class dbus_signal(signal):
     """DBus signal.
@@ -75,8 +87,7 @@ def dbus_interface(interface_name):
         Interface.dbus
     """
     def decorated(cls):
-        generator = DBusSpecification()
-        cls.dbus = generator.generate_specification(cls, interface_name)
+        cls.dbus = specification_cache.get_specification(cls, interface_name)
         return cls
     return decorated
 
@@ -479,3 +490,168 @@ class DBusSpecification(object):
             self.xml_generator.add_child(node, interfaces[interface_name])
 
         return node
+
+
+class DBusSpecificationCache(object):
+    """Cache of DBus XML specifications.
+
+    The specification of a class is generated every time its module
+    is imported, so in every process that uses it. The cache stores the
+    generated specifications in files identified by a hash of the source
+    files of the class and its base classes, the specifications of the
+    base classes and the source files of the generator. A changed source
+    file creates a new cache entry.
+
+    The cache is disabled by default. The cache of this process is used
+    only if the environment variable ANACONDA_DBUS_CACHE is set to a path
+    of the cache directory. The cached specifications are validated only
+    if the environment variable ANACONDA_DBUS_VALIDATE is set.
+    """
+
+    def __init__(self, cache_dir=None, validate=None):
+        """Create a new cache.
+
+        :param cache_dir: a path to the cache directory or None to disable the cache
+        :param validate: should be the cached specifications validated?
+        """
+        if validate is None:
+            validate = bool(os.environ.get(DBUS_SPECIFICATION_VALIDATE_ENV))
+
+        self._cache_dir = cache_dir
+        self._validate = validate
+        self._file_hashes = {}
+
+    def _get_file_hash(self, path):
+        """Return a hash of the file content."""
+        if path not in self._file_hashes:
+            with open(path, "rb") as f:
+                self._file_hashes[path] = hashlib.sha256(f.read()).hexdigest()
+
+        return self._file_hashes[path]
+
+    def _get_module_file(self, cls):
+        """Return a path to the source file of the class or None."""
+        module = sys.modules.get(cls.__module__)
+        return getattr(module, "__file__", None)
+
+    def _get_members(self, cls):
+        """Return names and lines of the members defined by the class."""
+        members = []
+
+        for name, member in sorted(vars(cls).items()):
+            if name == "dbus":
+                continue
+
+            if isinstance(member, property):
+                member = member.fget
+            elif isinstance(member, dbus_signal):
+                member = member.definition
+
+            code = getattr(member, "__code__", None)
+            members.append("{}:{}".format(name, code.co_firstlineno if code else ""))
+
+        return members
+
+    def get_key(self, cls, interface_name=None):
+        """Return a key of the specification of the class.
+
+        :param cls: a class object
+        :param interface_name: a name of the interface defined by class
+        :return: a string or None if the class can't be cached
+        """
+        key = hashlib.sha256()
+        key.update("{}.{}:{}".format(cls.__module__, cls.__qualname__, interface_name).encode())
+        key.update(",".join(self._get_members(cls)).encode())
+
+        try:
+            # The source files of the generator.
+            for module in (sys.modules[__name__], sys.modules[get_dbus_type.__module__],
+                           sys.modules[XMLGenerator.__module__]):
+                key.update(self._get_file_hash(module.__file__).encode())
+
+            # The source files and the specifications of the class and its bases.
+            for member in inspect.getmro(cls):
+                path = self._get_module_file(member)
+
+                if member is not cls and getattr(member, "dbus", None):
+                    key.update(member.dbus.encode())
+
+                if member.__module__ == "builtins":
+                    continue
+
+                if not path:
+                    return None
+
+                key.update(self._get_file_hash(path).encode())
+
+        except (OSError, KeyError, AttributeError) as e:
+            log.debug("Can't create a key of the DBus specification of %s: %s", cls.__name__, e)
+            return None
+
+        return key.hexdigest()
+
+    def get_specification(self, cls, interface_name=None):
+        """Return DBus XML specification of the class.
+
+        The specification is loaded from the cache or generated.
+
+        :param cls: class object to decorate
+        :param str interface_name: name of the interface defined by class
+        :return str: DBus specification in XML
+        """
+        if not self._cache_dir:
+            return DBusSpecification().generate_specification(cls, interface_name)
+
+        key = self.get_key(cls, interface_name)
+        specification = self._read(key)
+
+        if specification is not None and not self._validate:
+            return specification
+
+        generated = DBusSpecification().generate_specification(cls, interface_name)
+
+        if specification is not None and specification != generated:
+            log.warning("The cached DBus specification of %s is invalid.", cls.__name__)
+
+        if specification != generated:
+            self._write(key, generated)
+
+        return generated
+
+    def _get_path(self, key):
+        """Return a path to the cached specification."""
+        return os.path.join(self._cache_dir, key + ".xml")
+
+    def _read(self, key):
+        """Read the cached specification or return None."""
+        if not key:
+            return None
+
+        try:
+            with open(self._get_path(key)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key, specification):
+        """Write the specification to the cache if possible."""
+        if not key:
+            return
+
+        path = self._get_path(key)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+
+        try:
+            os.makedirs(self._cache_dir, mode=0o755, exist_ok=True)
+
+            # Other processes might read the file at the same time.
+            with open(tmp_path, "w") as f:
+                f.write(specification)
+
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.debug("Can't cache the DBus specification of %s: %s", key, e)
+
+
+# the cache of DBus specifications of this process
+specification_cache = DBusSpecificationCache(os.environ.get(DBUS_SPECIFICATION_CACHE_ENV))
@@ -71,10 +71,23 @@ class Flags(object):
         self.rescue_mode = False
         self.noefi = False
         self.kexec = False
+        # install packages while the rest of them is still downloading
+        self.pipelined_install = False
+        # location and size of the persistent package cache
+        self.pkgcache = None
+        self.pkgcache_size = None
+        # copy the live image with rsync
+        self.live_rsync = False
+        # extract the tar liveimg while it is downloading
+        self.liveimg_stream = False
+        # maximal number of initramfs images generated at the same time
+        self.initramfs_jobs = None
         # nosave options
         self.nosave_input_ks = False
         self.nosave_output_ks = False
         self.nosave_logs = False
+        # interval of the resource sampler or None
+        self.sampler = None
         # single language options
         self.singlelang = False
         # enable SE/HMC
@@ -26,6 +26,8 @@ from pyanaconda.progress import progress_message, progress_step, progress_comple
 from pyanaconda.users import Users
 from pyanaconda import flags
 from pyanaconda.core import util
+from pyanaconda.core.timeline import timeline, write_timeline
+from pyanaconda.core.sampler import sampler, write_samples
 from pyanaconda import timezone
 from pyanaconda import network
 from pyanaconda import screen_access
@@ -40,6 +42,12 @@ from pykickstart.constants import SNAPSHOT_WHEN_POST_INSTALL
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
 
+# maximal number of configuration tasks running at the same time
+CONFIGURATION_WORKERS = 4
+
+# resources shared by configuration tasks
+SYSTEMD_UNITS = "systemd units"
+
 class WriteResolvConfTask(Task):
     """Custom task subclass for handling the resolv.conf copy task.
 
@@ -80,19 +88,34 @@ def doConfiguration(storage, payload, ksdata, instClass):
     configuration_queue.queue_started.connect(lambda x: progress_message(x.status_message))
     configuration_queue.queue_completed.connect(lambda x: progress_step("%s -- DONE" % x.status_message))
 
+    # The installed system, its network and its users are configured
+    # concurrently. Tasks that enable or disable systemd units can't
+    # run at the same time.
+    system_config = TaskQueue("System configuration", N_("Configuring the system"),
+                              max_workers=CONFIGURATION_WORKERS)
+
     # schedule the execute methods of ksdata that require an installed system to be present
-    os_config = TaskQueue("Installed system configuration", N_("Configuring installed system"))
-    os_config.append(Task("Configure authconfig", ksdata.authconfig.execute, (storage, ksdata, instClass)))
+    os_config = TaskQueue("Installed system configuration", N_("Configuring installed system"),
+                          max_workers=CONFIGURATION_WORKERS)
+    authconfig_task = Task("Configure authconfig", ksdata.authconfig.execute, (storage, ksdata, instClass))
+    os_config.append(authconfig_task)
     os_config.append(Task("Configure SELinux", ksdata.selinux.execute, (storage, ksdata, instClass)))
     os_config.append(Task("Configure first boot tasks", ksdata.firstboot.execute, (storage, ksdata, instClass)))
-    os_config.append(Task("Configure services", ksdata.services.execute, (storage, ksdata, instClass)))
+    # the services include the first boot service
+    os_config.append(Task("Configure services", ksdata.services.execute, (storage, ksdata, instClass),
+                          resources=[SYSTEMD_UNITS]))
     os_config.append(Task("Configure keyboard", ksdata.keyboard.execute, (storage, ksdata, instClass)))
     os_config.append(Task("Configure timezone", ksdata.timezone.execute, (storage, ksdata, instClass)))
     os_config.append(Task("Configure language", ksdata.lang.execute, (storage, ksdata, instClass)))
-    os_config.append(Task("Configure firewall", ksdata.firewall.execute, (storage, ksdata, instClass)))
-    os_config.append(Task("Configure X", ksdata.xconfig.execute, (storage, ksdata, instClass)))
-    os_config.append(Task("Configure skip-X", ksdata.skipx.execute, (storage, ksdata, instClass)))
-    configuration_queue.append(os_config)
+    os_config.append(Task("Configure firewall", ksdata.firewall.execute, (storage, ksdata, instClass),
+                          resources=[SYSTEMD_UNITS]))
+    xconfig_task = Task("Configure X", ksdata.xconfig.execute, (storage, ksdata, instClass),
+                        resources=[SYSTEMD_UNITS])
+    os_config.append(xconfig_task)
+    # skip-X overrides the default target set by X configuration
+    os_config.append(Task("Configure skip-X", ksdata.skipx.execute, (storage, ksdata, instClass),
+                          depends_on=[xconfig_task], resources=[SYSTEMD_UNITS]))
+    system_config.append(os_config)
 
     # schedule network configuration (if required)
     will_write_network = not flags.flags.imageInstall and not flags.flags.dirInstall
@@ -100,16 +123,18 @@ def doConfiguration(storage, payload, ksdata, instClass):
         network_config = TaskQueue("Network configuration", N_("Writing network configuration"))
         network_config.append(Task("Network configuration",
                                    ksdata.network.execute, (storage, ksdata, instClass)))
-        configuration_queue.append(network_config)
+        system_config.append(network_config)
 
     # creating users and groups requires some pre-configuration.
+    # - the authentication has to be configured first
     u = Users()
-    user_config = TaskQueue("User creation", N_("Creating users"))
+    user_config = TaskQueue("User creation", N_("Creating users"), depends_on=[authconfig_task])
     user_config.append(Task("Configure root", ksdata.rootpw.execute, (storage, ksdata, instClass, u)))
     user_config.append(Task("Configure user groups", ksdata.group.execute, (storage, ksdata, instClass, u)))
     user_config.append(Task("Configure user", ksdata.user.execute, (storage, ksdata, instClass, u)))
     user_config.append(Task("Configure SSH key", ksdata.sshkey.execute, (storage, ksdata, instClass, u)))
-    configuration_queue.append(user_config)
+    system_config.append(user_config)
+    configuration_queue.append(system_config)
 
     # Anaconda addon configuration
     addon_config = TaskQueue("Anaconda addon configuration", N_("Configuring addons"))
@@ -176,7 +201,8 @@ def doConfiguration(storage, payload, ksdata, instClass):
         configuration_queue.append(write_configs)
 
     # notify progress tracking about the number of steps
-    progress_init(len(configuration_queue))
+    # - every nested queue reports a step once it is completed
+    progress_init(configuration_queue.queue_count)
     # log contents of the main task queue
     log.info(configuration_queue.summary)
 
@@ -190,8 +216,14 @@ def doConfiguration(storage, payload, ksdata, instClass):
     configuration_queue.task_completed.connect(lambda x: log.debug("Task completed: %s (%s) (%1.1f s)",
                                                                    x.name, next(task_completed_counter),
                                                                    x.elapsed_time))
+    # record the tasks and queues in the installation timeline
+    timeline.record_task_queue(configuration_queue)
+    sampler.record_task_queue(configuration_queue)
     # start the task queue
     configuration_queue.start()
+    # write the timeline of the whole installation
+    write_timeline(save_to_target=not flags.flags.nosave_logs)
+    write_samples(save_to_target=not flags.flags.nosave_logs)
     # done
     progress_complete()
 
@@ -287,7 +319,9 @@ def doInstall(storage, payload, ksdata, instClass):
         installation_queue.append(realm_discover)
 
     # Check for other possibly needed additional packages.
-    pre_install = TaskQueue("Pre install tasks", N_("Running pre-installation tasks"))
+    # - the setup tasks are independent, they only find out what is needed
+    pre_install = TaskQueue("Pre install tasks", N_("Running pre-installation tasks"),
+                            max_workers=CONFIGURATION_WORKERS)
     pre_install.append(Task("Setup authconfig", ksdata.authconfig.setup))
     pre_install.append(Task("Setup firewall", ksdata.firewall.setup))
     pre_install.append(Task("Setup network", ksdata.network.setup))
@@ -319,7 +353,8 @@ def doInstall(storage, payload, ksdata, instClass):
         payload.requirements.add_packages(payload.langpacks(), reason="langpacks", strong=False)
         payload.preInstall()
 
-    pre_install.append(Task("Find additional packages & run preInstall()", run_pre_install))
+    pre_install.append(Task("Find additional packages & run preInstall()", run_pre_install,
+                            depends_on=list(pre_install)))
     installation_queue.append(pre_install)
 
     payload_install = TaskQueue("Payload installation", N_("Installing."))
@@ -362,7 +397,13 @@ def doInstall(storage, payload, ksdata, instClass):
     installation_queue.task_completed.connect(lambda x: log.debug("Task completed: %s (%s) (%1.1f s)",
                                                                   x.name, next(task_completed_counter),
                                                                   x.elapsed_time))
+    # record the tasks and queues in the installation timeline
+    timeline.record_task_queue(installation_queue)
+    sampler.record_task_queue(installation_queue)
     # start the task queue
     installation_queue.start()
+    # write the timeline in case the configuration fails
+    write_timeline(save_to_target=False)
+    write_samples(save_to_target=False)
     # done
     progress_complete()
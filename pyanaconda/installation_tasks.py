@@ -17,7 +17,8 @@
 # License and may only be used or replicated with the express permission of
 # Red Hat, Inc.
 #
-from threading import RLock
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock, Condition
 from pyanaconda.core.signal import Signal
 from pyanaconda.core.util import synchronized
 import time
@@ -25,13 +26,22 @@ import time
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
 
+# Tasks of parallel task queues run in different threads, but
+# the signal handlers don't need to care about that.
+_signal_lock = RLock()
+
 class BaseTask(object):
     """A base class for Task and TaskQueue.
 
     It holds shared methods, properties and signals.
+
+    Items of a parallel task queue can declare dependencies and
+    resources. An item is started only once all tasks and task queues
+    it depends on are done and no other running item of the queue uses
+    any of its resources.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, depends_on=None, resources=None):
         self._name = name
         self._done = False
         self._running = False
@@ -39,6 +49,8 @@ class BaseTask(object):
         self._parent = None
         self._start_timestamp = None
         self._done_timestamp = None
+        self._depends_on = list(depends_on or [])
+        self._resources = frozenset(resources or [])
         self.started = Signal()
         self.completed = Signal()
 
@@ -83,6 +95,34 @@ class BaseTask(object):
         """
         return self._done
 
+    @property
+    def depends_on(self):
+        """Tasks and task queues that have to be done before this one starts.
+
+        :returns: a list of tasks and task queues
+        """
+        return self._depends_on
+
+    @property
+    def resources(self):
+        """Resources used by the task.
+
+        Items of a parallel task queue that use the same resource never
+        run at the same time.
+
+        :returns: a set of resource names
+        :rtype: frozenset of str
+        """
+        return self._resources
+
+    @property
+    def ready(self):
+        """Reports if all tasks and task queues this one depends on are done.
+
+        :rtype: bool
+        """
+        return all(item.done for item in self._depends_on)
+
     @property
     def summary(self):
         """A description of the task - to be overridden by subclasses."""
@@ -97,11 +137,16 @@ class TaskQueue(BaseTask):
     """TaskQueue represents a queue of TaskQueues or Tasks.
 
     TaskQueues and Tasks can be mixed in a single TaskQueue.
+
+    Items of the queue run one by one in order by default. If the queue
+    has more than one worker, independent items run concurrently and
+    only the declared dependencies and resources order them.
     """
 
-    def __init__(self, name, status_message=None):
-        super(TaskQueue, self).__init__(name=name)
+    def __init__(self, name, status_message=None, max_workers=1, depends_on=None, resources=None):
+        super(TaskQueue, self).__init__(name=name, depends_on=depends_on, resources=resources)
         self._status_message = status_message
+        self._max_workers = max_workers
         self._current_task_number = None
         self._current_queue_number = None
         # the list backing this TaskQueue instance
@@ -140,6 +185,27 @@ class TaskQueue(BaseTask):
         """
         return self._status_message
 
+    @property
+    def max_workers(self):
+        """Maximal number of items of the queue running at the same time.
+
+        :rtype: int
+        """
+        return self._max_workers
+
+    @property
+    @synchronized
+    def resources(self):
+        """Resources used by the task queue and all its items.
+
+        :returns: a set of resource names
+        :rtype: frozenset of str
+        """
+        resources = set(self._resources)
+        for item in self:
+            resources.update(item.resources)
+        return frozenset(resources)
+
     @property
     @synchronized
     def queue_count(self):
@@ -295,13 +361,18 @@ class TaskQueue(BaseTask):
                     log.warning("Attempting to start an empty task queue (%s).", self.name)
 
         if do_start:
-            # go over all task groups and their tasks in order
-            self.started.emit(self)
+            with _signal_lock:
+                self.started.emit(self)
             if len(self) == 0:
                 log.warning("The task group %s is empty.", self.name)
-            for item in self:
-                # start the item (TaskQueue/Task)
-                item.start()
+
+            if self._max_workers > 1:
+                self._start_parallel()
+            else:
+                # go over all task groups and their tasks in order
+                for item in self:
+                    # start the item (TaskQueue/Task)
+                    item.start()
 
             # we are done, set the task queue state accordingly
             with self._lock:
@@ -312,7 +383,64 @@ class TaskQueue(BaseTask):
                 self._current_queue_number = None
 
             # trigger the "completed" signals
-            self.completed.emit(self)
+            with _signal_lock:
+                self.completed.emit(self)
+
+    def _start_parallel(self):
+        """Run items of the queue concurrently on a pool of workers.
+
+        The first ready item with free resources is started whenever a
+        worker is free, so independent items still start in the queue order.
+        """
+        pending = list(self)
+        running = {}
+        busy_resources = set()
+        condition = Condition()
+
+        # Wake up the scheduler whenever something is done, because an item
+        # can depend on a task nested in another running item.
+        def notify(*args):
+            with condition:
+                condition.notify()
+
+        self.task_completed.connect(notify)
+        self.queue_completed.connect(notify)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                with condition:
+                    while pending or running:
+                        for item in list(pending):
+                            if len(running) >= self._max_workers:
+                                break
+
+                            if not item.ready or item.resources & busy_resources:
+                                continue
+
+                            pending.remove(item)
+                            busy_resources.update(item.resources)
+                            future = executor.submit(item.start)
+                            future.add_done_callback(notify)
+                            running[future] = item
+
+                        finished = [future for future in running if future.done()]
+                        for future in finished:
+                            item = running.pop(future)
+                            busy_resources.difference_update(item.resources)
+                            # raise the exception of the item if any
+                            future.result()
+
+                        if finished:
+                            continue
+
+                        if not running:
+                            raise RuntimeError("Task queue %s can't start %s - dependencies "
+                                               "are not done." % (self.name, pending[0].name))
+
+                        condition.wait()
+        finally:
+            self.task_completed.disconnect(notify)
+            self.queue_completed.disconnect(notify)
 
     # implement the Python list "interface" and make sure parent is always
     # set to a correct value
@@ -384,8 +512,9 @@ class Task(BaseTask):
     Task instances to run.
     """
 
-    def __init__(self, name, task=None, task_args=None, task_kwargs=None):
-        super(Task, self).__init__(name=name)
+    def __init__(self, name, task=None, task_args=None, task_kwargs=None,
+                 depends_on=None, resources=None):
+        super(Task, self).__init__(name=name, depends_on=depends_on, resources=resources)
         self._task = task
         if task_args is None:
             task_args = []
@@ -467,13 +596,15 @@ class Task(BaseTask):
 
         if do_start:
             # trigger the "started" signal
-            self.started.emit(self)
+            with _signal_lock:
+                self.started.emit(self)
             # run the task
             self.run_task()
-            # trigger the "completed" signal
-            self.completed.emit(self)
             # the task should be done, set the task state accordingly
             with self._lock:
                 self._running = False
                 self._done = True
                 self._done_timestamp = time.time()
+            # trigger the "completed" signal
+            with _signal_lock:
+                self.completed.emit(self)
@@ -769,36 +769,44 @@ class Firstboot(commands.firstboot.FC3_Firstboot):
                 # if nothing is specified, use the installclass default for firstboot
                 self.firstboot = instClass.firstboot
 
-    def execute(self, *args):
-        action = util.enable_service
-        unit_name = "initial-setup.service"
+    unit_name = "initial-setup.service"
+
+    def _unit_exists(self):
+        """Is the unit file for the Initial Setup service installed?"""
+        return os.path.exists(os.path.join(util.getSysroot(), "lib/systemd/system/", self.unit_name))
+
+    def get_services(self):
+        """Return the services to enable and disable.
+
+        The Initial Setup service is enabled or disabled (if its unit
+        is installed) together with the services of the services command.
 
-        # find if the unit file for the Initial Setup service is installed
-        unit_exists = os.path.exists(os.path.join(util.getSysroot(), "lib/systemd/system/", unit_name))
-        if unit_exists and self.firstboot == FIRSTBOOT_RECONFIG:
+        :returns: a tuple of lists of services to enable and disable
+        """
+        if not self._unit_exists():
+            return [], []
+        elif self.firstboot == FIRSTBOOT_SKIP:
+            return [], [self.unit_name]
+        else:
+            return [self.unit_name], []
+
+    def execute(self, *args):
+        if self._unit_exists() and self.firstboot == FIRSTBOOT_RECONFIG:
             # write the reconfig trigger file
             f = open(os.path.join(util.getSysroot(), "etc/reconfigSys"), "w+")
             f.close()
 
         if self.firstboot == FIRSTBOOT_SKIP:
-            action = util.disable_service
             # Also tell the screen access manager, so that the fact that post installation tools
             # should be disabled propagates to the user interaction config file.
             screen_access.sam.post_install_tools_disabled = True
 
-        # enable/disable the Initial Setup service (if its unit is installed)
-        if unit_exists:
-            action(unit_name)
-
 class Group(commands.group.F12_Group):
     def execute(self, storage, ksdata, instClass, users):
-        for grp in self.groupList:
-            kwargs = grp.__dict__
-            kwargs.update({"root": util.getSysroot()})
-            try:
-                users.createGroup(grp.name, **kwargs)
-            except ValueError as e:
-                group_log.warning(str(e))
+        groups = [(grp.name, grp.__dict__) for grp in self.groupList]
+
+        for e in users.createAccounts(groups=groups, root=util.getSysroot()):
+            group_log.warning(str(e))
 
 class IgnoreDisk(commands.ignoredisk.F14_IgnoreDisk):
     def parse(self, args):
@@ -1795,16 +1803,23 @@ class SELinux(commands.selinux.FC3_SELinux):
 
 class Services(commands.services.FC6_Services):
     def execute(self, storage, ksdata, instClass):
-        for svc in self.disabled:
-            util.disable_service(svc)
+        enabled = list(self.enabled)
+        disabled = list(self.disabled)
+
+        # The services command overrides the first boot configuration.
+        firstboot_enabled, firstboot_disabled = ksdata.firstboot.get_services()
+        enabled += [svc for svc in firstboot_enabled if svc not in disabled + enabled]
+        disabled += [svc for svc in firstboot_disabled if svc not in disabled + enabled]
 
-        for svc in self.enabled:
-            util.enable_service(svc)
+        util.configure_services(enabled=enabled, disabled=disabled)
 
 class SshKey(commands.sshkey.F22_SshKey):
     def execute(self, storage, ksdata, instClass, users):
-        for usr in self.sshUserList:
-            users.setUserSshKey(usr.username, usr.key)
+        ssh_keys = [(usr.username, usr.key) for usr in self.sshUserList]
+
+        errors = users.createAccounts(ssh_keys=ssh_keys, root=util.getSysroot())
+        if errors:
+            raise errors[0]
 
 class Timezone(commands.timezone.F25_Timezone):
     def __init__(self, *args):
@@ -1871,20 +1886,21 @@ class Timezone(commands.timezone.F25_Timezone):
 class User(commands.user.F24_User):
     def execute(self, storage, ksdata, instClass, users):
         algo = getPassAlgo(ksdata.authconfig.authconfig)
+        user_list = []
 
         for usr in self.userList:
-            kwargs = usr.__dict__
-            kwargs.update({"algo": algo, "root": util.getSysroot()})
+            kwargs = dict(usr.__dict__, algo=algo)
 
             # If the user password came from a kickstart and it is blank we
             # need to make sure the account is locked, not created with an
             # empty password.
             if ksdata.user.seen and kwargs.get("password", "") == "":
                 kwargs["password"] = None
-            try:
-                users.createUser(usr.name, **kwargs)
-            except ValueError as e:
-                user_log.warning(str(e))
+
+            user_list.append((usr.name, kwargs))
+
+        for e in users.createAccounts(users=user_list, root=util.getSysroot()):
+            user_log.warning(str(e))
 
 class VolGroup(commands.volgroup.F21_VolGroup):
     def execute(self, storage, ksdata, instClass):
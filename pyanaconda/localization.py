@@ -18,6 +18,7 @@
 #
 
 import gettext
+import json
 import os
 import re
 import langtable
@@ -35,6 +36,15 @@ log = get_module_logger(__name__)
 
 LOCALE_CONF_FILE_PATH = "/etc/locale.conf"
 
+# the index of the localization data created on the first use
+LOCALIZATION_INDEX_FILE_PATH = "/tmp/anaconda-localization-index.json"
+LOCALIZATION_INDEX_VERSION = 1
+
+# the localization data of a langcode
+LocalizationEntry = namedtuple("LocalizationEntry", ["english_name", "native_name", "locales",
+                                                     "keyboards", "timezones", "console_fonts",
+                                                     "scripts"])
+
 SCRIPTS_SUPPORTED_BY_CONSOLE = {'Latn', 'Cyrl', 'Grek'}
 
 #e.g. 'SR_RS.UTF-8@latin'
@@ -76,6 +86,194 @@ def parse_langcode(langcode):
     else:
         return None
 
+def _get_index_key(parts):
+    """Return a key of the localization index for the parsed langcode."""
+    key = parts["language"]
+
+    if parts.get("territory"):
+        key += "_" + parts["territory"]
+
+    if parts.get("script"):
+        key += "@" + parts["script"]
+
+    return key
+
+def _query_langtable(parts):
+    """Query langtable for the localization data of the parsed langcode.
+
+    :return: an instance of LocalizationEntry
+    """
+    query = {"languageId": parts["language"],
+             "territoryId": parts.get("territory", ""),
+             "scriptId": parts.get("script", "")}
+
+    english_name = langtable.language_name(languageIdQuery="en", **query)
+    native_name = langtable.language_name(languageIdQuery=parts["language"],
+                                          territoryIdQuery=parts.get("territory", ""),
+                                          scriptIdQuery=parts.get("script", ""),
+                                          **query)
+
+    return LocalizationEntry(english_name=english_name,
+                             native_name=native_name,
+                             locales=langtable.list_locales(**query),
+                             keyboards=langtable.list_keyboards(**query),
+                             timezones=langtable.list_timezones(**query),
+                             console_fonts=langtable.list_consolefonts(**query),
+                             scripts=langtable.list_scripts(**query))
+
+def _get_langtable_version():
+    """Return the version of langtable or an empty string if unknown."""
+    version = getattr(langtable, "version", "")
+    return str(version() if callable(version) else version)
+
+class LocalizationIndex(object):
+    """Index of the localization data from langtable.
+
+    The index maps langcodes without encoding (e.g. 'sr_RS@latin') to
+    their localization data. It contains the languages of the available
+    translations and all their locales and it is stored in a file, so it
+    is created only once in the installation environment. The langcodes
+    that are not indexed are looked up in langtable and kept in memory.
+    """
+
+    def __init__(self, path=LOCALIZATION_INDEX_FILE_PATH):
+        """Create a new index.
+
+        :param str path: a path to the file with the index
+        """
+        self._path = path
+        self._loaded = False
+        self._languages = set()
+        self._entries = {}
+        self._territories = {}
+
+    @property
+    def languages(self):
+        """A set of the indexed languages."""
+        self._load()
+        return set(self._languages)
+
+    def _load(self):
+        """Load the index from the file if it wasn't loaded yet."""
+        if self._loaded:
+            return
+
+        self._loaded = True
+
+        try:
+            with open(self._path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning("Failed to load the localization index: %s", e)
+            return
+
+        if data.get("version") != LOCALIZATION_INDEX_VERSION \
+                or data.get("langtable") != _get_langtable_version():
+            log.debug("The localization index %s is outdated.", self._path)
+            return
+
+        self._languages = set(data["languages"])
+        self._entries = {key: LocalizationEntry(*values)
+                         for key, values in data["entries"].items()}
+        self._territories = data["territories"]
+
+    def _write(self):
+        """Write the index to the file."""
+        data = {
+            "version": LOCALIZATION_INDEX_VERSION,
+            "langtable": _get_langtable_version(),
+            "languages": sorted(self._languages),
+            "entries": {key: list(entry) for key, entry in self._entries.items()
+                        if key.split("_")[0].split("@")[0] in self._languages},
+            "territories": self._territories
+        }
+
+        # Replace the file at once, other processes might read it.
+        tmp_path = self._path + ".tmp"
+
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            log.warning("Failed to write the localization index: %s", e)
+
+    def add_languages(self, languages):
+        """Index the languages and all their locales.
+
+        The index is written to the file if it has changed.
+
+        :param languages: a list of languages (e.g. 'cs', 'en', 'sr')
+        """
+        self._load()
+        missing = set(languages) - self._languages
+
+        if not missing:
+            return
+
+        log.debug("Indexing localization data of %s.", ", ".join(sorted(missing)))
+
+        for language in missing:
+            entry = self._add_entry(parse_langcode(language))
+
+            for locale in entry.locales:
+                parts = parse_langcode(locale)
+                self._add_entry(parts)
+
+                territory = parts.get("territory")
+                if territory and territory not in self._territories:
+                    self._territories[territory] = langtable.list_locales(territoryId=territory)
+
+        self._languages.update(missing)
+        self._write()
+
+    def _add_entry(self, parts):
+        """Add an entry of the parsed langcode to the index."""
+        key = _get_index_key(parts)
+
+        if key not in self._entries:
+            self._entries[key] = _query_langtable(parts)
+
+        return self._entries[key]
+
+    def get_entry(self, parts):
+        """Get the localization data of the parsed langcode.
+
+        :param parts: a dictionary returned by parse_langcode
+        :return: an instance of LocalizationEntry
+        """
+        self._load()
+        return self._add_entry(parts)
+
+    def get_territory_locales(self, territory):
+        """Get the locales of the territory.
+
+        :param str territory: a territory (e.g. 'CZ')
+        :return: a list of locales
+        """
+        self._load()
+
+        if territory not in self._territories:
+            self._territories[territory] = langtable.list_locales(territoryId=territory)
+
+        return self._territories[territory]
+
+# the localization index of this process
+_index = LocalizationIndex()
+
+def _get_locale_entry(locale, what="locale"):
+    """Get the localization data of the locale from the index.
+
+    :raise InvalidLocaleSpec: if an invalid locale is given (see LANGCODE_RE)
+    """
+    parts = parse_langcode(locale)
+    if not parts or "language" not in parts:
+        raise InvalidLocaleSpec("'%s' is not a valid %s" % (locale, what))
+
+    return _index.get_entry(parts)
+
 def is_supported_locale(locale):
     """
     Function that tells if the given locale is supported by the Anaconda or
@@ -313,15 +511,7 @@ def get_english_name(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    name = langtable.language_name(languageId=parts["language"],
-                                   territoryId=parts.get("territory", ""),
-                                   scriptId=parts.get("script", ""),
-                                   languageIdQuery="en")
-
+    name = _get_locale_entry(locale).english_name
     return upcase_first_letter(name)
 
 def get_native_name(locale):
@@ -336,17 +526,7 @@ def get_native_name(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    name = langtable.language_name(languageId=parts["language"],
-                                   territoryId=parts.get("territory", ""),
-                                   scriptId=parts.get("script", ""),
-                                   languageIdQuery=parts["language"],
-                                   territoryIdQuery=parts.get("territory", ""),
-                                   scriptIdQuery=parts.get("script", ""))
-
+    name = _get_locale_entry(locale).native_name
     return upcase_first_letter(name)
 
 def get_available_translations(localedir=None):
@@ -367,19 +547,24 @@ def get_available_translations(localedir=None):
                           ["blob/en/blob/blob"])
     trans_gen = (path.split(os.path.sep)[-3] for path in messagefiles)
 
-    langs = set()
+    langs = []
 
     for trans in trans_gen:
         parts = parse_langcode(trans)
         lang = parts.get("language", "")
         if lang and lang not in langs:
-            langs.add(lang)
-            # check if there are any locales for the language
-            locales = get_language_locales(lang)
-            if not locales:
-                continue
+            langs.append(lang)
 
-            yield lang
+    # index the localization data of all languages at once
+    _index.add_languages(langs)
+
+    for lang in langs:
+        # check if there are any locales for the language
+        locales = get_language_locales(lang)
+        if not locales:
+            continue
+
+        yield lang
 
 def get_language_locales(lang):
     """
@@ -393,13 +578,7 @@ def get_language_locales(lang):
 
     """
 
-    parts = parse_langcode(lang)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid language" % lang)
-
-    return langtable.list_locales(languageId=parts["language"],
-                                  territoryId=parts.get("territory", ""),
-                                  scriptId=parts.get("script", ""))
+    return _get_locale_entry(lang, "language").locales
 
 def get_territory_locales(territory):
     """
@@ -414,7 +593,7 @@ def get_territory_locales(territory):
 
     """
 
-    return langtable.list_locales(territoryId=territory)
+    return _index.get_territory_locales(territory)
 
 def get_locale_keyboards(locale):
     """
@@ -428,13 +607,7 @@ def get_locale_keyboards(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    return langtable.list_keyboards(languageId=parts["language"],
-                                    territoryId=parts.get("territory", ""),
-                                    scriptId=parts.get("script", ""))
+    return _get_locale_entry(locale).keyboards
 
 def get_locale_timezones(locale):
     """
@@ -448,13 +621,7 @@ def get_locale_timezones(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    return langtable.list_timezones(languageId=parts["language"],
-                                    territoryId=parts.get("territory", ""),
-                                    scriptId=parts.get("script", ""))
+    return _get_locale_entry(locale).timezones
 
 def get_locale_territory(locale):
     """
@@ -485,13 +652,7 @@ def get_locale_console_fonts(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    return langtable.list_consolefonts(languageId=parts["language"],
-                                       territoryId=parts.get("territory", ""),
-                                       scriptId=parts.get("script", ""))
+    return _get_locale_entry(locale).console_fonts
 
 def get_locale_scripts(locale):
     """
@@ -505,13 +666,7 @@ def get_locale_scripts(locale):
 
     """
 
-    parts = parse_langcode(locale)
-    if "language" not in parts:
-        raise InvalidLocaleSpec("'%s' is not a valid locale" % locale)
-
-    return langtable.list_scripts(languageId=parts["language"],
-                                  territoryId=parts.get("territory", ""),
-                                  scriptId=parts.get("script", ""))
+    return _get_locale_entry(locale).scripts
 
 def get_xlated_timezone(tz_spec_part):
     """
@@ -56,6 +56,14 @@ class Boss(BaseModule):
         """Set up the kickstart manager."""
         modules = self._module_manager.module_observers
         self._kickstart_manager.module_observers = modules
+        self._kickstart_manager.module_kickstarted.connect(
+            self._module_manager.process_module_kickstarted
+        )
+
+    @property
+    def modules_ready(self):
+        """Signal that emits when the startup of modules has finished."""
+        return self._module_manager.modules_ready
 
     def publish(self):
         """Publish the boss."""
@@ -90,6 +98,24 @@ class Boss(BaseModule):
         """
         return self._module_manager.check_modules_availability()
 
+    @property
+    def modules_startup_finished(self):
+        """Has the startup of modules finished?
+
+        FIXME: This is a temporary method, because it provides
+        an implementation to the AnacondaBossInterface.
+        """
+        return self._module_manager.startup_finished
+
+    @property
+    def modules_startup_metrics(self):
+        """Return the startup latencies of modules.
+
+        FIXME: This is a temporary method, because it provides
+        an implementation to the AnacondaBossInterface.
+        """
+        return self._module_manager.startup_metrics
+
     @property
     def unprocessed_kickstart(self):
         """Return an unprocessed part of a kickstart.
@@ -18,7 +18,7 @@
 # Red Hat, Inc.
 #
 
-from pyanaconda.dbus.interface import dbus_interface
+from pyanaconda.dbus.interface import dbus_interface, dbus_signal
 from pyanaconda.dbus.constants import DBUS_BOSS_NAME, DBUS_BOSS_ANACONDA_NAME
 from pyanaconda.dbus.template import InterfaceTemplate
 from pyanaconda.dbus.typing import *  # pylint: disable=wildcard-import
@@ -40,11 +40,44 @@ class AnacondaBossInterface(BossInterface):
     Used for synchronization with anaconda during transition.
     """
 
+    def connect_signals(self):
+        """Connect signals of this interface with the implementation."""
+        super().connect_signals()
+        self.implementation.modules_ready.connect(self.ModulesReady)
+
     @property
     def AllModulesAvailable(self) -> Bool:
         """Returns true if all modules are available."""
         return self.implementation.all_modules_available
 
+    @property
+    def ModulesStartupFinished(self) -> Bool:
+        """Returns true if the startup of modules has finished.
+
+        The startup is finished when all modules reply to a ping
+        or when the startup deadline passes.
+        """
+        return self.implementation.modules_startup_finished
+
+    @property
+    def ModulesStartupMetrics(self) -> Dict[Str, Dict[Str, Double]]:
+        """Returns the startup latencies of modules.
+
+        The latencies are in seconds since the start of all modules.
+        The events are activation, ping and kickstart.
+
+        :returns: a dictionary of service names and dictionaries of latencies
+        """
+        return self.implementation.modules_startup_metrics
+
+    @dbus_signal
+    def ModulesReady(self, ready: Bool):
+        """Signal emits when the startup of modules has finished.
+
+        :param ready: True if all modules are ready, otherwise False
+        """
+        pass
+
     @property
     def UnprocessedKickstart(self) -> Str:
         """Returns kickstart containing parts that are not handled by any module."""
@@ -58,9 +91,11 @@ class AnacondaBossInterface(BossInterface):
         self.implementation.split_kickstart(path)
 
     def DistributeKickstart(self) -> List[Dict[Str, Variant]]:
-        """Distributes kickstart to modules synchronously.
+        """Distributes kickstart to modules.
 
-        Assumes all modules are started.
+        Assumes all modules are started. The kickstart is sent to
+        all modules at once and the method returns when all of them
+        reply or time out.
 
         :returns: list of kickstart errors
         """
@@ -19,6 +19,9 @@
 
 from pydbus.error import map_error
 
+from pyanaconda.core.constants import KICKSTART_DISTRIBUTION_TIMEOUT
+from pyanaconda.core.glib import create_new_context
+from pyanaconda.core.signal import Signal
 from pyanaconda.dbus.constants import DBUS_BOSS_ANACONDA_NAME
 
 from pyanaconda.kickstart_dispatcher.parser import SplitKickstartParser, VALID_SECTIONS_ANACONDA
@@ -56,6 +59,16 @@ class KickstartManager(object):
         self._kickstart_path = None
         self._elements = None
         self._module_observers = []
+        self._handled_elements = {}
+        self._module_kickstarted = Signal()
+
+    @property
+    def module_kickstarted(self):
+        """Signal that emits when a module has read its kickstart.
+
+        The signal emits the observer of the module.
+        """
+        return self._module_kickstarted
 
     @property
     def module_observers(self):
@@ -96,24 +109,48 @@ class KickstartManager(object):
         log.info("split %s: %s", path, result)
         self._elements = result
 
-    def distribute(self):
-        """Distribute split kickstart to modules synchronously.
+    def _get_handled_elements(self, observer):
+        """Get the kickstart elements handled by the module.
+
+        The elements are read from the module only once and then cached,
+        because they don't change while the module is running.
+
+        :param observer: a module observer
+        :returns: a tuple of commands, sections and addons
+        """
+        name = observer.service_name
+
+        if name not in self._handled_elements:
+            proxy = observer.proxy
+            self._handled_elements[name] = (proxy.KickstartCommands,
+                                            proxy.KickstartSections,
+                                            proxy.KickstartAddons)
+
+        return self._handled_elements[name]
 
+    def distribute(self, timeout=KICKSTART_DISTRIBUTION_TIMEOUT):
+        """Distribute split kickstart to modules.
+
+        The kickstart is sent to all available modules at once and then
+        we wait for their replies. A module that doesn't reply in time
+        is reported as an error.
+
+        :param timeout: a timeout of the replies in seconds
         :returns: list of (Line number, Message) errors reported by modules when
                   distributing kickstart
         :rtype: list((int, str))
         """
+        requests = []
         errors = []
 
         for observer in self._module_observers:
 
             if not observer.is_service_available:
                 log.warning("distribute kickstart: module %s not available", observer.service_name)
+                self._handled_elements.pop(observer.service_name, None)
                 continue
 
-            commands = observer.proxy.KickstartCommands
-            sections = observer.proxy.KickstartSections
-            addons = observer.proxy.KickstartAddons
+            commands, sections, addons = self._get_handled_elements(observer)
             log.info("distribute kickstart: %s handles commands %s sections %s addons %s",
                      observer.service_name, commands, sections, addons)
 
@@ -124,9 +161,25 @@ class KickstartManager(object):
             log.info("distribute kickstart: %s will get kickstart elements: %s",
                      observer.service_name, elements)
 
-            result = observer.proxy.ReadKickstart(kickstart)
+            requests.append((observer, elements, kickstart))
+
+        replies = self._read_kickstarts(requests, timeout)
 
-            if not result["success"]:
+        for (observer, elements, _kickstart), (result, error) in zip(requests, replies):
+
+            if error:
+                result = {
+                    "success": False,
+                    "error_message": str(error),
+                    "line_number": 0,
+                    "file_name": self._kickstart_path,
+                    "module_name": observer.service_name
+                }
+
+                log.error("distribute kickstart: %s", result)
+                errors.append(result)
+
+            elif not result["success"]:
                 line_references = self._elements.get_references_from_elements(elements)
                 line_number, file_name = line_references[result["line_number"]]
                 result["line_number"] = line_number
@@ -138,6 +191,43 @@ class KickstartManager(object):
 
         return errors
 
+    def _read_kickstarts(self, requests, timeout):
+        """Call ReadKickstart of the modules and wait for their replies.
+
+        The calls are asynchronous and their replies are dispatched
+        in a private main context, so the main loop of the boss can't
+        run anything else in the meantime.
+
+        :param requests: a list of (observer, elements, kickstart)
+        :param timeout: a timeout of the calls in seconds
+        :returns: a list of (result, error) in the order of requests
+        """
+        replies = [None] * len(requests)
+        context = create_new_context()
+        context.push_thread_default()
+
+        try:
+            for index, (observer, _elements, kickstart) in enumerate(requests):
+                observer.proxy.ReadKickstart(kickstart,
+                                             callback=self._read_kickstart_callback,
+                                             callback_args=(replies, index, observer),
+                                             timeout=timeout)
+
+            # Every call fails with an error at the latest after the timeout.
+            while None in replies:
+                context.iteration(True)
+        finally:
+            context.pop_thread_default()
+
+        return replies
+
+    def _read_kickstart_callback(self, replies, index, observer, returned, error):
+        """Callback for ReadKickstart."""
+        replies[index] = (returned, error)
+
+        if not error:
+            self._module_kickstarted.emit(observer)
+
     def collect(self):
         """Collect kickstarts from configured modules."""
         pass
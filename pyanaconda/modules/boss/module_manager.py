@@ -16,8 +16,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
+import time
+
 from pydbus.auto_names import auto_object_path
 
+from pyanaconda.core.constants import MODULES_STARTUP_TIMEOUT
+from pyanaconda.core.glib import timeout_add_seconds, source_remove
+from pyanaconda.core.signal import Signal
 from pyanaconda.dbus import DBus
 from pyanaconda.dbus.constants import ANACONDA_MODULES, DBUS_START_REPLY_SUCCESS, \
     DBUS_ADDON_NAMESPACE, DBUS_FLAG_NONE
@@ -28,16 +33,66 @@ log = get_module_logger(__name__)
 
 
 class ModuleManager(object):
-    """A class for managing kickstart modules."""
+    """A class for managing kickstart modules.
+
+    The modules are started in parallel. The modules_ready signal is
+    emitted once all modules reply to a ping or the startup deadline
+    passes, whatever comes first. The startup of every module is timed
+    relative to the start of all modules:
+
+        activation  the service was started by DBus
+        ping        the module replied to the first ping
+        kickstart   the module has read its part of the kickstart
+    """
 
     def __init__(self):
         self._module_observers = []
+        self._modules_ready = Signal()
+        self._startup_finished = False
+        self._startup_time = None
+        self._startup_metrics = {}
+        self._deadline_id = None
 
     @property
     def module_observers(self):
         """Return the modules observers."""
         return self._module_observers
 
+    @property
+    def modules_ready(self):
+        """Signal that emits when the startup of modules has finished.
+
+        The signal emits True if all modules are ready, otherwise False.
+        """
+        return self._modules_ready
+
+    @property
+    def startup_finished(self):
+        """Has the startup of modules finished?
+
+        The startup is finished when all modules are ready or
+        when the startup deadline has passed.
+        """
+        return self._startup_finished
+
+    @property
+    def startup_metrics(self):
+        """Return the startup latencies of the modules.
+
+        :returns: a dictionary of service names and dictionaries
+                  of event names and latencies in seconds
+        """
+        return {name: dict(metrics) for name, metrics in self._startup_metrics.items()}
+
+    def _record_startup_event(self, observer, event):
+        """Record the latency of the startup event of the module."""
+        if self._startup_time is None:
+            return
+
+        latency = time.monotonic() - self._startup_time
+        self._startup_metrics.setdefault(observer.service_name, {}).setdefault(event, latency)
+        log.debug("%s: %s after %.3f s", observer, event, latency)
+
     def add_module(self, service_name, module_path):
         """Add module to manage."""
         observer = DBusObjectObserver(service_name, module_path)
@@ -57,11 +112,19 @@ class ModuleManager(object):
             if name.startswith(DBUS_ADDON_NAMESPACE):
                 self.add_module(name, auto_object_path(name))
 
-    def start_modules(self):
-        """Start anaconda modules (including addons)."""
+    def start_modules(self, timeout=MODULES_STARTUP_TIMEOUT):
+        """Start anaconda modules (including addons).
+
+        :param timeout: the startup deadline in seconds
+        """
         log.debug("Start modules.")
         dbus = DBus.get_dbus_proxy()
 
+        self._startup_finished = False
+        self._startup_time = time.monotonic()
+        self._startup_metrics = {}
+        self._deadline_id = timeout_add_seconds(timeout, self._startup_deadline_callback)
+
         for observer in self.module_observers:
             log.debug("Starting %s", observer)
             dbus.StartServiceByName(observer.service_name,
@@ -80,18 +143,61 @@ class ModuleManager(object):
             log.error("Service %s failed to start: %s", service, error)
             return
 
+        self._record_startup_event(service, "activation")
+
         if returned != DBUS_START_REPLY_SUCCESS:
             log.warning("Service %s is already running.", service)
         else:
             log.debug("Service %s started successfully.", service)
 
-        if self.check_modules_availability():
-            log.info("All modules are ready now.")
-
     def _process_module_is_available(self, observer):
         """Process the service_available signal."""
         log.debug("%s is available", observer)
-        observer.proxy.Ping()
+        observer.proxy.Ping(callback=self._ping_module_callback,
+                            callback_args=(observer,))
+
+    def _ping_module_callback(self, observer, returned, error):
+        """Callback for the first ping of the module."""
+        if error:
+            log.error("%s failed to reply to ping: %s", observer, error)
+            return
+
+        self._record_startup_event(observer, "ping")
+
+        if not self._startup_finished and self.check_modules_readiness():
+            log.info("All modules are ready now.")
+            self._finish_startup(True)
+
+    def _startup_deadline_callback(self):
+        """Callback for the startup deadline."""
+        self._deadline_id = None
+
+        if not self._startup_finished:
+            late = [o.service_name for o in self.module_observers
+                    if "ping" not in self._startup_metrics.get(o.service_name, {})]
+            log.warning("Modules are not ready after the startup deadline: %s", ", ".join(late))
+            self._finish_startup(False)
+
+        return False
+
+    def _finish_startup(self, ready):
+        """Finish the startup of modules."""
+        if self._deadline_id is not None:
+            source_remove(self._deadline_id)
+            self._deadline_id = None
+
+        self._startup_finished = True
+
+        for name, metrics in sorted(self._startup_metrics.items(),
+                                    key=lambda item: -max(item[1].values())):
+            log.info("Startup of %s: %s", name,
+                     ", ".join("{} {:.3f} s".format(*item) for item in sorted(metrics.items())))
+
+        self._modules_ready.emit(ready)
+
+    def process_module_kickstarted(self, observer):
+        """Record that the module has read its kickstart."""
+        self._record_startup_event(observer, "kickstart")
 
     def _process_module_is_unavailable(self, observer):
         """Process the service_unavailable signal."""
@@ -108,6 +214,22 @@ class ModuleManager(object):
 
         return True
 
+    def check_modules_readiness(self):
+        """Check if all modules are ready.
+
+        The module is ready if it is available and has replied to a ping.
+
+        :returns: True if all modules are ready, otherwise False
+        """
+        for observer in self.module_observers:
+            if not observer.is_service_available:
+                return False
+
+            if "ping" not in self._startup_metrics.get(observer.service_name, {}):
+                return False
+
+        return True
+
     def stop_modules(self):
         """Tell all running modules to quit."""
         log.debug("Stop modules.")
@@ -242,6 +242,8 @@ class IfcfgFile(SimpleConfigFile):
             ifcfglog.debug("IfcfgFile.write %s:\n%s", self.filename, self.__str__())
             SimpleConfigFile.write(self, filename, use_tmp=use_tmp)
             self._dirty = False
+            # NM may reload the connection from the file.
+            nm.nm_invalidate_settings()
 
     def set(self, *args):
         for (key, data) in args:
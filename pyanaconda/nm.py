@@ -24,8 +24,10 @@ gi.require_version("NM", "1.0")
 from gi.repository import Gio
 from gi.repository import NM
 from pyanaconda.core.glib import GError, Variant, VariantType
+from collections import OrderedDict
 import struct
 import socket
+import threading
 
 from pyanaconda.anaconda_loggers import get_module_logger
 log = get_module_logger(__name__)
@@ -43,6 +45,9 @@ supported_device_types = [
     NM.DeviceType.TEAM,
 ]
 
+# maximal number of kept D-Bus proxies
+PROXY_POOL_SIZE = 128
+
 class UnknownDeviceError(ValueError):
     """Device of specified name was not found by NM"""
     def __str__(self):
@@ -93,13 +98,51 @@ class AddConnectionError(Exception):
 class BondOptionsError(AddConnectionError):
     pass
 
-def _get_proxy(bus_type=Gio.BusType.SYSTEM,
-               proxy_flags=Gio.DBusProxyFlags.NONE,
-               info=None,
-               name="org.freedesktop.NetworkManager",
-               object_path="/org/freedesktop/NetworkManager",
-               interface_name="org.freedesktop.NetworkManager",
-               cancellable=None):
+class ProxyPool(object):
+    """Pool of D-Bus proxies of NM objects.
+
+    Creating a proxy costs a round trip to the bus, so the proxies
+    are created once for every object and interface and reused.
+    The least recently used proxies are dropped if the pool is full.
+    """
+
+    def __init__(self, size=PROXY_POOL_SIZE):
+        self._size = size
+        self._proxies = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """Return a proxy for the key.
+
+        :param key: a hashable identification of the proxy
+        :param create: a function that creates a new proxy
+        :return: a proxy or None if the proxy couldn't be created
+        """
+        with self._lock:
+            proxy = self._proxies.get(key)
+            if proxy:
+                self._proxies.move_to_end(key)
+                return proxy
+
+        proxy = create()
+        if not proxy:
+            return None
+
+        with self._lock:
+            self._proxies[key] = proxy
+            while len(self._proxies) > self._size:
+                self._proxies.popitem(last=False)
+
+        return proxy
+
+    def clear(self):
+        """Drop all proxies."""
+        with self._lock:
+            self._proxies.clear()
+
+_proxy_pool = ProxyPool()
+
+def _create_proxy(bus_type, proxy_flags, info, name, object_path, interface_name, cancellable):
     try:
         proxy = Gio.DBusProxy.new_for_bus_sync(bus_type,
                                                proxy_flags,
@@ -117,6 +160,22 @@ def _get_proxy(bus_type=Gio.BusType.SYSTEM,
 
     return proxy
 
+def _get_proxy(bus_type=Gio.BusType.SYSTEM,
+               proxy_flags=Gio.DBusProxyFlags.DO_NOT_LOAD_PROPERTIES |
+               Gio.DBusProxyFlags.DO_NOT_CONNECT_SIGNALS,
+               info=None,
+               name="org.freedesktop.NetworkManager",
+               object_path="/org/freedesktop/NetworkManager",
+               interface_name="org.freedesktop.NetworkManager",
+               cancellable=None):
+    if info or cancellable:
+        return _create_proxy(bus_type, proxy_flags, info, name, object_path,
+                             interface_name, cancellable)
+
+    key = (bus_type, proxy_flags, name, object_path, interface_name)
+    return _proxy_pool.get(key, lambda: _create_proxy(bus_type, proxy_flags, None, name,
+                                                      object_path, interface_name, None))
+
 def _get_property(object_path, prop, interface_name_suffix=""):
     interface_name = "org.freedesktop.NetworkManager" + interface_name_suffix
     proxy = _get_proxy(object_path=object_path, interface_name="org.freedesktop.DBus.Properties")
@@ -640,6 +699,208 @@ def nm_ntp_servers_from_dhcp():
         # NetworkManager does not request NTP/SNTP options for DHCP6
     return ntp_servers
 
+def _identity(value):
+    return value
+
+def _format_hwaddr(value):
+    return ":".join("%02X" % b for b in value)
+
+class SettingsCache(object):
+    """Cache of settings of NM connections.
+
+    The settings of every connection are read only once and the
+    connections are indexed by values of the looked up keys. The list
+    of connections is checked on every lookup, and the settings of a
+    connection are read again after NM signals that it was updated or
+    after anaconda has updated it.
+    """
+
+    # format functions of values that can be indexed
+    indexed_formats = (_identity, _format_hwaddr)
+
+    def __init__(self):
+        self._settings = OrderedDict()
+        self._indexes = {}
+        self._generation = 0
+        self._subscribed = False
+        self._lock = threading.RLock()
+
+    def invalidate(self, path=None):
+        """Forget the settings of the connection or of all connections.
+
+        :param path: an object path of the connection or None
+        """
+        with self._lock:
+            if path is None:
+                self._settings.clear()
+            else:
+                self._settings.pop(path, None)
+
+            self._indexes.clear()
+            self._generation += 1
+
+    def _subscribe(self):
+        """Invalidate the settings on signals of NM."""
+        with self._lock:
+            if self._subscribed:
+                return
+
+            try:
+                connection = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+            except GError as e:
+                log.debug("Failed to subscribe to NM signals: %s", e)
+                return
+
+            connection.signal_subscribe("org.freedesktop.NetworkManager",
+                                        "org.freedesktop.NetworkManager.Settings.Connection",
+                                        None, None, None, Gio.DBusSignalFlags.NONE,
+                                        self._connection_changed)
+            connection.signal_subscribe("org.freedesktop.NetworkManager",
+                                        "org.freedesktop.NetworkManager.Settings",
+                                        None, "/org/freedesktop/NetworkManager/Settings", None,
+                                        Gio.DBusSignalFlags.NONE,
+                                        self._settings_changed)
+            self._subscribed = True
+
+    def _connection_changed(self, connection, sender, path, interface, signal, parameters):
+        if signal in ("Updated", "Removed"):
+            self.invalidate(path)
+
+    def _settings_changed(self, connection, sender, path, interface, signal, parameters):
+        if signal in ("NewConnection", "ConnectionRemoved"):
+            self.invalidate(parameters.unpack()[0])
+
+    def _read_settings(self, path):
+        proxy = _get_proxy(object_path=path,
+                           interface_name="org.freedesktop.NetworkManager.Settings.Connection")
+        try:
+            return proxy.GetSettings()
+        except GError as e:
+            # The connection may be deleted asynchronously by NM
+            log.debug("Failed to get settings of %s: %s", path, e)
+            return None
+
+    def _update(self):
+        """Update the settings to match the current connections.
+
+        :return: a generation and an ordered dictionary of paths and settings
+        """
+        self._subscribe()
+
+        proxy = _get_proxy(object_path="/org/freedesktop/NetworkManager/Settings",
+                           interface_name="org.freedesktop.NetworkManager.Settings")
+        paths = proxy.ListConnections()
+
+        with self._lock:
+            missing = [path for path in paths if path not in self._settings]
+            generation = self._generation
+
+        read = [(path, self._read_settings(path)) for path in missing]
+
+        with self._lock:
+            if generation != self._generation:
+                # The cache has been invalidated meanwhile, so use the read
+                # settings only for this lookup.
+                read = dict(read)
+                snapshot = OrderedDict()
+                for path in paths:
+                    settings = self._settings.get(path) or read.get(path)
+                    if settings is not None:
+                        snapshot[path] = settings
+                return None, snapshot
+
+            removed = set(self._settings) - set(paths)
+            for path in removed:
+                del self._settings[path]
+
+            for path, settings in read:
+                if settings is not None:
+                    self._settings[path] = settings
+
+            if removed or any(settings is not None for _path, settings in read):
+                self._indexes.clear()
+                self._generation += 1
+
+            snapshot = OrderedDict((path, self._settings[path])
+                                   for path in paths if path in self._settings)
+            return self._generation, snapshot
+
+    def get(self, path):
+        """Return settings of the connection.
+
+        :param path: an object path of the connection
+        :return: settings or None if the connection doesn't exist
+        """
+        with self._lock:
+            settings = self._settings.get(path)
+
+        if settings is None:
+            settings = self._read_settings(path)
+
+        return settings
+
+    def get_all(self):
+        """Return settings of all connections.
+
+        :return: an ordered dictionary of object paths and settings
+        """
+        _generation, snapshot = self._update()
+        return snapshot
+
+    def find(self, value, key1, key2, format_value=_identity):
+        """Return object paths of connections with the value of the setting.
+
+        :param value: required value of the setting
+        :param key1: first-level key of the setting (eg "connection")
+        :param key2: second-level key of the setting (eg "uuid")
+        :param format_value: function to be called on the setting value
+                             before comparing
+        :return: a list of object paths
+        """
+        generation, snapshot = self._update()
+
+        if format_value in self.indexed_formats:
+            index = self._get_index(generation, snapshot, key1, key2, format_value)
+
+            try:
+                if index is not None:
+                    return list(index.get(value, []))
+            except TypeError:
+                # The value is not hashable.
+                pass
+
+        return [path for path, settings in snapshot.items()
+                if key1 in settings and key2 in settings[key1]
+                and format_value(settings[key1][key2]) == value]
+
+    def _get_index(self, generation, snapshot, key1, key2, format_value):
+        """Return the index of paths by values of the setting.
+
+        :return: a dictionary of values and lists of paths or None
+                 if the values are not hashable
+        """
+        key = (key1, key2, format_value)
+
+        with self._lock:
+            if generation == self._generation and key in self._indexes:
+                return self._indexes[key]
+
+        index = {}
+        try:
+            for path, settings in snapshot.items():
+                if key1 in settings and key2 in settings[key1]:
+                    index.setdefault(format_value(settings[key1][key2]), []).append(path)
+        except TypeError:
+            index = None
+
+        with self._lock:
+            if generation == self._generation:
+                self._indexes[key] = index
+
+        return index
+
+_settings_cache = SettingsCache()
+
 def _is_s390_setting(path):
     """Check if setting of given object path is an s390 setting
 
@@ -649,8 +910,10 @@ def _is_s390_setting(path):
        :rtype: bool
     """
 
-    proxy = _get_proxy(object_path=path, interface_name="org.freedesktop.NetworkManager.Settings.Connection")
-    settings = proxy.GetSettings()
+    settings = _settings_cache.get(path)
+    if settings is None:
+        # The connection has been deleted meanwhile.
+        return False
     return "s390-subchannels" in settings["802-3-ethernet"]
 
 def _device_settings(name):
@@ -712,9 +975,9 @@ def _settings_for_hwaddr(hwaddr):
        :rtype: list
     """
     return _find_settings(hwaddr, '802-3-ethernet', 'mac-address',
-                          format_value=lambda ba: ":".join("%02X" % b for b in ba))
+                          format_value=_format_hwaddr)
 
-def _find_settings(value, key1, key2, format_value=lambda x: x):
+def _find_settings(value, key1, key2, format_value=_identity):
     """Return list of object paths of settings having given value of key1, key2 setting
 
        :param value: required value of setting
@@ -729,28 +992,9 @@ def _find_settings(value, key1, key2, format_value=lambda x: x):
        :return: list of paths of settings
        :rtype: list
     """
-    retval = []
-
-    proxy = _get_proxy(object_path="/org/freedesktop/NetworkManager/Settings", interface_name="org.freedesktop.NetworkManager.Settings")
-
-    connections = proxy.ListConnections()
-    for con in connections:
-        proxy = _get_proxy(object_path=con, interface_name="org.freedesktop.NetworkManager.Settings.Connection")
-        try:
-            settings = proxy.GetSettings()
-        except GError as e:
-            log.debug("Exception raised in _find_settings: %s", e)
-            continue
-        try:
-            v = settings[key1][key2]
-        except KeyError:
-            continue
-        if format_value(v) == value:
-            retval.append(con)
-
-    return retval
+    return _settings_cache.find(value, key1, key2, format_value)
 
-def nm_get_settings(value, key1, key2, format_value=lambda x: x):
+def nm_get_settings(value, key1, key2, format_value=_identity):
     """Return settings having given value of key1, key2 setting
 
        Returns list of settings(dicts) , None if settings were not found.
@@ -758,30 +1002,24 @@ def nm_get_settings(value, key1, key2, format_value=lambda x: x):
     retval = []
     settings_paths = _find_settings(value, key1, key2, format_value)
     for settings_path in settings_paths:
-        proxy = _get_proxy(object_path=settings_path, interface_name="org.freedesktop.NetworkManager.Settings.Connection")
-        settings = proxy.GetSettings()
-        retval.append(settings)
+        settings = _settings_cache.get(settings_path)
+        if settings is not None:
+            retval.append(settings)
 
     return retval
 
 def nm_get_all_settings():
     """Return all settings for logging."""
-    retval = []
-
-    proxy = _get_proxy(object_path="/org/freedesktop/NetworkManager/Settings", interface_name="org.freedesktop.NetworkManager.Settings")
+    return list(_settings_cache.get_all().values())
 
-    connections = proxy.ListConnections()
-    for con in connections:
-        proxy = _get_proxy(object_path=con, interface_name="org.freedesktop.NetworkManager.Settings.Connection")
-        try:
-            settings = proxy.GetSettings()
-        except GError as e:
-            # The connection may be deleted asynchronously by NM
-            log.debug("Exception raised in nm_get_all_settings: %s", e)
-            continue
-        retval.append(settings)
+def nm_invalidate_settings():
+    """Forget the cached settings of all connections.
 
-    return retval
+    Call it after changing configuration files of connections on the
+    runtime system. NM reloads them under the same object paths and its
+    signals are not delivered if no main loop is running.
+    """
+    _settings_cache.invalidate()
 
 def nm_device_setting_value(name, key1, key2):
     """Return value of device's setting specified by key1 and key2.
@@ -807,11 +1045,8 @@ def nm_device_setting_value(name, key1, key2):
         raise MultipleSettingsFoundError(name)
     else:
         settings_path = settings_paths[0]
-    proxy = _get_proxy(object_path=settings_path, interface_name="org.freedesktop.NetworkManager.Settings.Connection")
-    try:
-        settings = proxy.GetSettings()
-    except GError as e:
-        log.debug("nm_device_setting_value: %s", e)
+    settings = _settings_cache.get(settings_path)
+    if settings is None:
         raise SettingsNotFoundError(name)
     try:
         value = settings[key1][key2]
@@ -1029,6 +1264,7 @@ def _update_settings(settings_path, new_values):
                     Gio.DBusCallFlags.NONE,
                     DEFAULT_DBUS_TIMEOUT,
                     None)
+    _settings_cache.invalidate(settings_path)
 
 def _gvariant_settings(settings, updated_key1, updated_key2, value, default_type_str=None):
     """Update setting of updated_key1, updated_key2 of settings object with value.
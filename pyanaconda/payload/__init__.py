@@ -35,6 +35,7 @@ import re
 import functools
 import time
 from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from blivet.size import Size, ROUND_HALF_UP
 
@@ -57,13 +58,16 @@ from pyanaconda.image import findFirstIsoImage
 from pyanaconda.image import mountImage
 from pyanaconda.image import opticalInstallMedia, verifyMedia
 from pyanaconda.core.util import ProxyString, ProxyStringError
+from pyanaconda.core.timeline import timeline
 from pyanaconda.threading import threadMgr, AnacondaThread
 from pyanaconda.core.regexes import VERSION_DIGITS
 
 from pykickstart.parser import Group
 
-from pyanaconda.anaconda_loggers import get_module_logger
+from pyanaconda.anaconda_logging import program_log_lock
+from pyanaconda.anaconda_loggers import get_module_logger, get_program_logger
 log = get_module_logger(__name__)
+program_log = get_program_logger()
 
 from blivet.errors import StorageError
 import blivet.util
@@ -273,6 +277,14 @@ class PayloadRequirements(object):
         else:
             raise PayloadRequirementsMissingApply
 
+    def set_applied(self):
+        """Mark all requirements as applied.
+
+        Use it if the result of the apply() method was restored
+        without calling the callback.
+        """
+        self._apply_called_for_all_requirements = True
+
     @property
     def applied(self):
         """Was all requirements applied?
@@ -850,21 +862,76 @@ class Payload(object):
             log.error("new-kernel-pkg does not exist - grubby wasn't installed?  skipping")
             return
 
-        for kernel in self.kernelVersionList:
-            log.info("recreating initrd for %s", kernel)
-            if not flags.imageInstall:
-                util.execInSysroot("new-kernel-pkg",
-                                   ["--mkinitrd", "--dracut",
-                                    "--depmod", "--update", kernel])
-            else:
-                # hostonly is not sensible for disk image installations
-                # using /dev/disk/by-uuid/ is necessary due to disk image naming
-                util.execInSysroot("dracut",
-                                   ["-N",
-                                     "--persistent-policy", "by-uuid",
-                                     "-f", "/boot/initramfs-%s.img" % kernel,
-                                    kernel])
+        kernels = self.kernelVersionList
+        if not kernels:
+            return
+
+        # The initrds of different kernels don't depend on each other.
+        # Run at least one job even if inst.initramfs-jobs is negative.
+        jobs = max(1, min(len(kernels), flags.initramfs_jobs or os.cpu_count() or 1))
+        log.info("recreating initrds for %s with %d jobs", ", ".join(kernels), jobs)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(self._recreate_initrd, kernels))
+
+        if flags.imageInstall:
+            return
+
+        # Update the boot loader entries one by one, grubby can't
+        # modify the boot loader configuration concurrently.
+        for (kernel, success) in zip(kernels, results):
+            if success:
+                util.execInSysroot("new-kernel-pkg", ["--update", kernel])
+
+    def _recreate_initrd(self, kernel):
+        """Recreate the initrd of the kernel.
+
+        The output of the commands is logged at once when they end, so the
+        output of initrds created in parallel is not mixed in the log.
+
+        :param str kernel: a version of the kernel
+        :returns: True if the initrd was created, otherwise False
+        """
+        log.info("recreating initrd for %s", kernel)
+        output = []
+
+        def handle_line(line):
+            output.append(line)
+            return True
+
+        if not flags.imageInstall:
+            commands = [("depmod", ["-a", kernel]),
+                        ("dracut", ["-f", "/boot/initramfs-%s.img" % kernel, kernel])]
+        else:
+            # hostonly is not sensible for disk image installations
+            # using /dev/disk/by-uuid/ is necessary due to disk image naming
+            commands = [("dracut", ["-N",
+                                    "--persistent-policy", "by-uuid",
+                                    "-f", "/boot/initramfs-%s.img" % kernel,
+                                    kernel])]
+
+        error = None
+        with timeline.phase("Generate initramfs", "initramfs", {"kernel": kernel}):
+            for (command, argv) in commands:
+                try:
+                    rc = util.execInSysroot(command, argv, handle_line=handle_line)
+                except OSError as e:
+                    error = "%s failed: %s" % (command, e)
+                    break
+
+                if rc:
+                    error = "%s exited with code %d" % (command, rc)
+                    break
+
+        with program_log_lock:
+            for line in output:
+                program_log.info("%s: %s", kernel, line)
 
+        if error:
+            log.error("failed to recreate initrd for %s: %s", kernel, error)
+            return False
+
+        return True
 
     def _setDefaultBootTarget(self):
         """Set the default systemd target for the system."""
@@ -27,10 +27,13 @@ from pyanaconda.progress import progressQ, progress_message
 from pyanaconda.core.util import ProxyString, ProxyStringError
 from pyanaconda.core import constants
 from pyanaconda.core import util
+from pyanaconda.core.timeline import timeline
+from pyanaconda.threading import threadMgr, AnacondaThread
 
 import pyanaconda.errors as errors
 import pyanaconda.localization
 import pyanaconda.payload as payload
+from pyanaconda.payload.package_cache import setup_package_cache, PackageCacheError
 
 import configparser
 import collections
@@ -38,10 +41,14 @@ import itertools
 import multiprocessing
 import operator
 import hashlib
+import queue
+import re
 import shutil
+import struct
 import sys
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from requests.exceptions import RequestException
 
 
@@ -62,6 +69,7 @@ DNF_CACHE_DIR = '/tmp/dnf.cache'
 DNF_PLUGINCONF_DIR = '/tmp/dnf.pluginconf'
 DNF_PACKAGE_CACHE_DIR_SUFFIX = 'dnf.package.cache'
 DNF_LIBREPO_LOG = '/tmp/dnf.librepo.log'
+DNF_METADATA_SNAPSHOT_DIR = '/tmp/dnf.metadata.snapshots'
 DOWNLOAD_MPOINTS = {'/tmp',
                     '/',
                     '/var/tmp',
@@ -85,6 +93,41 @@ USER_AGENT = "%s (anaconda)/%s" % (productName, productVersion)
 # 6KiB = 4K(max default fragment size) + 2K(rpm db could be taken for a header file)
 BONUS_SIZE_ON_FILE = Size("6 KiB")
 
+# Preferred number of packages installed by one transaction
+# of the pipelined installation.
+PIPELINE_BATCH_SIZE = 250
+
+# Maximal number of repositories loading their metadata at once.
+METADATA_SYNC_WORKERS = 8
+
+# Maximal number of resolved software selections kept in memory.
+RESOLVED_SELECTIONS_LIMIT = 8
+
+# Events of the transaction progress protocol.
+PROGRESS_INSTALL = 1
+PROGRESS_SCRIPTLET = 2
+PROGRESS_CONFIGURE = 3
+PROGRESS_VERIFY = 4
+PROGRESS_POST = 5
+PROGRESS_DONE = 6
+PROGRESS_ERROR = 7
+PROGRESS_QUIT = 8
+
+# Every event is encoded as the event type, the number of processed
+# packages, the total number of packages and the size of its text.
+PROGRESS_EVENT_HEADER = struct.Struct("!BIII")
+
+# Time in seconds the transaction events are collected before they are sent.
+PROGRESS_BATCH_WINDOW = 0.1
+
+# names of the transaction phases in the installation timeline
+TRANSACTION_PHASES = {
+    'install': "Install packages",
+    'configure': "Run scriptlets",
+    'verify': "Verify packages",
+    'post': "Post transaction",
+}
+
 
 def _failure_limbo():
     progressQ.send_quit(1)
@@ -92,19 +135,39 @@ def _failure_limbo():
         time.sleep(10000)
 
 
+def _unescape_mount_point(path):
+    """Unescape a mount point from /proc/self/mounts."""
+    return re.sub(r'\\([0-7]{3})', lambda match: chr(int(match.group(1), 8)), path)
+
+
 def _df_map():
-    """Return (mountpoint -> size available) mapping."""
-    output = util.execWithCapture('df', ['--output=target,avail'])
-    output = output.rstrip()
-    lines = output.splitlines()
+    """Return (mountpoint -> size available) mapping.
+
+    The mount points are read from /proc/self/mounts and their free space
+    from statvfs, the same way df does it. Pseudo file systems without
+    any blocks are skipped.
+    """
     structured = {}
-    for line in lines:
-        items = line.split()
-        key = items[0]
-        val = items[1]
-        if not key.startswith('/'):
-            continue
-        structured[key] = Size(int(val) * 1024)
+
+    with open("/proc/self/mounts") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+
+            mpoint = _unescape_mount_point(fields[1])
+            if not mpoint.startswith('/') or mpoint in structured:
+                continue
+
+            try:
+                stat = os.statvfs(mpoint)
+            except OSError:
+                continue
+
+            if not stat.f_blocks:
+                continue
+
+            structured[mpoint] = Size(stat.f_frsize * stat.f_bavail)
 
     # Add /var/tmp/ if this is a directory or image installation
     if flags.dirInstall or flags.imageInstall:
@@ -163,12 +226,215 @@ def _pick_mpoint(df, download_size, install_size, download_only):
         return sorted_mpoints[0][0]
 
 
+def _pipeline_batches(dependencies, batch_size):
+    """Split packages into dependency ordered batches.
+
+    Packages are ordered so that every package comes after the packages
+    it requires. Packages that require each other are always kept in the
+    same batch, so a batch never requires packages from the following ones.
+
+    :param dependencies: a dictionary of packages and sets of packages they require
+    :param int batch_size: a preferred number of packages in a batch
+    :returns: a list of lists of packages
+    """
+    # Find strongly connected components with the Tarjan's algorithm.
+    # The components are found in the reversed topological order, so
+    # the required packages are always found before the packages that
+    # require them. Use an explicit stack to avoid the recursion limit.
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in dependencies:
+        if root in index:
+            continue
+
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(dependencies[root]))]
+
+        while work:
+            node, required = work[-1]
+
+            for dep in required:
+                if dep not in dependencies:
+                    continue
+                if dep not in index:
+                    index[dep] = lowlink[dep] = len(index)
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(dependencies[dep])))
+                    break
+                elif dep in on_stack:
+                    lowlink[node] = min(lowlink[node], index[dep])
+            else:
+                work.pop()
+
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        pkg = stack.pop()
+                        on_stack.discard(pkg)
+                        component.append(pkg)
+                        if pkg == node:
+                            break
+                    components.append(component)
+
+    # Every prefix of the ordered components is closed under
+    # the dependencies, so we can cut the batches anywhere
+    # between the components.
+    batches = []
+    batch = []
+    for component in components:
+        if batch and len(batch) + len(component) > batch_size:
+            batches.append(batch)
+            batch = []
+        batch.extend(component)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def encode_progress_event(event, text="", ts_done=0, ts_total=0):
+    """Encode an event of the transaction progress protocol.
+
+    :param int event: a type of the event
+    :param str text: a text of the event
+    :param int ts_done: a number of processed packages
+    :param int ts_total: a total number of packages
+    :returns: bytes
+    """
+    data = text.encode("utf-8")
+    return PROGRESS_EVENT_HEADER.pack(event, ts_done, ts_total, len(data)) + data
+
+
+def encode_package_event(event, package, ts_done=0, ts_total=0):
+    """Encode an event of the transaction progress protocol about a package.
+
+    The text of the event contains all package details the installer
+    needs to report the progress and to log the package.
+    """
+    fields = (package.name, package.arch, package.evr, str(package.buildtime),
+              package.returnIdSum()[1])
+    return encode_progress_event(event, "\0".join(fields), ts_done, ts_total)
+
+
+def decode_progress_events(data):
+    """Decode a batch of events of the transaction progress protocol.
+
+    :param bytes data: encoded events
+    :returns: a generator of (token, message) tuples
+    """
+    offset = 0
+
+    while offset < len(data):
+        event, ts_done, ts_total, size = PROGRESS_EVENT_HEADER.unpack_from(data, offset)
+        offset += PROGRESS_EVENT_HEADER.size
+        text = data[offset:offset + size].decode("utf-8")
+        offset += size
+
+        if event in (PROGRESS_INSTALL, PROGRESS_SCRIPTLET, PROGRESS_CONFIGURE, PROGRESS_VERIFY):
+            name, arch, evr, buildtime, checksum = text.split("\0")
+            # Log the exact package nevra, build time and checksum
+            details = "%s-%s.%s %s %s" % (name, evr, arch, buildtime, checksum)
+
+        if event == PROGRESS_INSTALL:
+            yield ('install', '%s.%s (%d/%d)' % (name, arch, ts_done, ts_total))
+            yield ('log', "Installed: %s" % details)
+        elif event == PROGRESS_POST:
+            yield ('post', None)
+            yield ('log', "Post installation setup phase started.")
+        elif event in (PROGRESS_SCRIPTLET, PROGRESS_CONFIGURE):
+            yield ('log', "Configuring (running scriptlet for): %s" % details)
+            # only show progress in UI for post-installation scriptlets
+            if event == PROGRESS_CONFIGURE:
+                yield ('configure', '%s.%s' % (name, arch))
+        elif event == PROGRESS_VERIFY:
+            yield ('verify', '%s.%s (%d/%d)' % (name, arch, ts_done, ts_total))
+            yield ('log', "Verifying: %s" % details)
+        elif event == PROGRESS_DONE:
+            yield ('done', None)
+        elif event == PROGRESS_ERROR:
+            yield ('error', text)
+        elif event == PROGRESS_QUIT:
+            yield ('quit', text)
+
+
+class ProgressBatcher(object):
+    """Collect encoded events of the transaction and send them in batches.
+
+    Collected events are sent to the queue periodically from a separate
+    thread, so a long running package installation doesn't hold back
+    the events that happened before it.
+    """
+
+    def __init__(self, queue_instance, window=PROGRESS_BATCH_WINDOW):
+        self._queue = queue_instance
+        self._window = window
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start to send the events periodically."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop to send the events periodically and send the rest."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self._window):
+            self.flush()
+
+    def put(self, data, flush=False):
+        """Add encoded events to the batch.
+
+        :param bytes data: encoded events
+        :param bool flush: send the batch immediately
+        """
+        with self._lock:
+            self._buffer += data
+
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Send the collected events."""
+        with self._lock:
+            if not self._buffer:
+                return
+            data = bytes(self._buffer)
+            self._buffer = bytearray()
+
+        self._queue.put(data)
+
+
 class PayloadRPMDisplay(dnf.callback.TransactionProgress):
-    def __init__(self, queue_instance):
+    def __init__(self, batcher, ts_offset=0, ts_total=None):
         super(PayloadRPMDisplay, self).__init__()
-        self._queue = queue_instance
+        self._batcher = batcher
         self._last_ts = None
         self._postinst_phase = False
+        self.done = False
+        # transactions of the pipelined installation report
+        # their progress relative to the whole installation
+        self._ts_offset = ts_offset
+        self._ts_total = ts_total
         self.cnt = 0
 
     def progress(self, package, action, ti_done, ti_total, ts_done, ts_total):
@@ -181,52 +447,39 @@ class PayloadRPMDisplay(dnf.callback.TransactionProgress):
                 return
             self._last_ts = ts_done
 
-            msg = '%s.%s (%d/%d)' % \
-                (package.name, package.arch, ts_done, ts_total)
             self.cnt += 1
-            self._queue.put(('install', msg))
-
-            # Log the exact package nevra, build time and checksum
-            nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
-            log_msg = "Installed: %s %s %s" % (nevra, package.buildtime, package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
+            self._batcher.put(encode_package_event(PROGRESS_INSTALL, package,
+                                                   ts_done + self._ts_offset,
+                                                   self._ts_total or ts_total))
 
         elif action == self.TRANS_POST:
-            self._queue.put(('post', None))
-            log_msg = "Post installation setup phase started."
-            self._queue.put(('log', log_msg))
+            self._batcher.put(encode_progress_event(PROGRESS_POST), flush=True)
             self._postinst_phase = True
 
         elif action == self.PKG_SCRIPTLET:
-            # Log the exact package nevra, build time and checksum
-            nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
-            log_msg = "Configuring (running scriptlet for): %s %s %s" % (nevra, package.buildtime, package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
-
             # only show progress in UI for post-installation scriptlets
             if self._postinst_phase:
-                msg = '%s.%s' % (package.name, package.arch)
-                #self.cnt += 1
-                self._queue.put(('configure', msg))
+                event = PROGRESS_CONFIGURE
+            else:
+                event = PROGRESS_SCRIPTLET
 
-        elif action == self.PKG_VERIFY:
-            msg = '%s.%s (%d/%d)' % (package.name, package.arch, ts_done, ts_total)
-            self._queue.put(('verify', msg))
+            self._batcher.put(encode_package_event(event, package))
 
-            # Log the exact package nevra, build time and checksum
-            nevra = "%s-%s.%s" % (package.name, package.evr, package.arch)
-            log_msg = "Verifying: %s %s %s" % (nevra, package.buildtime, package.returnIdSum()[1])
-            self._queue.put(('log', log_msg))
+        elif action == self.PKG_VERIFY:
+            self._batcher.put(encode_package_event(PROGRESS_VERIFY, package,
+                                                   ts_done + self._ts_offset,
+                                                   self._ts_total or ts_total))
 
             # Once the last package is verified the transaction is over
             if ts_done == ts_total:
-                self._queue.put(('done', None))
+                self.done = True
+                self._batcher.put(encode_progress_event(PROGRESS_DONE), flush=True)
 
     def error(self, message):
         """Report an error that occurred during the transaction. Message is a
         string which describes the error.
         """
-        self._queue.put(('error', message))
+        self._batcher.put(encode_progress_event(PROGRESS_ERROR, message), flush=True)
 
 
 class DownloadProgress(dnf.callback.DownloadProgress):
@@ -264,16 +517,59 @@ class DownloadProgress(dnf.callback.DownloadProgress):
 
     # TODO: Remove pylint disable after DNF-2.5.0 will arrive in Fedora
     def start(self, total_files, total_size, total_drpms=0): # pylint: disable=arguments-differ
-        self.total_files = total_files
-        self.total_size = Size(total_size)
+        # The pipelined installation downloads the packages in several
+        # batches, so count the totals of all of them.
+        self.total_files += total_files
+        self.total_size += Size(total_size)
+
+
+def _prepare_batch_transaction(base, nevras, group_members=(), comps_trans=None):
+    """Replace the DNF transaction with a transaction of the given packages.
+
+    Packages of the previous batches are already installed in the
+    target system, so load the system repo before the resolution.
+
+    The weak dependencies were resolved by the whole transaction and
+    the batches contain them already, so they are not resolved again.
+    The comps transaction is replayed only by the final batch, so the
+    groups and environments are recorded in the history of the target.
+
+    :param base: a DNF base
+    :param nevras: a list of NEVRA strings of the packages in the batch
+    :param group_members: names of packages installed by groups
+    :param comps_trans: the comps transaction to replay or None
+    """
+    base.reset(goal=True, sack=True)
+    base.conf.install_weak_deps = False
+    base.fill_sack(load_system_repo=True)
+    base._goal.group_members = set(group_members)
+
+    if comps_trans is not None:
+        base._comps_trans = comps_trans
+
+    for nevra in nevras:
+        pkgs = base.sack.query().available().filter(nevra=nevra)
+        if not pkgs:
+            raise payload.PayloadError("Package %s of the batch is not available" % nevra)
+        base.package_install(pkgs[0], strict=True)
+
+    base.resolve()
+
+    # All packages of the transaction have to be downloaded already.
+    unexpected = {str(pkg) for pkg in base.transaction.install_set} - set(nevras)
+    if unexpected:
+        raise payload.PayloadError("The batch requires packages from the following "
+                                   "batches: %s" % ", ".join(sorted(unexpected)))
 
 
 def do_transaction(base, queue_instance):
     # Execute the DNF transaction and catch any errors. An error doesn't
     # always raise a BaseException, so presence of 'quit' without a preceeding
     # 'post' message also indicates a problem.
+    batcher = ProgressBatcher(queue_instance)
+    batcher.start()
     try:
-        display = PayloadRPMDisplay(queue_instance)
+        display = PayloadRPMDisplay(batcher)
         base.do_transaction(display=display)
         exit_reason = "DNF quit"
     except BaseException as e:
@@ -283,7 +579,111 @@ def do_transaction(base, queue_instance):
         exit_reason = str(e) + traceback.format_exc()
     finally:
         base.close()
-        queue_instance.put(('quit', str(exit_reason)))
+        batcher.put(encode_progress_event(PROGRESS_QUIT, str(exit_reason)))
+        batcher.stop()
+
+
+def do_batch_transactions(base, queue_instance, requests):
+    # Execute the DNF transactions of the batches received from the requests
+    # queue until None is received. The process is forked before the batches
+    # start to download, so it doesn't inherit locks of the download thread.
+    # Every successful batch ends with a 'done' message, so the presence of
+    # 'quit' before it indicates a problem.
+    batcher = ProgressBatcher(queue_instance)
+    batcher.start()
+
+    # Keep the groups of the whole transaction for the batches.
+    group_members = set(base._goal.group_members)
+    comps_trans = base._comps_trans
+
+    try:
+        for (batch, ts_offset, ts_total, final) in iter(requests.get, None):
+            _prepare_batch_transaction(base, batch, group_members,
+                                       comps_trans if final else None)
+
+            display = PayloadRPMDisplay(batcher, ts_offset, ts_total)
+            base.do_transaction(display=display)
+
+            if not display.done:
+                raise payload.PayloadError("The transaction of the batch has not finished")
+
+        exit_reason = "DNF quit"
+    except BaseException as e:
+        log.error('The transaction process has ended abruptly')
+        log.info(e)
+        import traceback
+        exit_reason = str(e) + traceback.format_exc()
+    finally:
+        base.close()
+        batcher.put(encode_progress_event(PROGRESS_QUIT, str(exit_reason)))
+        batcher.stop()
+
+
+class CompsIndex(object):
+    """Index of groups and environments of comps.
+
+    The comps methods group_by_pattern and environment_by_pattern match
+    the pattern against all groups or environments on every call. The
+    index maps their ids and names to the objects, so the common lookups
+    by id are dictionary accesses. Other patterns are passed to comps.
+    """
+
+    def __init__(self, comps):
+        """Create an index of the comps.
+
+        :param comps: an instance of dnf.comps.Comps
+        """
+        self.comps = comps
+
+        self.group_ids = []
+        self._groups = {}
+        self._group_names = {}
+
+        for grp in comps.groups_iter():
+            self.group_ids.append(grp.id)
+            self._groups[grp.id] = grp
+            self._group_names.setdefault(grp.name, grp)
+
+        self.environment_ids = []
+        self._environments = {}
+        self._environment_names = {}
+        self._environment_groups = {}
+        self._environment_options = {}
+
+        for env in comps.environments:
+            self.environment_ids.append(env.id)
+            self._environments[env.id] = env
+            self._environment_names.setdefault(env.name, env)
+            self._environment_groups[env.id] = [id_.name for id_ in env.group_ids]
+            self._environment_options[env.id] = collections.OrderedDict(
+                (id_.name, id_.default) for id_ in env.option_ids
+            )
+
+    def group(self, pattern):
+        """Return the group matching the pattern or None."""
+        grp = self._groups.get(pattern) or self._group_names.get(pattern)
+
+        if grp is None:
+            grp = self.comps.group_by_pattern(pattern)
+
+        return grp
+
+    def environment(self, pattern):
+        """Return the environment matching the pattern or None."""
+        env = self._environments.get(pattern) or self._environment_names.get(pattern)
+
+        if env is None:
+            env = self.comps.environment_by_pattern(pattern)
+
+        return env
+
+    def environment_groups(self, env):
+        """Return ids of the mandatory groups of the environment."""
+        return self._environment_groups[env.id]
+
+    def environment_options(self, env):
+        """Return an ordered mapping of ids of optional groups to their default flags."""
+        return self._environment_options[env.id]
 
 
 class DNFPayload(payload.PackagePayload):
@@ -292,9 +692,21 @@ class DNFPayload(payload.PackagePayload):
 
         self._base = None
         self._download_location = None
+        self._package_cache = None
         self._updates_enabled = True
         self._configure()
 
+        # the estimated space of the last transaction and the numbers
+        # of files of the already seen packages
+        self._space_estimate = None
+        self._file_counts = {}
+
+        # the index of the current comps
+        self._comps_index = None
+
+        # the resolved transactions of the recent software selections
+        self._resolved_selections = collections.OrderedDict()
+
         # Protect access to _base.repos to ensure that the dictionary is not
         # modified while another thread is attempting to iterate over it. The
         # lock only needs to be held during operations that change the number
@@ -304,11 +716,15 @@ class DNFPayload(payload.PackagePayload):
         # save repomd metadata
         self._repoMD_list = []
 
+        # reuse downloaded metadata after the payload restart
+        self._metadata_cache = RepoMetadataCache(DNF_METADATA_SNAPSHOT_DIR)
+
         self.requirements.set_apply_callback(self._apply_requirements)
 
     def unsetup(self):
         super(DNFPayload, self).unsetup()
         self._base = None
+        self._resolved_selections.clear()
         self._configure()
         self._repoMD_list = []
 
@@ -393,10 +809,9 @@ class DNFPayload(payload.PackagePayload):
             repo.enable()
 
         # Load the metadata to verify that the repo is valid
-        try:
-            self._base.repos[repo.id].load()
-        except dnf.exceptions.RepoError as e:
-            raise payload.MetadataError(e)
+        error = self._load_metadata(self._base.repos[repo.id])
+        if error:
+            raise payload.MetadataError(error)
 
         log.info("added repo: '%s' - %s", ksrepo.name, url or mirrorlist or metalink)
 
@@ -624,7 +1039,7 @@ class DNFPayload(payload.PackagePayload):
         return pkgdir
 
     def _select_group(self, group_id, default=True, optional=False, required=False):
-        grp = self._base.comps.group_by_pattern(group_id)
+        grp = self._comps.group(group_id)
         if grp is None:
             raise payload.NoSuchGroup(group_id, required=required)
         types = {'mandatory'}
@@ -677,14 +1092,33 @@ class DNFPayload(payload.PackagePayload):
             langpacks.append("langpacks-" + loc)
         return langpacks
 
-    def _sync_metadata(self, dnf_repo):
+    def _load_metadata(self, dnf_repo):
+        """Load metadata of the repository.
+
+        This method can be called from multiple threads at once,
+        so it doesn't change the state of the payload.
+
+        :param dnf_repo: a DNF repository
+        :returns: None or an error that occurred during the loading
+        """
+        start = time.time()
         try:
+            # Reuse the metadata downloaded before the payload restart.
+            if dnf_repo.metadata is None:
+                self._metadata_cache.restore(self, dnf_repo)
+
             dnf_repo.load()
         except dnf.exceptions.RepoError as e:
-            id_ = dnf_repo.id
-            log.info('_sync_metadata: addon repo error: %s', e)
-            self.disableRepo(id_)
-            self.verbose_errors.append(str(e))
+            log.info('_load_metadata: addon repo error: %s', e)
+            return e
+        finally:
+            log.debug("Loading metadata of %s took %.1f s", dnf_repo.id, time.time() - start)
+
+        return None
+
+    def _disable_broken_repo(self, repo_id, error):
+        self.disableRepo(repo_id)
+        self.verbose_errors.append(str(error))
 
     @property
     def baseRepo(self):
@@ -696,14 +1130,28 @@ class DNFPayload(payload.PackagePayload):
                     return repo.id
         return None
 
+    @property
+    def _comps(self):
+        """The index of the current comps.
+
+        The index is created again when the comps are read again.
+        """
+        comps = self._base.comps
+        index = self._comps_index
+
+        if index is None or index.comps is not comps:
+            index = CompsIndex(comps)
+            self._comps_index = index
+
+        return index
+
     @property
     def environments(self):
-        return [env.id for env in self._base.comps.environments]
+        return list(self._comps.environment_ids)
 
     @property
     def groups(self):
-        groups = self._base.comps.groups_iter()
-        return [g.id for g in groups]
+        return list(self._comps.group_ids)
 
     @property
     def mirrorEnabled(self):
@@ -748,13 +1196,18 @@ class DNFPayload(payload.PackagePayload):
         if transaction is None:
             return Size("3000 MB")
 
+        # The transaction changes only with a new transaction id.
+        key = (self.txID, id(transaction))
+        if self._space_estimate and self._space_estimate[0] == key:
+            return self._space_estimate[1]
+
         size = 0
         files_nm = 0
         for tsi in transaction:
             # space taken by all files installed by the packages
             size += tsi.installed.installsize
             # number of files installed on the system
-            files_nm += len(tsi.installed.files)
+            files_nm += self._get_file_count(tsi.installed)
 
         # append bonus size depending on number of files
         bonus_size = files_nm * BONUS_SIZE_ON_FILE
@@ -764,10 +1217,25 @@ class DNFPayload(payload.PackagePayload):
         log.debug("Size from DNF: %s", size)
         log.debug("Bonus size %s by number of files %s", bonus_size, files_nm)
         log.debug("Total size required %s", total_space)
+
+        self._space_estimate = (key, total_space)
         return total_space
 
+    def _get_file_count(self, pkg):
+        """Return the number of files installed by the package.
+
+        The file list is read only once for every package, because
+        the following transactions usually contain the same packages.
+        """
+        key = (str(pkg), pkg.reponame)
+
+        if key not in self._file_counts:
+            self._file_counts[key] = len(pkg.files)
+
+        return self._file_counts[key]
+
     def _isGroupVisible(self, grpid):
-        grp = self._base.comps.group_by_pattern(grpid)
+        grp = self._comps.group(grpid)
         if grp is None:
             raise payload.NoSuchGroup(grpid)
         return grp.visible
@@ -775,9 +1243,72 @@ class DNFPayload(payload.PackagePayload):
     def _groupHasInstallableMembers(self, grpid):
         return True
 
+    def _get_selection_fingerprint(self):
+        """Return a fingerprint of the software selection.
+
+        The fingerprint contains everything that is applied to the goal
+        by _apply_selections and _apply_requirements.
+        """
+        packages = self.data.packages
+        return (
+            packages.nocore,
+            packages.default,
+            packages.environment,
+            tuple(sorted(group.name for group in packages.excludedGroupList)),
+            tuple(sorted((group.name, group.include) for group in packages.groupList)),
+            tuple(sorted(packages.excludedList)),
+            tuple(sorted(packages.packageList)),
+            tuple(sorted((req.id, req.strong) for req in self.requirements.packages)),
+            tuple(sorted((req.id, req.strong) for req in self.requirements.groups)),
+            tuple(sorted(self.instclass.ignoredPackages)),
+        )
+
+    def _restore_selection(self, fingerprint):
+        """Restore the resolved transaction of the software selection.
+
+        :return: True if the selection was restored, otherwise False
+        :raise DependencyError: if the selection couldn't be resolved
+        """
+        resolved = self._resolved_selections.get(fingerprint)
+        if resolved is None:
+            return False
+
+        self._resolved_selections.move_to_end(fingerprint)
+        log.info("checking dependencies: reusing the resolved selection")
+        self.requirements.set_applied()
+
+        goal, transaction, comps_trans, error = resolved
+        self._base._goal = goal
+        self._base._transaction = transaction
+        self._base._comps_trans = comps_trans
+
+        if error:
+            log.warning(error)
+            raise payload.DependencyError(error)
+
+        return True
+
+    def _save_selection(self, fingerprint, error=None):
+        """Save the resolved transaction of the software selection."""
+        self._resolved_selections[fingerprint] = (self._base._goal,
+                                                  self._base._transaction,
+                                                  self._base._comps_trans,
+                                                  error)
+
+        while len(self._resolved_selections) > RESOLVED_SELECTIONS_LIMIT:
+            self._resolved_selections.popitem(last=False)
+
     def checkSoftwareSelection(self):
         log.info("checking software selection")
         self._bump_tx_id()
+
+        # Don't resolve the same selection again.
+        fingerprint = self._get_selection_fingerprint()
+        if self._restore_selection(fingerprint):
+            log.info("%d packages selected totalling %s",
+                     len(self._base.transaction), self.spaceRequired)
+            return
+
         self._base.reset(goal=True)
         self._apply_selections()
         self.requirements.apply()
@@ -790,8 +1321,10 @@ class DNFPayload(payload.PackagePayload):
         except dnf.exceptions.DepsolveError as e:
             msg = str(e)
             log.warning(msg)
+            self._save_selection(fingerprint, msg)
             raise payload.DependencyError(msg)
 
+        self._save_selection(fingerprint)
         log.info("%d packages selected totalling %s",
                  len(self._base.transaction), self.spaceRequired)
 
@@ -828,47 +1361,47 @@ class DNFPayload(payload.PackagePayload):
         super(DNFPayload, self).enableRepo(repo_id)
 
     def environmentDescription(self, environmentid):
-        env = self._base.comps.environment_by_pattern(environmentid)
+        env = self._comps.environment(environmentid)
         if env is None:
             raise payload.NoSuchGroup(environmentid)
         return (env.ui_name, env.ui_description)
 
     def environmentId(self, environment):
         """Return environment id for the environment specified by id or name."""
-        env = self._base.comps.environment_by_pattern(environment)
+        env = self._comps.environment(environment)
         if env is None:
             raise payload.NoSuchGroup(environment)
         return env.id
 
     def environmentGroups(self, environmentid, optional=True):
-        env = self._base.comps.environment_by_pattern(environmentid)
+        env = self._comps.environment(environmentid)
         if env is None:
             raise payload.NoSuchGroup(environmentid)
-        group_ids = (id_.name for id_ in env.group_ids)
-        option_ids = (id_.name for id_ in env.option_ids)
+        group_ids = self._comps.environment_groups(env)
+        option_ids = self._comps.environment_options(env)
         if optional:
             return list(itertools.chain(group_ids, option_ids))
         else:
             return list(group_ids)
 
     def environmentHasOption(self, environmentid, grpid):
-        env = self._base.comps.environment_by_pattern(environmentid)
+        env = self._comps.environment(environmentid)
         if env is None:
             raise payload.NoSuchGroup(environmentid)
-        return grpid in (id_.name for id_ in env.option_ids)
+        return grpid in self._comps.environment_options(env)
 
     def environmentOptionIsDefault(self, environmentid, grpid):
-        env = self._base.comps.environment_by_pattern(environmentid)
+        env = self._comps.environment(environmentid)
         if env is None:
             raise payload.NoSuchGroup(environmentid)
 
         # Look for a group in the optionlist that matches the group_id and has
         # default set
-        return any(grp for grp in env.option_ids if grp.name == grpid and grp.default)
+        return bool(self._comps.environment_options(env).get(grpid))
 
     def groupDescription(self, grpid):
         """Return name/description tuple for the group specified by id."""
-        grp = self._base.comps.group_by_pattern(grpid)
+        grp = self._comps.group(grpid)
         if grp is None:
             raise payload.NoSuchGroup(grpid)
         return (grp.ui_name, grp.ui_description)
@@ -881,17 +1414,34 @@ class DNFPayload(payload.PackagePayload):
         :raise NoSuchGroup: If group_name doesn't exists.
         :raise PayloadError: When Yum's groups are not available.
         """
-        grp = self._base.comps.group_by_pattern(group_name)
+        grp = self._comps.group(group_name)
         if grp is None:
             raise payload.NoSuchGroup(group_name)
         return grp.id
 
     def gatherRepoMetadata(self):
         with self._repos_lock:
-            for repo in self._base.repos.iter_enabled():
-                self._sync_metadata(repo)
+            repos = list(self._base.repos.iter_enabled())
+
+            # Load the metadata of all repositories concurrently, so
+            # the slowest repository sets the latency instead of all.
+            start = time.time()
+            workers = max(1, min(METADATA_SYNC_WORKERS, len(repos)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                load_errors = list(executor.map(self._load_metadata, repos))
+
+            log.debug("Loading metadata of %d repositories took %.1f s",
+                      len(repos), time.time() - start)
+
+            # A broken repository doesn't affect the other ones.
+            for repo, error in zip(repos, load_errors):
+                if error:
+                    self._disable_broken_repo(repo.id, error)
+
         self._base.fill_sack(load_system_repo=False)
         self._base.read_comps()
+        self._comps_index = None
+        self._resolved_selections.clear()
         self._refreshEnvironmentAddons()
 
     def install(self):
@@ -917,57 +1467,29 @@ class DNFPayload(payload.PackagePayload):
         pkgs_to_download = self._base.transaction.install_set
         log.info('Downloading packages to %s.', self._download_location)
         progressQ.send_message(_('Downloading packages'))
-        progress = DownloadProgress()
-        try:
-            self._base.download_packages(pkgs_to_download, progress)
-        except dnf.exceptions.DownloadError as e:
-            msg = 'Failed to download the following packages: %s' % str(e)
-            exc = payload.PayloadInstallError(msg)
-            if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
-                log.error("Installation failed: %r", exc)
-                _failure_limbo()
 
-        log.info('Downloading packages finished.')
+        if flags.pkgcache:
+            self._setup_package_cache()
 
-        pre_msg = (N_("Preparing transaction from installation source"))
-        progress_message(pre_msg)
+        if flags.pipelined_install:
+            self._install_pipelined(pkgs_to_download)
+        else:
+            progress = DownloadProgress()
+            try:
+                self._download_packages(pkgs_to_download, progress)
+            except dnf.exceptions.DownloadError as e:
+                self._handle_download_error(e)
 
-        queue_instance = multiprocessing.Queue()
-        process = multiprocessing.Process(target=do_transaction,
-                                          args=(self._base, queue_instance))
-        process.start()
-        (token, msg) = queue_instance.get()
-        # When the installation works correctly it will get 'install' updates
-        # followed by a 'post' message and then a 'quit' message.
-        # If the installation fails it will send 'quit' without 'post'
-        while token:
-            if token == 'install':
-                msg = _("Installing %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'configure':
-                msg = _("Configuring %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'verify':
-                msg = _("Verifying %s") % msg
-                progressQ.send_message(msg)
-            elif token == 'log':
-                log.info(msg)
-            elif token == 'post':
-                msg = (N_("Performing post-installation setup tasks"))
-                progressQ.send_message(msg)
-            elif token == 'done':
-                break  # Installation finished successfully
-            elif token == 'quit':
-                msg = ("Payload error - DNF installation has ended up abruptly: %s" % msg)
-                raise payload.PayloadError(msg)
-            elif token == 'error':
-                exc = payload.PayloadInstallError("DNF error: %s" % msg)
-                if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
-                    log.error("Installation failed: %r", exc)
-                    _failure_limbo()
-            (token, msg) = queue_instance.get()
+            log.info('Downloading packages finished.')
+
+            pre_msg = (N_("Preparing transaction from installation source"))
+            progress_message(pre_msg)
+            self._run_transaction()
+
+        if self._package_cache:
+            self._package_cache.log_statistics()
+            self._package_cache.evict()
 
-        process.join()
         self._base.close()
         if os.path.exists(self._download_location):
             log.info("Cleaning up downloaded packages: %s", self._download_location)
@@ -979,6 +1501,201 @@ class DNFPayload(payload.PackagePayload):
             # we don't have to care about clearing the download location ourselves.
             log.warning("Can't delete nonexistent download location: %s", self._download_location)
 
+    def _setup_package_cache(self):
+        """Set up the persistent package cache."""
+        try:
+            max_size = Size(flags.pkgcache_size) if flags.pkgcache_size else None
+            self._package_cache = setup_package_cache(flags.pkgcache, max_size)
+            log.info("Using the package cache %s.", self._package_cache.path)
+        except (ValueError, PackageCacheError) as e:
+            log.error("Failed to set up the package cache %s: %s", flags.pkgcache, e)
+            self._package_cache = None
+
+    def _download_packages(self, packages, progress):
+        """Download the packages that are not in the package cache.
+
+        :param packages: a list of DNF packages
+        :param progress: an instance of DownloadProgress
+        :raise DownloadError: if the packages can't be downloaded
+        """
+        with timeline.phase("Download packages", "payload", {"packages": len(packages)}):
+            if self._package_cache:
+                packages = [pkg for pkg in packages if not self._package_cache.fetch(pkg)]
+
+            self._base.download_packages(packages, progress)
+
+            if self._package_cache:
+                for pkg in packages:
+                    self._package_cache.store(pkg)
+
+    def _handle_download_error(self, e):
+        msg = 'Failed to download the following packages: %s' % str(e)
+        exc = payload.PayloadInstallError(msg)
+        if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
+            log.error("Installation failed: %r", exc)
+            _failure_limbo()
+
+    def _transaction_batches(self, packages):
+        """Split packages of the transaction into dependency ordered batches.
+
+        :param packages: a list of DNF packages
+        :returns: a list of lists of DNF packages
+        """
+        query = self._base.sack.query().filter(pkg=packages)
+        dependencies = {}
+
+        for pkg in packages:
+            required = set()
+            for reldep in pkg.requires:
+                required.update(query.filter(provides=reldep))
+            required.discard(pkg)
+            dependencies[pkg] = required
+
+        return _pipeline_batches(dependencies, PIPELINE_BATCH_SIZE)
+
+    def _download_batches(self, batches, downloaded):
+        """Download the batches of packages one by one.
+
+        Put None or the download error to the given queue
+        once a batch is downloaded. Any other error stops
+        the download and is put to the queue as well.
+        """
+        progress = DownloadProgress()
+
+        try:
+            for batch in batches:
+                try:
+                    self._download_packages(batch, progress)
+                except dnf.exceptions.DownloadError as e:
+                    downloaded.put(e)
+                else:
+                    downloaded.put(None)
+        except BaseException as e:  # pylint: disable=broad-except
+            # Don't leave the installation waiting for the next batch.
+            log.error("Downloading packages has failed: %s", e)
+            downloaded.put(e)
+            return
+
+        log.info('Downloading packages finished.')
+
+    def _install_pipelined(self, packages):
+        """Install the packages while the rest of them is downloading.
+
+        The transaction is split into dependency ordered batches. Every
+        batch is installed by a separate transaction as soon as it is
+        downloaded while the following batches are still downloading.
+        """
+        batches = self._transaction_batches(packages)
+        log.info("Installing %d packages in %d pipelined batches.", len(packages), len(batches))
+
+        # Fork the transaction process before the download thread is started.
+        requests = multiprocessing.Queue()
+        queue_instance = multiprocessing.Queue()
+        process = multiprocessing.Process(target=do_batch_transactions,
+                                          args=(self._base, queue_instance, requests))
+        process.start()
+
+        downloaded = queue.Queue()
+        threadMgr.add(AnacondaThread(name=constants.THREAD_PACKAGE_DOWNLOAD,
+                                     target=self._download_batches,
+                                     args=(batches, downloaded)))
+
+        ts_offset = 0
+        ts_total = len(packages)
+
+        try:
+            for number, batch in enumerate(batches, start=1):
+                error = downloaded.get()
+                if isinstance(error, dnf.exceptions.DownloadError):
+                    self._handle_download_error(error)
+                elif error:
+                    raise payload.PayloadInstallError("Failed to download packages: %s" % error)
+
+                log.info("Installing the batch %d/%d of %d packages.",
+                         number, len(batches), len(batch))
+
+                if number == 1:
+                    pre_msg = (N_("Preparing transaction from installation source"))
+                    progress_message(pre_msg)
+
+                nevras = [str(pkg) for pkg in batch]
+                requests.put((nevras, ts_offset, ts_total, number == len(batches)))
+
+                with timeline.phase("RPM transaction", "payload"):
+                    self._process_transaction_messages(queue_instance)
+
+                ts_offset += len(batch)
+        finally:
+            requests.put(None)
+            process.join()
+
+        threadMgr.wait(constants.THREAD_PACKAGE_DOWNLOAD)
+
+    def _run_transaction(self):
+        """Run the DNF transaction in a subprocess and process its messages."""
+        queue_instance = multiprocessing.Queue()
+        process = multiprocessing.Process(target=do_transaction,
+                                          args=(self._base, queue_instance))
+        process.start()
+
+        with timeline.phase("RPM transaction", "payload"):
+            self._process_transaction_messages(queue_instance)
+
+        process.join()
+
+    def _process_transaction_messages(self, queue_instance):
+        """Process messages of the transaction and record its phases."""
+        phase_event = None
+
+        try:
+            # When the installation works correctly it will get 'install' updates
+            # followed by a 'post' message and then a 'quit' message.
+            # If the installation fails it will send 'quit' without 'post'
+            for (token, msg) in self._transaction_messages(queue_instance):
+                if token in TRANSACTION_PHASES and \
+                        (not phase_event or phase_event["name"] != TRANSACTION_PHASES[token]):
+                    if phase_event:
+                        timeline.stop(phase_event)
+                    phase_event = timeline.start(TRANSACTION_PHASES[token], "payload")
+
+                if token == 'install':
+                    msg = _("Installing %s") % msg
+                    progressQ.send_message(msg)
+                elif token == 'configure':
+                    msg = _("Configuring %s") % msg
+                    progressQ.send_message(msg)
+                elif token == 'verify':
+                    msg = _("Verifying %s") % msg
+                    progressQ.send_message(msg)
+                elif token == 'log':
+                    log.info(msg)
+                elif token == 'post':
+                    msg = (N_("Performing post-installation setup tasks"))
+                    progressQ.send_message(msg)
+                elif token == 'done':
+                    break  # Installation finished successfully
+                elif token == 'quit':
+                    msg = ("Payload error - DNF installation has ended up abruptly: %s" % msg)
+                    raise payload.PayloadError(msg)
+                elif token == 'error':
+                    exc = payload.PayloadInstallError("DNF error: %s" % msg)
+                    if errors.errorHandler.cb(exc) == errors.ERROR_RAISE:
+                        log.error("Installation failed: %r", exc)
+                        _failure_limbo()
+        finally:
+            if phase_event:
+                timeline.stop(phase_event)
+
+    @staticmethod
+    def _transaction_messages(queue_instance):
+        """Generate messages received from the transaction process.
+
+        The transaction process sends the messages in batches.
+        """
+        while True:
+            for message in decode_progress_events(queue_instance.get()):
+                yield message
+
     def getRepo(self, repo_id):
         """Return the yum repo object."""
         return self._base.repos[repo_id]
@@ -1016,6 +1733,9 @@ class DNFPayload(payload.PackagePayload):
         shutil.rmtree(DNF_CACHE_DIR, ignore_errors=True)
         shutil.rmtree(DNF_PLUGINCONF_DIR, ignore_errors=True)
         self.txID = None
+        self._space_estimate = None
+        self._file_counts = {}
+        self._resolved_selections.clear()
         self._base.reset(sack=True, repos=True)
         self._configure_proxy()
         self._repoMD_list = []
@@ -1170,12 +1890,14 @@ class DNFPayload(payload.PackagePayload):
         """Perform post-setup tasks.
 
         Save repomd hash to test if the repositories can be reached.
+        Save snapshots of the metadata to reuse them after a restart.
         """
         self._repoMD_list = []
         for repo in self._base.repos.iter_enabled():
             repoMD = RepoMDMetaHash(self, repo)
             repoMD.store_repoMD_hash()
             self._repoMD_list.append(repoMD)
+            self._metadata_cache.store(repo, repoMD.repoMD_hash)
 
     def postInstall(self):
         """Perform post-installation tasks."""
@@ -1273,3 +1995,131 @@ class RepoMDMetaHash(object):
                 log.debug("Can't download new repomd.xml from %s with proxy: %s. Error: %s", url, proxies, e)
 
         return repomd
+
+
+def _link_or_copy(src, dst):
+    """Hard link the file if possible, otherwise copy it."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class RepoMetadataCache(object):
+    """Snapshots of repository metadata that survive the payload restarts.
+
+    Every snapshot is stored under a hash of the repository URL and a hash
+    of its repomd.xml file, so it is reused only if the repository hasn't
+    changed since. Only repositories with a base URL are supported.
+    """
+
+    # Hash of the repomd.xml file that failed to download.
+    EMPTY_REPOMD_HASH = hashlib.sha256(b"").digest()
+
+    def __init__(self, snapshot_dir):
+        self._snapshot_dir = snapshot_dir
+
+    def _get_snapshots_dir(self, repo):
+        url_hash = hashlib.sha256(repo.baseurl[0].encode("utf-8")).hexdigest()
+        return os.path.join(self._snapshot_dir, url_hash)
+
+    def _get_snapshot_path(self, repo, repomd_hash):
+        return os.path.join(self._get_snapshots_dir(repo), repomd_hash.hex())
+
+    def has_snapshot(self, repo):
+        """Is there any snapshot of the repository metadata?
+
+        :param repo: a DNF repository
+        :returns: True if a snapshot exists, otherwise False
+        """
+        if not repo.baseurl:
+            return False
+
+        snapshots_dir = self._get_snapshots_dir(repo)
+        return os.path.isdir(snapshots_dir) and bool(os.listdir(snapshots_dir))
+
+    @staticmethod
+    def _get_cache_paths(repo):
+        """Return the metadata directory and the solv files of the repository."""
+        # pylint: disable=protected-access
+        cache_dir = repo._cachedir
+        base_cache_dir = os.path.dirname(cache_dir)
+        solv_files = [os.path.join(base_cache_dir, repo.id + suffix)
+                      for suffix in (".solv", "-filenames.solvx")]
+        return cache_dir, solv_files
+
+    def store(self, repo, repomd_hash):
+        """Save a snapshot of the downloaded metadata.
+
+        :param repo: a DNF repository with loaded metadata
+        :param bytes repomd_hash: a hash of the current repomd.xml file
+        """
+        if not repo.baseurl or repomd_hash in (b"", self.EMPTY_REPOMD_HASH):
+            return
+
+        cache_dir, solv_files = self._get_cache_paths(repo)
+        if not os.path.exists(os.path.join(cache_dir, "repodata", "repomd.xml")):
+            return
+
+        snapshot = self._get_snapshot_path(repo, repomd_hash)
+        if os.path.exists(snapshot):
+            return
+
+        # Snapshots of the older metadata are no longer useful.
+        shutil.rmtree(os.path.dirname(snapshot), ignore_errors=True)
+
+        temp_snapshot = snapshot + ".tmp"
+        try:
+            shutil.copytree(cache_dir, os.path.join(temp_snapshot, "cache"),
+                            copy_function=_link_or_copy)
+            util.mkdirChain(os.path.join(temp_snapshot, "solv"))
+            for path in solv_files:
+                if os.path.exists(path):
+                    _link_or_copy(path, os.path.join(temp_snapshot, "solv", os.path.basename(path)))
+            os.rename(temp_snapshot, snapshot)
+        except OSError as e:
+            log.warning("Failed to save a snapshot of %s metadata: %s", repo.id, e)
+            shutil.rmtree(temp_snapshot, ignore_errors=True)
+            return
+
+        log.debug("Saved a snapshot of %s metadata to %s", repo.id, snapshot)
+
+    def restore(self, dnf_payload, repo):
+        """Restore the metadata of an unchanged repository from its snapshot.
+
+        :param dnf_payload: a DNF payload
+        :param repo: a DNF repository without loaded metadata
+        :returns: True if the metadata were restored, otherwise False
+        """
+        # Don't download the repomd.xml file if there is nothing to restore.
+        if not self.has_snapshot(repo):
+            return False
+
+        repomd = RepoMDMetaHash(dnf_payload, repo)
+        repomd.store_repoMD_hash()
+
+        snapshot = self._get_snapshot_path(repo, repomd.repoMD_hash)
+        if repomd.repoMD_hash == self.EMPTY_REPOMD_HASH or not os.path.isdir(snapshot):
+            log.debug("No snapshot of %s metadata found", repo.id)
+            return False
+
+        cache_dir, solv_files = self._get_cache_paths(repo)
+        try:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            shutil.copytree(os.path.join(snapshot, "cache"), cache_dir,
+                            copy_function=_link_or_copy)
+            for path in solv_files:
+                snapshot_path = os.path.join(snapshot, "solv", os.path.basename(path))
+                if os.path.exists(snapshot_path):
+                    if os.path.exists(path):
+                        os.unlink(path)
+                    _link_or_copy(snapshot_path, path)
+        except OSError as e:
+            log.warning("Failed to restore a snapshot of %s metadata: %s", repo.id, e)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return False
+
+        # The metadata match the repository, so don't download them again.
+        repo.metadata_expire = -1
+        log.info("Reusing a snapshot of %s metadata", repo.id)
+        return True
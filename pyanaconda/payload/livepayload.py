@@ -28,9 +28,10 @@
 
 """
 import os
+import re
 import stat
-from time import sleep
-from threading import Lock
+import subprocess
+from threading import Lock, Thread
 import requests
 from pyanaconda.core.util import ProxyString, ProxyStringError
 import hashlib
@@ -38,11 +39,15 @@ import glob
 import functools
 
 from pyanaconda.payload import ImagePayload, PayloadSetupError, PayloadInstallError
+from pyanaconda.payload.parallel_copy import ParallelCopy, CopyError
+from pyanaconda.payload.segmented_download import SegmentedDownload, RangeNotSupported
 
-from pyanaconda.core.constants import INSTALL_TREE, THREAD_LIVE_PROGRESS
+from pyanaconda.core.constants import INSTALL_TREE
 from pyanaconda.core.constants import IMAGE_DIR, TAR_SUFFIX
 
 from pyanaconda.core import util
+from pyanaconda.core.timeline import timeline
+from pyanaconda.flags import flags
 
 from pyanaconda.anaconda_loggers import get_packaging_logger
 log = get_packaging_logger()
@@ -51,18 +56,99 @@ from pyanaconda.errors import errorHandler, ERROR_RAISE
 from pyanaconda.progress import progressQ
 from blivet.size import Size
 import blivet.util
-from pyanaconda.threading import threadMgr, AnacondaThread
 from pyanaconda.core.i18n import _
 from pyanaconda.payload import versionCmp
 
+# files of the live image that are not copied to the target system
+LIVE_COPY_EXCLUDES = ["/dev/", "/proc/", "/sys/", "/run/", "/boot/*rescue*", "/etc/machine-id"]
+
+# tar reports the read bytes every TAR_CHECKPOINT records of 10 KiB
+TAR_CHECKPOINT = 100
+TAR_CHECKPOINT_RE = re.compile(r"R: (\d+)")
+
+# tar archives are stored in blocks of 512 bytes
+TAR_BLOCK_SIZE = 512
+
+# tar can't detect the compression of an archive read from a pipe
+TAR_COMPRESSION = {".tbz": "-j", ".tar.bz2": "-j",
+                   ".tgz": "-z", "tar.gz": "-z",
+                   ".txz": "-J", "tar.xz": "-J"}
+
+# size of downloaded chunks of the image
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# number of attempts to resume an interrupted download
+DOWNLOAD_RESUME_ATTEMPTS = 5
+
+
+class CopyProgress(object):
+    """ Report the number of bytes written to the target system.
+
+        The counter is shared by all threads and processes that write
+        the image, so the reported percentage is exact.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._total_size = 0
+        self._size = 0
+        self._pct = -1
+
+    def start(self, total_size):
+        """ Start counting.
+
+            :param int total_size: the number of bytes that will be written
+        """
+        with self._lock:
+            self._total_size = total_size
+            self._size = 0
+            self._pct = -1
+
+        self.update(0)
+
+    def update(self, size):
+        """ Add written bytes.
+
+            :param int size: the number of written bytes
+        """
+        with self._lock:
+            self._size += size
+
+            if self._total_size > 0:
+                pct = min(100, int(100 * self._size / self._total_size))
+            else:
+                pct = 0
+
+            if pct == self._pct:
+                return
+
+            self._pct = pct
+
+        progressQ.send_message(_("Installing software") + (" %d%%") % (pct,))
+
+    def set(self, size):
+        """ Set the total number of written bytes.
+
+            :param int size: the number of written bytes
+        """
+        with self._lock:
+            size -= self._size
+
+        self.update(size)
+
+    def end(self):
+        """ Report the end of the copy."""
+        with self._lock:
+            self._size = self._total_size = max(self._total_size, 1)
+
+        self.update(0)
+
+
 class LiveImagePayload(ImagePayload):
     """ A LivePayload copies the source image onto the target system. """
     def __init__(self, *args, **kwargs):
         super(LiveImagePayload, self).__init__(*args, **kwargs)
-        # Used to adjust size of sysroot when files are already present
-        self._adj_size = 0
-        self.pct = 0
-        self.pct_lock = None
+        self._progress = CopyProgress()
         self.source_size = 1
 
         self._kernelVersionList = []
@@ -103,49 +189,46 @@ class LiveImagePayload(ImagePayload):
         super(LiveImagePayload, self).preInstall()
         progressQ.send_message(_("Installing software") + (" %d%%") % (0,))
 
-    def progress(self):
-        """Monitor the amount of disk space used on the target and source and
-           update the hub's progress bar.
-        """
-        mountpoints = self.storage.mountpoints.copy()
-        last_pct = -1
-        while self.pct < 100:
-            dest_size = 0
-            for mnt in mountpoints:
-                mnt_stat = os.statvfs(util.getSysroot() + mnt)
-                dest_size += mnt_stat.f_frsize * (mnt_stat.f_blocks - mnt_stat.f_bfree)
-            if dest_size >= self._adj_size:
-                dest_size -= self._adj_size
-
-            pct = int(100 * dest_size / self.source_size)
-            if pct != last_pct:
-                with self.pct_lock:
-                    self.pct = pct
-                last_pct = pct
-                progressQ.send_message(_("Installing software") + (" %d%%") % (min(100, self.pct),))
-            sleep(0.777)
-
     def install(self):
         """ Install the payload. """
 
         if self.source_size <= 0:
             raise PayloadInstallError("Nothing to install")
 
-        self.pct_lock = Lock()
-        self.pct = 0
-        threadMgr.add(AnacondaThread(name=THREAD_LIVE_PROGRESS,
-                                     target=self.progress))
+        copy = ParallelCopy(INSTALL_TREE, util.getSysroot(), LIVE_COPY_EXCLUDES,
+                            progress=self._progress)
+
+        if not flags.live_rsync:
+            try:
+                with timeline.phase("Copy live image", "payload"):
+                    copy.run()
+            except (OSError, CopyError) as e:
+                log.error("Parallel copy of the live image failed, falling back to rsync: %s", e)
+            else:
+                self._finish_install()
+                return
+
+        self._progress.start(copy.scan())
+
+        def handle_line(line):
+            # The size of every transferred file is printed on its own line.
+            if not line.isdigit():
+                return False
+            self._progress.update(int(line))
+            return True
 
         cmd = "rsync"
         # preserve: permissions, owners, groups, ACL's, xattrs, times,
         #           symlinks, hardlinks
         # go recursively, include devices and special files, don't cross
         # file system boundaries
-        args = ["-pogAXtlHrDx", "--exclude", "/dev/", "--exclude", "/proc/",
-                "--exclude", "/sys/", "--exclude", "/run/", "--exclude", "/boot/*rescue*",
-                "--exclude", "/etc/machine-id", INSTALL_TREE + "/", util.getSysroot()]
+        args = ["-pogAXtlHrDx", "--out-format=%l"]
+        for pattern in LIVE_COPY_EXCLUDES:
+            args.extend(["--exclude", pattern])
+        args.extend([INSTALL_TREE + "/", util.getSysroot()])
         try:
-            rc = util.execWithRedirect(cmd, args)
+            with timeline.phase("Copy live image", "payload", {"command": cmd}):
+                rc = util.execWithRedirect(cmd, args, handle_line=handle_line)
         except (OSError, RuntimeError) as e:
             msg = None
             err = str(e)
@@ -160,10 +243,11 @@ class LiveImagePayload(ImagePayload):
             if errorHandler.cb(exn) == ERROR_RAISE:
                 raise exn
 
-        # Wait for progress thread to finish
-        with self.pct_lock:
-            self.pct = 100
-        threadMgr.wait(THREAD_LIVE_PROGRESS)
+        self._finish_install()
+
+    def _finish_install(self):
+        """Finish the installation of the copied image."""
+        self._progress.end()
 
         # Live needs to create the rescue image before bootloader is written
         if not os.path.exists(util.getSysroot() + "/usr/sbin/new-kernel-pkg"):
@@ -172,8 +256,9 @@ class LiveImagePayload(ImagePayload):
 
         for kernel in self.kernelVersionList:
             log.info("Generating rescue image for %s", kernel)
-            util.execInSysroot("new-kernel-pkg",
-                               ["--rpmposttrans", kernel])
+            with timeline.phase("Generate rescue image", "initramfs", {"kernel": kernel}):
+                util.execInSysroot("new-kernel-pkg",
+                                   ["--rpmposttrans", kernel])
 
     def postInstall(self):
         """ Perform post-installation tasks. """
@@ -225,7 +310,7 @@ class DownloadProgress(object):
             :param bytes_read: Bytes read so far
             :type bytes_read:  int
         """
-        if not bytes_read:
+        if not bytes_read or not self.size:
             return
         pct = min(100, int(100 * bytes_read / self.size))
 
@@ -248,6 +333,8 @@ class LiveImageKSPayload(LiveImagePayload):
         super(LiveImageKSPayload, self).__init__(*args, **kwargs)
         self._min_size = 0
         self._proxies = {}
+        self._tar_index = None
+        self._image_checksum = None
         self.image_path = util.getSysroot() + "/disk.img"
 
     @property
@@ -255,6 +342,12 @@ class LiveImageKSPayload(LiveImagePayload):
         """ Return True if the url ends with a tar suffix """
         return any(self.data.method.url.endswith(suffix) for suffix in TAR_SUFFIX)
 
+    @property
+    def is_streamed(self):
+        """ Return True if the tar image is extracted while it is downloaded """
+        return flags.liveimg_stream and self.is_tarfile \
+            and not self.data.method.url.startswith("file://")
+
     def _setup_url_image(self):
         """ Check to make sure the url is available and estimate the space
             needed to download and install it.
@@ -319,37 +412,127 @@ class LiveImageKSPayload(LiveImagePayload):
         # Skip LiveImagePayload's unsetup method
         ImagePayload.unsetup(self)
 
+    @staticmethod
+    def _is_resumed_response(response, offset):
+        """ Does the response continue the download at the offset?
+
+            :param response: a response to a range request
+            :param int offset: the requested offset
+        """
+        match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+        return bool(response.status_code == 206 and match and int(match.group(1)) == offset)
+
+    def _iter_url_image(self, start, update, restart=None):
+        """ Download the image and iterate over its chunks.
+
+            The checksum of the image is computed during the download.
+            An interrupted download is resumed with a HTTP range request.
+            If the server doesn't resume the download at the requested
+            offset, the download is restarted from the beginning.
+
+            :param start: a function called with the size of the image
+            :param update: a function called with the size of every chunk
+            :param restart: a function called before the chunks are iterated
+                            again from the beginning or None if the download
+                            can't be restarted
+            :raise requests.exceptions.RequestException: if the download fails
+        """
+        ssl_verify = not self.data.method.noverifyssl
+        sha256 = hashlib.sha256()
+        total_length = None
+        bytes_read = 0
+        attempt = 0
+
+        while True:
+            headers = {}
+            if bytes_read:
+                headers["Range"] = "bytes=%d-" % bytes_read
+
+            response = self._session.get(self.data.method.url, proxies=self._proxies,
+                                         verify=ssl_verify, stream=True, headers=headers)
+
+            if bytes_read and not self._is_resumed_response(response, bytes_read):
+                response.close()
+
+                if not restart:
+                    raise requests.exceptions.RequestException(
+                        "server didn't resume the download at %d bytes: %s %s"
+                        % (bytes_read, response.status_code,
+                           response.headers.get("Content-Range", "")))
+
+                log.warning("Server didn't resume the image download, restarting it.")
+                restart()
+                sha256 = hashlib.sha256()
+                bytes_read = 0
+                continue
+            elif not bytes_read and response.status_code != 200:
+                raise requests.exceptions.RequestException(
+                    "http request returned %s" % response.status_code)
+
+            if total_length is None:
+                # requests return headers as strings, so convert total_length to int
+                total_length = int(response.headers.get('content-length', 0))
+                if not total_length:
+                    log.warning("content-length header is missing for the installation image, "
+                                "download progress reporting will not be available")
+                start(total_length)
+
+            try:
+                for buf in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    if buf:
+                        sha256.update(buf)
+                        bytes_read += len(buf)
+                        update(len(buf))
+                        yield buf
+            except requests.exceptions.RequestException as e:
+                # Only downloads of a known size can be resumed.
+                attempt += 1
+                if not total_length or attempt > DOWNLOAD_RESUME_ATTEMPTS:
+                    raise
+
+                log.warning("Image download interrupted at %d bytes, resuming: %s", bytes_read, e)
+                continue
+
+            if total_length and bytes_read < total_length:
+                raise requests.exceptions.RequestException(
+                    "image download ended at %d of %d bytes" % (bytes_read, total_length))
+
+            break
+
+        self._image_checksum = sha256.hexdigest()
+        log.debug("sha256 of %s is %s", self.data.method.url, self._image_checksum)
+
     def _preInstall_url_image(self):
         """ Download the image using Requests with progress reporting"""
 
         error = None
         progress = DownloadProgress()
+        bytes_read = 0
+
+        def start(size):
+            progress.start(self.data.method.url, size)
+
+        def update(size):
+            nonlocal bytes_read
+            bytes_read += size
+            progress.update(bytes_read)
+
         try:
             log.info("Starting image download")
-            with open(self.image_path, "wb") as f:
-                ssl_verify = not self.data.method.noverifyssl
-                response = self._session.get(self.data.method.url, proxies=self._proxies, verify=ssl_verify, stream=True)
-                total_length = response.headers.get('content-length')
-                if total_length is None:  # no content length header
-                    # just download the file in one go and fake the progress reporting once done
-                    log.warning("content-length header is missing for the installation image, "
-                                "download progress reporting will not be available")
-                    f.write(response.content)
-                    size = f.tell()
-                    progress.start(self.data.method.url, size)
-                    progress.end(size)
-                else:
-                    # requests return headers as strings, so convert total_length to int
-                    progress.start(self.data.method.url, int(total_length))
-                    bytes_read = 0
-                    for buf in response.iter_content(1024 * 1024):  # 1 MB chunks
-                        if buf:
-                            f.write(buf)
-                            f.flush()
-                            bytes_read += len(buf)
-                            progress.update(bytes_read)
-                    progress.end(bytes_read)
-                log.info("Image download finished")
+            if not self._download_url_image_segments(start, update):
+                with open(self.image_path, "wb") as f:
+
+                    def restart():
+                        nonlocal bytes_read
+                        f.seek(0)
+                        f.truncate()
+                        bytes_read = 0
+                        progress.update(bytes_read)
+
+                    for buf in self._iter_url_image(start, update, restart):
+                        f.write(buf)
+            progress.end(bytes_read)
+            log.info("Image download finished")
         except requests.exceptions.RequestException as e:
             log.error("Error downloading liveimg: %s", e)
             error = e
@@ -358,6 +541,42 @@ class LiveImageKSPayload(LiveImagePayload):
                 error = "Failed to download %s, file doesn't exist" % self.data.method.url
                 log.error(error)
 
+        return error
+
+    def _download_url_image_segments(self, start, update):
+        """ Download the image over parallel HTTP range requests.
+
+            :param start: a function called with the size of the image
+            :param update: a function called with the size of every chunk
+            :returns: False if the image should be downloaded in one stream
+            :raise requests.exceptions.RequestException: if the download fails
+        """
+        if not self.data.method.url.startswith(("http://", "https://")):
+            return False
+
+        download = SegmentedDownload(self.data.method.url, self.image_path,
+                                     proxies=self._proxies,
+                                     verify=not self.data.method.noverifyssl)
+        try:
+            self._image_checksum = download.run(start, update)
+        except RangeNotSupported as e:
+            log.info("Downloading the image in one stream: %s", e)
+            return False
+
+        log.debug("sha256 of %s is %s", self.data.method.url, self._image_checksum)
+        return True
+
+    def _check_checksum(self, filesum):
+        """ Compare the checksum of the image with the expected one.
+
+            :param str filesum: the sha256 checksum of the image
+        """
+        if util.lowerASCII(self.data.method.checksum) != filesum:
+            log.error("%s does not match checksum.", self.data.method.checksum)
+            exn = PayloadInstallError("Checksum of image does not match")
+            if errorHandler.cb(exn) == ERROR_RAISE:
+                raise exn
+
     def preInstall(self):
         """ Get image and loopback mount it.
 
@@ -367,7 +586,12 @@ class LiveImageKSPayload(LiveImagePayload):
             callback).
 
             If it is a file:// source then use the file directly.
+
+            A streamed tar image is downloaded during the installation.
         """
+        if self.is_streamed:
+            return
+
         error = None
         if self.data.method.url.startswith("file://"):
             self.image_path = self.data.method.url[7:]
@@ -379,10 +603,10 @@ class LiveImageKSPayload(LiveImagePayload):
             if errorHandler.cb(exn) == ERROR_RAISE:
                 raise exn
 
-        # Used to make install progress % look correct
-        self._adj_size = os.stat(self.image_path)[stat.ST_SIZE]
-
-        if self.data.method.checksum:
+        # The checksum of a downloaded image is computed during the download.
+        if self.data.method.checksum and self._image_checksum:
+            self._check_checksum(self._image_checksum)
+        elif self.data.method.checksum:
             progressQ.send_message(_("Checking image checksum"))
             sha256 = hashlib.sha256()
             with open(self.image_path, "rb") as f:
@@ -393,12 +617,7 @@ class LiveImageKSPayload(LiveImagePayload):
                     sha256.update(data)
             filesum = sha256.hexdigest()
             log.debug("sha256 of %s is %s", self.data.method.url, filesum)
-
-            if util.lowerASCII(self.data.method.checksum) != filesum:
-                log.error("%s does not match checksum.", self.data.method.checksum)
-                exn = PayloadInstallError("Checksum of image does not match")
-                if errorHandler.cb(exn) == ERROR_RAISE:
-                    raise exn
+            self._check_checksum(filesum)
 
         # If this looks like a tarfile, skip trying to mount it
         if self.is_tarfile:
@@ -458,23 +677,32 @@ class LiveImageKSPayload(LiveImagePayload):
             super(LiveImageKSPayload, self).install()
             return
 
-        # Use 2x the archive's size to estimate the size of the install
-        # This is used to drive the progress display
-        self.source_size = os.stat(self.image_path)[stat.ST_SIZE] * 2
+        if self.is_streamed:
+            self._install_tar_stream()
+            return
+
+        # The size of the uncompressed archive drives the progress display.
+        _names, self.source_size = self._get_tar_index()
+        self._progress.start(self.source_size)
 
-        self.pct_lock = Lock()
-        self.pct = 0
-        threadMgr.add(AnacondaThread(name=THREAD_LIVE_PROGRESS,
-                                     target=self.progress))
+        def handle_line(line):
+            # tar prints the number of read bytes at every checkpoint.
+            match = TAR_CHECKPOINT_RE.search(line)
+            if not match:
+                return False
+            self._progress.set(int(match.group(1)))
+            return True
 
         cmd = "tar"
         # preserve: ACL's, xattrs, and SELinux context
         args = ["--selinux", "--acls", "--xattrs", "--xattrs-include", "*",
-                "--exclude", "/dev/", "--exclude", "/proc/",
-                "--exclude", "/sys/", "--exclude", "/run/", "--exclude", "/boot/*rescue*",
-                "--exclude", "/etc/machine-id", "-xaf", self.image_path, "-C", util.getSysroot()]
+                "--checkpoint=%d" % TAR_CHECKPOINT, "--checkpoint-action=echo=%T"]
+        for pattern in LIVE_COPY_EXCLUDES:
+            args.extend(["--exclude", pattern])
+        args.extend(["-xaf", self.image_path, "-C", util.getSysroot()])
         try:
-            rc = util.execWithRedirect(cmd, args)
+            with timeline.phase("Extract image", "payload"):
+                rc = util.execWithRedirect(cmd, args, handle_line=handle_line)
         except (OSError, RuntimeError) as e:
             msg = None
             err = str(e)
@@ -489,16 +717,73 @@ class LiveImageKSPayload(LiveImagePayload):
             if errorHandler.cb(exn) == ERROR_RAISE:
                 raise exn
 
-        # Wait for progress thread to finish
-        with self.pct_lock:
-            self.pct = 100
-        threadMgr.wait(THREAD_LIVE_PROGRESS)
+        self._finish_install()
 
-        # Live needs to create the rescue image before bootloader is written
-        for kernel in self.kernelVersionList:
-            log.info("Generating rescue image for %s", kernel)
-            util.execInSysroot("new-kernel-pkg",
-                               ["--rpmposttrans", kernel])
+    def _install_tar_stream(self):
+        """ Extract the tar image while it is downloaded.
+
+            The image is piped to tar and never stored on the disk, so
+            the names of the extracted files are collected from the output
+            of tar to create the index of the image.
+        """
+        names = []
+
+        def handle_output(stream):
+            for line in stream:
+                line = line.decode("utf-8", "replace").strip()
+                if TAR_CHECKPOINT_RE.search(line):
+                    continue
+                elif line.startswith("tar: "):
+                    log.info(line)
+                elif line:
+                    names.append(line)
+
+        compression = [option for (suffix, option) in TAR_COMPRESSION.items()
+                       if self.data.method.url.endswith(suffix)]
+
+        # preserve: ACL's, xattrs, and SELinux context
+        args = ["tar", "--selinux", "--acls", "--xattrs", "--xattrs-include", "*", "-v"]
+        for pattern in LIVE_COPY_EXCLUDES:
+            args.extend(["--exclude", pattern])
+        args.extend(compression + ["-xf", "-", "-C", util.getSysroot()])
+
+        log.info("Running... %s", " ".join(args))
+        proc = util.startProgram(args, stdin=subprocess.PIPE, stderr=subprocess.STDOUT)
+        reader = Thread(target=handle_output, args=(proc.stdout,))
+        reader.start()
+
+        err = None
+        try:
+            with timeline.phase("Download and extract image", "payload"):
+                for buf in self._iter_url_image(self._progress.start, self._progress.update):
+                    proc.stdin.write(buf)
+        except requests.exceptions.RequestException as e:
+            log.error("Error downloading liveimg: %s", e)
+            err = str(e)
+            proc.terminate()
+        except BrokenPipeError as e:
+            err = "tar exited before the end of the image: %s" % e
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        rc = proc.wait()
+        reader.join()
+        log.info("tar exited with code %d", rc)
+
+        if err:
+            exn = PayloadInstallError(err)
+            if errorHandler.cb(exn) == ERROR_RAISE:
+                raise exn
+
+        self._tar_index = (names, 0)
+
+        if self.data.method.checksum:
+            self._check_checksum(self._image_checksum)
+
+        self._finish_install()
 
     def postInstall(self):
         """ Unmount and remove image
@@ -531,10 +816,35 @@ class LiveImageKSPayload(LiveImagePayload):
         if not self.is_tarfile:
             return super(LiveImageKSPayload, self).kernelVersionList
 
-        import tarfile
-        with tarfile.open(self.image_path) as archive:
-            names = archive.getnames()
+        names, _size = self._get_tar_index()
+
+        # Strip out vmlinuz- from the names
+        return sorted((n.split("/")[-1][8:] for n in names if "boot/vmlinuz-" in n),
+                      key=functools.cmp_to_key(versionCmp))
+
+    def _get_tar_index(self):
+        """ Read the index of the tar image.
+
+            The archive is read only once, because reading a compressed
+            archive means decompressing all of it.
+
+            :returns: a tuple of the member names and the uncompressed size
+        """
+        if self._tar_index is None and self.is_streamed:
+            # The index is created during the extraction.
+            return [], 0
+
+        if self._tar_index is None:
+            import tarfile
+
+            names = []
+            size = 0
+            with tarfile.open(self.image_path) as archive:
+                for member in archive:
+                    names.append(member.name)
+                    blocks = (member.size + TAR_BLOCK_SIZE - 1) // TAR_BLOCK_SIZE
+                    size = max(size, member.offset_data + blocks * TAR_BLOCK_SIZE)
+
+            self._tar_index = (names, size)
 
-            # Strip out vmlinuz- from the names
-            return sorted((n.split("/")[-1][8:] for n in names if "boot/vmlinuz-" in n),
-                          key=functools.cmp_to_key(versionCmp))
+        return self._tar_index
@@ -0,0 +1,276 @@
+# package_cache.py
+# Persistent package cache shared across installations.
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import shutil
+import tempfile
+import threading
+
+from blivet.size import Size
+
+from pyanaconda.core import util
+from pyanaconda.core.constants import MOUNT_DIR
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["PackageCache", "PackageCacheError", "setup_package_cache"]
+
+PACKAGE_CACHE_MOUNT_DIR = MOUNT_DIR + "/pkgcache"
+PACKAGE_CACHE_DEFAULT_SIZE = Size("10 GiB")
+
+# a suffix of packages that are being stored in the cache
+PACKAGE_CACHE_PART_SUFFIX = ".part"
+
+
+class PackageCacheError(Exception):
+    """Raised when the package cache can't be set up."""
+    pass
+
+
+def setup_package_cache(location, max_size=None):
+    """Set up the package cache at the given location.
+
+    The location can be a local directory, a directory on a device
+    specified as hd:<device>:<path> or a directory on a NFS share
+    specified as nfs:[<options>:]<server>:<path>.
+
+    :param str location: a location of the cache
+    :param max_size: a maximal size of the cache or None for the default
+    :type max_size: Size or None
+    :returns: an instance of the package cache
+    :raise PackageCacheError: if the location can't be mounted
+    """
+    import blivet.util
+
+    if location.startswith("nfs:"):
+        options, server, path = util.parseNfsUrl(location)
+        device, fstype, path = "%s:%s" % (server, path), "nfs", ""
+        options = options or "nolock"
+    elif location.startswith("hd:"):
+        _prefix, device, path = location.split(":", 2)
+        fstype, options = "auto", None
+    else:
+        device, path = None, location
+
+    if device:
+        util.mkdirChain(PACKAGE_CACHE_MOUNT_DIR)
+
+        if not os.path.ismount(PACKAGE_CACHE_MOUNT_DIR):
+            log.info("mounting the package cache %s on %s", device, PACKAGE_CACHE_MOUNT_DIR)
+            try:
+                blivet.util.mount(device, PACKAGE_CACHE_MOUNT_DIR, fstype=fstype, options=options)
+            except OSError as e:
+                raise PackageCacheError(str(e))
+
+        path = os.path.normpath(PACKAGE_CACHE_MOUNT_DIR + "/" + path)
+
+    return PackageCache(path, max_size or PACKAGE_CACHE_DEFAULT_SIZE)
+
+
+class PackageCache(object):
+    """A content addressed cache of downloaded packages.
+
+    Packages are stored under their checksums, so the cache can be
+    shared by installations from different repositories. The least
+    recently used packages are evicted when the cache exceeds its
+    maximal size.
+    """
+
+    def __init__(self, path, max_size):
+        """Create a new package cache.
+
+        :param str path: a path to the cache directory
+        :param Size max_size: a maximal size of the cache
+        """
+        self._path = path
+        self._max_size = Size(max_size)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._hit_size = Size(0)
+
+        util.mkdirChain(self._path)
+
+    @property
+    def path(self):
+        """A path to the cache directory."""
+        return self._path
+
+    @property
+    def hits(self):
+        """A number of packages served from the cache."""
+        return self._hits
+
+    @property
+    def misses(self):
+        """A number of packages not found in the cache."""
+        return self._misses
+
+    def _get_cache_path(self, checksum_type, checksum):
+        return os.path.join(self._path, checksum_type, checksum[:2], checksum + ".rpm")
+
+    def _get_package_path(self, package):
+        checksum_type, checksum = package.returnIdSum()
+        return self._get_cache_path(checksum_type, checksum)
+
+    @staticmethod
+    def _is_local(package):
+        """Is the package read directly from the installation source?
+
+        Packages of local repositories are never downloaded and
+        their local paths point to the installation source.
+        """
+        return package._is_local_pkg()  # pylint: disable=protected-access
+
+    def fetch(self, package):
+        """Copy the package from the cache to its download location.
+
+        :param package: a DNF package
+        :returns: True if the package was found in the cache, otherwise False
+        """
+        if self._is_local(package):
+            return False
+
+        cache_path = self._get_package_path(package)
+        target_path = package.localPkg()
+
+        if not os.path.exists(cache_path):
+            return self._miss()
+
+        try:
+            util.mkdirChain(os.path.dirname(target_path))
+            self._link_or_copy(cache_path, target_path)
+
+            # DNF doesn't verify packages that are not downloaded, so never
+            # serve a truncated or corrupted package from the cache.
+            if not package.verifyLocalPkg():
+                log.warning("Removing invalid %s from the package cache.", package)
+                self._remove(target_path)
+                self._remove(cache_path)
+                return self._miss()
+
+            # Mark the package as recently used.
+            os.utime(cache_path)
+            size = os.path.getsize(cache_path)
+        except OSError as e:
+            # The package could have been evicted by another installation.
+            log.debug("Failed to fetch %s from the package cache: %s", package, e)
+            self._remove(target_path)
+            return self._miss()
+
+        with self._lock:
+            self._hits += 1
+            self._hit_size += Size(size)
+
+        return True
+
+    def _miss(self):
+        with self._lock:
+            self._misses += 1
+        return False
+
+    def store(self, package):
+        """Store the downloaded package in the cache.
+
+        :param package: a downloaded DNF package
+        """
+        if self._is_local(package):
+            return
+
+        cache_path = self._get_package_path(package)
+        source_path = package.localPkg()
+
+        if os.path.exists(cache_path) or not os.path.exists(source_path):
+            return
+
+        cache_dir = os.path.dirname(cache_path)
+        util.mkdirChain(cache_dir)
+
+        # Other installations can share the cache, so never
+        # expose a partially written package.
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=PACKAGE_CACHE_PART_SUFFIX)
+        os.close(fd)
+
+        try:
+            self._link_or_copy(source_path, temp_path)
+            os.rename(temp_path, cache_path)
+        except OSError as e:
+            log.warning("Failed to store %s in the package cache: %s", package, e)
+            self._remove(temp_path)
+
+    def evict(self):
+        """Remove the least recently used packages above the maximal size."""
+        entries = []
+        total_size = 0
+
+        for root, _dirs, files in os.walk(self._path):
+            for name in files:
+                # Skip packages that are being stored by other installations.
+                if name.endswith(PACKAGE_CACHE_PART_SUFFIX):
+                    continue
+
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+
+            try:
+                os.unlink(path)
+            except OSError as e:
+                log.debug("Failed to evict %s from the package cache: %s", path, e)
+                continue
+
+            total_size -= size
+            removed += 1
+
+        log.info("Package cache %s: %d packages evicted, %s of %s used.",
+                 self._path, removed, Size(total_size), self._max_size)
+
+    def log_statistics(self):
+        """Write the hit and miss statistics to the log."""
+        log.info("Package cache %s: %d hits (%s), %d misses.",
+                 self._path, self._hits, self._hit_size, self._misses)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.debug("Failed to remove %s: %s", path, e)
+
+    @staticmethod
+    def _link_or_copy(source, target):
+        if os.path.exists(target):
+            os.unlink(target)
+
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
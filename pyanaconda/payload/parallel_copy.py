@@ -0,0 +1,405 @@
+# parallel_copy.py
+# Parallel copy of a directory tree preserving all file metadata.
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+"""Parallel copy of a directory tree.
+
+The copy preserves the same metadata as rsync -pogAXtlHrDx does:
+permissions, owners, groups, ACLs and extended attributes (including
+SELinux labels), times, symlinks, hardlinks, devices and special files.
+It doesn't cross file system boundaries.
+
+Regular files are grouped into work units that are copied by a pool of
+workers. The data are cloned with the FICLONE ioctl if the target file
+system supports reflinks, otherwise they are copied in the kernel with
+copy_file_range.
+"""
+import errno
+import fcntl
+import os
+import re
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["CopyError", "ParallelCopy"]
+
+# The FICLONE ioctl request from linux/fs.h.
+FICLONE = 0x40049409
+
+# Maximal number of bytes and files in one work unit.
+WORK_UNIT_SIZE = 64 * 1024 * 1024
+WORK_UNIT_FILES = 512
+
+# Size of chunks copied by one call of copy_file_range.
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class CopyError(Exception):
+    """Raised when some files failed to copy."""
+    pass
+
+
+class ParallelCopy(object):
+    """Copy a directory tree with a pool of workers."""
+
+    def __init__(self, source, target, excludes=(), workers=None, progress=None):
+        """Create a new copy.
+
+        The excluded patterns follow the rsync rules: a pattern starting
+        with a slash is matched against the path relative to the source,
+        otherwise it is matched against the end of the path, and a pattern
+        ending with a slash matches only directories. The wildcards * and ?
+        don't match a slash, ** matches anything.
+
+        The progress object is started with the total size of the copied
+        files and updated with the size of every copied file.
+
+        :param str source: a path to the source directory
+        :param str target: a path to the target directory
+        :param excludes: a list of patterns of excluded files
+        :param int workers: a number of workers or None for the default
+        :param progress: an object with methods start(size) and update(size) or None
+        """
+        self._source = os.path.normpath(source)
+        self._target = os.path.normpath(target)
+        self._excludes = [self._compile_pattern(pattern) for pattern in excludes]
+        self._workers = workers or min(16, (os.cpu_count() or 1) * 2)
+        self._progress = progress
+        self._errors = []
+        self._scanned = False
+        self._total_size = 0
+
+        # the source file system
+        self._source_dev = None
+        # directories need their metadata set once they are filled
+        self._directories = []
+        # symlinks, devices and special files
+        self._special_files = []
+        # hardlinks are created once their first file is copied, the
+        # map of inodes covers all files except directories
+        self._inodes = {}
+        self._hardlinks = []
+        # work units of regular files
+        self._units = []
+        self._unit = []
+        self._unit_size = 0
+
+    @property
+    def errors(self):
+        """A list of errors that occurred during the copy."""
+        return self._errors
+
+    def scan(self):
+        """Scan the source directory tree.
+
+        The scan doesn't modify the target.
+
+        :returns: a total size of the copied files in bytes
+        """
+        if not self._scanned:
+            self._source_dev = os.lstat(self._source).st_dev
+            self._scan(self._source, os.lstat(self._source))
+            self._close_unit()
+            self._scanned = True
+
+            log.debug("Scanned %s into %d work units of %d bytes.",
+                      self._source, len(self._units), self._total_size)
+
+        return self._total_size
+
+    def run(self):
+        """Copy the directory tree.
+
+        :raise CopyError: if some of the files failed to copy
+        """
+        log.info("Copying %s to %s with %d workers.", self._source, self._target, self._workers)
+        self.scan()
+
+        if self._progress:
+            self._progress.start(self._total_size)
+
+        for (_source, target, _st) in self._directories:
+            self._call(self._make_dir, target)
+
+        for (source, st) in self._special_files:
+            self._call(self._copy_special, source, st)
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            for _result in executor.map(self._copy_unit, self._units):
+                pass
+
+        for (target, link) in self._hardlinks:
+            self._call(self._link, target, link)
+
+        # Set metadata of the deepest directories first.
+        for (source, target, st) in reversed(self._directories):
+            self._call(self._copy_metadata, source, target, st)
+
+        if self._errors:
+            raise CopyError("Failed to copy %d files, the first error: %s"
+                            % (len(self._errors), self._errors[0]))
+
+    def _call(self, function, *args):
+        """Call the function and remember an OSError."""
+        try:
+            function(*args)
+        except OSError as e:
+            log.error("Failed to copy: %s", e)
+            self._errors.append(e)
+
+    @staticmethod
+    def _compile_pattern(pattern):
+        """Compile the rsync pattern.
+
+        :returns: a compiled regular expression and a flag of directory patterns
+        """
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+
+        # An anchored pattern matches the whole path, other patterns
+        # match its trailing components.
+        regex = "^" if pattern.startswith("/") else "(?:^|/)"
+        i = 0
+
+        while i < len(pattern):
+            c = pattern[i]
+            i += 1
+
+            if c == "\\" and i < len(pattern):
+                regex += re.escape(pattern[i])
+                i += 1
+            elif c == "*" and pattern[i:i + 1] == "*":
+                regex += ".*"
+                i += 1
+            elif c == "*":
+                regex += "[^/]*"
+            elif c == "?":
+                regex += "[^/]"
+            elif c == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                chars = pattern[i:end].replace("\\", "\\\\")
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += "[" + chars + "]"
+                i = end + 1
+            else:
+                regex += re.escape(c)
+
+        return re.compile(regex + "$"), dir_only
+
+    def _is_excluded(self, relative_path, is_dir):
+        for (regex, dir_only) in self._excludes:
+            if dir_only and not is_dir:
+                continue
+
+            if regex.search(relative_path):
+                return True
+
+        return False
+
+    def _get_target_path(self, source):
+        return self._target + source[len(self._source):]
+
+    def _scan(self, source, st):
+        """Scan the directory and its content."""
+        target = self._get_target_path(source)
+        self._directories.append((source, target, st))
+
+        # Don't cross file system boundaries, but keep the mount point.
+        if st.st_dev != self._source_dev:
+            return
+
+        try:
+            entries = list(os.scandir(source))
+        except OSError as e:
+            log.error("Failed to scan %s: %s", source, e)
+            self._errors.append(e)
+            return
+
+        for entry in entries:
+            try:
+                entry_st = entry.stat(follow_symlinks=False)
+            except OSError as e:
+                self._errors.append(e)
+                continue
+
+            is_dir = stat.S_ISDIR(entry_st.st_mode)
+            relative_path = entry.path[len(self._source):]
+
+            if self._is_excluded(relative_path, is_dir):
+                continue
+
+            if is_dir:
+                self._scan(entry.path, entry_st)
+            elif self._add_hardlink(entry.path, entry_st):
+                continue
+            elif stat.S_ISREG(entry_st.st_mode):
+                self._add_file(entry.path, entry_st)
+            else:
+                self._special_files.append((entry.path, entry_st))
+
+    def _add_hardlink(self, source, st):
+        """Add a hardlink if the file is a link to an already scanned file.
+
+        :returns: True if the hardlink was added, otherwise False
+        """
+        if st.st_nlink < 2:
+            return False
+
+        target = self._get_target_path(source)
+        inode = (st.st_dev, st.st_ino)
+
+        if inode not in self._inodes:
+            self._inodes[inode] = target
+            return False
+
+        self._hardlinks.append((self._inodes[inode], target))
+        return True
+
+    def _add_file(self, source, st):
+        """Add the regular file to a work unit."""
+        target = self._get_target_path(source)
+        self._unit.append((source, target, st))
+        self._unit_size += st.st_size
+        self._total_size += st.st_size
+
+        if self._unit_size >= WORK_UNIT_SIZE or len(self._unit) >= WORK_UNIT_FILES:
+            self._close_unit()
+
+    def _close_unit(self):
+        if self._unit:
+            self._units.append(self._unit)
+        self._unit = []
+        self._unit_size = 0
+
+    def _copy_unit(self, unit):
+        for (source, target, st) in unit:
+            self._call(self._copy_file, source, target, st)
+
+    @staticmethod
+    def _make_dir(target):
+        try:
+            os.mkdir(target, 0o700)
+        except FileExistsError:
+            if not os.path.isdir(target) or os.path.islink(target):
+                os.unlink(target)
+                os.mkdir(target, 0o700)
+
+    @staticmethod
+    def _remove(target):
+        try:
+            os.unlink(target)
+        except FileNotFoundError:
+            pass
+        except IsADirectoryError:
+            os.rmdir(target)
+
+    def _link(self, target, link):
+        self._remove(link)
+        os.link(target, link)
+
+    def _copy_file(self, source, target, st):
+        """Copy the regular file and its metadata."""
+        self._remove(target)
+
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            self._copy_data(src.fileno(), dst.fileno(), st.st_size)
+
+        self._copy_metadata(source, target, st)
+
+        if self._progress:
+            self._progress.update(st.st_size)
+
+    @staticmethod
+    def _copy_data(src_fd, dst_fd, size):
+        """Copy data between the file descriptors."""
+        if not size:
+            return
+
+        # Clone the file if the file system supports reflinks.
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+            return
+        except OSError:
+            pass
+
+        copied = 0
+        try:
+            while copied < size:
+                count = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+                if not count:
+                    break
+                copied += count
+            return
+        except AttributeError:
+            # The copy_file_range function is not available.
+            pass
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+
+        # Copy the rest in the user space.
+        os.lseek(src_fd, copied, os.SEEK_SET)
+        os.lseek(dst_fd, copied, os.SEEK_SET)
+        while True:
+            data = os.read(src_fd, 1024 * 1024)
+            if not data:
+                break
+            os.write(dst_fd, data)
+
+    def _copy_special(self, source, st):
+        """Copy the symlink, device or special file and its metadata."""
+        target = self._get_target_path(source)
+        self._remove(target)
+
+        if stat.S_ISLNK(st.st_mode):
+            os.symlink(os.readlink(source), target)
+        else:
+            os.mknod(target, st.st_mode, st.st_rdev)
+
+        self._copy_metadata(source, target, st)
+
+    @staticmethod
+    def _copy_metadata(source, target, st):
+        """Copy owners, permissions, extended attributes and times.
+
+        ACLs and SELinux labels are stored in the extended attributes.
+        """
+        is_link = stat.S_ISLNK(st.st_mode)
+
+        # Change owners first, because it clears the setuid bits.
+        os.chown(target, st.st_uid, st.st_gid, follow_symlinks=False)
+
+        if not is_link:
+            os.chmod(target, stat.S_IMODE(st.st_mode))
+
+        try:
+            names = os.listxattr(source, follow_symlinks=False)
+        except OSError as e:
+            if e.errno not in (errno.ENOTSUP, errno.ENODATA):
+                raise
+            names = []
+
+        for name in names:
+            value = os.getxattr(source, name, follow_symlinks=False)
+            os.setxattr(target, name, value, follow_symlinks=False)
+
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns), follow_symlinks=False)
@@ -0,0 +1,248 @@
+# segmented_download.py
+# Download of a file over parallel HTTP range requests.
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from pyanaconda.core import util
+
+from pyanaconda.anaconda_loggers import get_packaging_logger
+log = get_packaging_logger()
+
+__all__ = ["RangeNotSupported", "SegmentedDownload"]
+
+# number of parallel connections
+DOWNLOAD_CONNECTIONS = 4
+
+# size of one downloaded segment
+SEGMENT_SIZE = 32 * 1024 * 1024
+
+# size of chunks read from a response
+CHUNK_SIZE = 1024 * 1024
+
+# number of attempts to download one segment
+SEGMENT_ATTEMPTS = 5
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class RangeNotSupported(Exception):
+    """Raised when the server doesn't support range requests."""
+    pass
+
+
+class SegmentedDownload(object):
+    """Download a file in segments fetched by parallel range requests.
+
+    The segments are written into a preallocated file. A single TCP
+    stream is often limited well below the speed of a link with a high
+    latency, parallel streams are not.
+    """
+
+    def __init__(self, url, path, proxies=None, verify=True,
+                 connections=DOWNLOAD_CONNECTIONS, segment_size=SEGMENT_SIZE):
+        """Create a new download.
+
+        :param str url: the URL of the file
+        :param str path: the path of the downloaded file
+        :param dict proxies: the proxies for requests or None
+        :param bool verify: whether to verify the SSL certificates
+        :param int connections: the number of parallel connections
+        :param int segment_size: the size of one segment in bytes
+        """
+        self._url = url
+        self._path = path
+        self._proxies = proxies or {}
+        self._verify = verify
+        self._connections = connections
+        self._segment_size = segment_size
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._update = None
+        self._size = None
+
+        # Keep a pooled connection for every worker.
+        self._session = util.requests_session()
+        adapter = HTTPAdapter(pool_maxsize=connections)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def run(self, start=None, update=None):
+        """Download the file.
+
+        The checksum is computed from the segments as they complete,
+        while they are still in the page cache.
+
+        :param start: a function called with the size of the file or None
+        :param update: a function called with the size of every chunk or None
+        :returns: the sha256 checksum of the file
+        :raise RangeNotSupported: if the server doesn't support range requests
+        :raise RequestException: if the download fails
+        """
+        self._update = update
+
+        # The first segment finds out if ranges are supported.
+        response = self._get(0, self._segment_size - 1)
+        if response.status_code != 206:
+            response.close()
+            raise RangeNotSupported("server returned %s to a range request" % response.status_code)
+
+        try:
+            size = self._check_range(response, 0, self._segment_size - 1)
+        except RequestException as e:
+            response.close()
+            raise RangeNotSupported(str(e))
+
+        self._size = size
+        if not size:
+            response.close()
+            open(self._path, "wb").close()
+            return hashlib.sha256().hexdigest()
+
+        segments = [(offset, min(offset + self._segment_size, size) - 1)
+                    for offset in range(0, size, self._segment_size)]
+
+        log.info("Downloading %s in %d segments over %d connections.",
+                 self._url, len(segments), self._connections)
+
+        if start:
+            start(size)
+
+        sha256 = hashlib.sha256()
+        futures = []
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+
+        try:
+            self._preallocate(fd, size)
+
+            with ThreadPoolExecutor(max_workers=self._connections) as executor:
+                try:
+                    futures.append(executor.submit(self._download_segment, fd, segments[0],
+                                                   response))
+                    futures.extend(executor.submit(self._download_segment, fd, segment)
+                                   for segment in segments[1:])
+
+                    for (future, (offset, end)) in zip(futures, segments):
+                        future.result()
+                        self._hash_segment(fd, sha256, offset, end)
+                except BaseException:
+                    # Stop the download before the executor waits for the segments.
+                    self._cancelled.set()
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            os.close(fd)
+
+        return sha256.hexdigest()
+
+    def _get(self, offset, end):
+        headers = {"Range": "bytes=%d-%d" % (offset, end)}
+        return self._session.get(self._url, headers=headers, proxies=self._proxies,
+                                 verify=self._verify, stream=True)
+
+    @staticmethod
+    def _check_range(response, offset, end, size=None):
+        """Check that the response contains the requested range.
+
+        :param response: a response to a range request
+        :param int offset: the first requested byte
+        :param int end: the last requested byte
+        :param size: the expected size of the file or None
+        :returns: the size of the file
+        :raise RequestException: if the response contains a different range
+        """
+        content_range = response.headers.get("content-range", "")
+        match = CONTENT_RANGE_RE.match(content_range)
+        if not match:
+            raise RequestException("server returned no content range")
+
+        first, last, total = (int(value) for value in match.groups())
+        if first != offset or (total and last != min(end, total - 1)) \
+                or size not in (None, total):
+            raise RequestException("server returned %s instead of bytes %d-%d"
+                                   % (content_range, offset, end))
+
+        return total
+
+    @staticmethod
+    def _preallocate(fd, size):
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            os.ftruncate(fd, size)
+
+    def _download_segment(self, fd, segment, response=None):
+        """Download the segment and write it at its offset."""
+        offset, end = segment
+        attempt = 0
+
+        while offset <= end and not self._cancelled.is_set():
+            try:
+                if response is None:
+                    response = self._get(offset, end)
+
+                if response.status_code != 206:
+                    raise RequestException("http request returned %s" % response.status_code)
+
+                # Never write bytes of a different range at the offset.
+                self._check_range(response, offset, end, self._size)
+
+                for buf in response.iter_content(CHUNK_SIZE):
+                    if self._cancelled.is_set():
+                        return
+
+                    if not buf:
+                        continue
+
+                    buf = buf[:end - offset + 1]
+                    os.pwrite(fd, buf, offset)
+                    offset += len(buf)
+
+                    if self._update:
+                        with self._lock:
+                            self._update(len(buf))
+
+                if offset <= end:
+                    raise RequestException("segment ended at %d of %d" % (offset, end))
+            except RequestException as e:
+                attempt += 1
+                if attempt >= SEGMENT_ATTEMPTS:
+                    raise
+
+                log.warning("Segment download interrupted at %d, resuming: %s", offset, e)
+            finally:
+                if response is not None:
+                    response.close()
+                response = None
+
+    @staticmethod
+    def _hash_segment(fd, sha256, offset, end):
+        while offset <= end:
+            data = os.pread(fd, min(CHUNK_SIZE, end - offset + 1), offset)
+            if not data:
+                break
+            sha256.update(data)
+            offset += len(data)
@@ -420,12 +420,13 @@ def distribute_kickstart_with_boss(kickstart_path):
 
     log.info("Boss.SplitKickstart(%s):\n%s", kickstart_path, boss.UnprocessedKickstart)
 
-    timeout = 10
-    while not boss.AllModulesAvailable and timeout > 0:
-        log.info("Waiting %d sec for modules to be started", timeout)
-        time.sleep(1)
-        timeout = timeout - 1
-    if not timeout:
+    log.info("Waiting for modules to be started.")
+    deadline = time.monotonic() + constants.MODULES_STARTUP_TIMEOUT
+    while not boss.ModulesStartupFinished and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    log.info("Boss.ModulesStartupMetrics: %s", boss.ModulesStartupMetrics)
+    if not boss.AllModulesAvailable:
         log.warning("Waiting for modules to be started timed out")
         return False
 
@@ -21,6 +21,7 @@
 import re
 import locale
 import os
+import threading
 
 from contextlib import contextmanager
 
@@ -43,8 +44,9 @@ from pyanaconda import isys
 from pyanaconda.core.constants import productName, STORAGE_SWAP_IS_RECOMMENDED, \
                                       STORAGE_MUST_BE_ON_ROOT, STORAGE_MUST_BE_ON_LINUXFS, \
                                       STORAGE_MIN_PARTITION_SIZES, STORAGE_MIN_ROOT, \
-                                      STORAGE_MIN_RAM
+                                      STORAGE_MIN_RAM, THREAD_STORAGE_SNAPSHOT
 from pyanaconda.errors import errorHandler, ERROR_RAISE
+from pyanaconda.threading import threadMgr, AnacondaThread
 from pyanaconda.platform import platform as _platform
 
 from pykickstart.constants import AUTOPART_TYPE_PLAIN, AUTOPART_TYPE_BTRFS
@@ -734,7 +736,16 @@ def try_populate_devicetree(devicetree):
     return
 
 class StorageSnapshot(object):
-    """R/W snapshot of storage (i.e. a :class:`pyanaconda.storage.InstallerStorage` instance)"""
+    """R/W snapshot of storage (i.e. a :class:`pyanaconda.storage.InstallerStorage` instance)
+
+    A spare copy of the snapshot can be prepared in a background thread
+    before an expected reset, so the reset only hands it over instead of
+    copying the whole device tree. The spare copy takes as much memory as
+    the snapshot itself, so it is used only once and it should be dropped
+    as soon as the reset is no longer expected. Every created or disposed
+    snapshot and every dropped spare copy starts a new generation and
+    copies of older generations are dropped.
+    """
 
     def __init__(self, storage=None):
         """
@@ -743,10 +754,13 @@ class StorageSnapshot(object):
         :param storage: if given, its snapshot is created
         :type storage: :class:`pyanaconda.storage.InstallerStorage`
         """
+        self._storage_snap = None
+        self._spare_copy = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
         if storage:
-            self._storage_snap = storage.copy()
-        else:
-            self._storage_snap = None
+            self.create_snapshot(storage)
 
     @property
     def storage(self):
@@ -758,8 +772,12 @@ class StorageSnapshot(object):
 
     def create_snapshot(self, storage):
         """Create (and save) snapshot of storage"""
+        snapshot = storage.copy()
 
-        self._storage_snap = storage.copy()
+        with self._lock:
+            self._storage_snap = snapshot
+            self._spare_copy = None
+            self._generation += 1
 
     def dispose_snapshot(self):
         """
@@ -770,7 +788,82 @@ class StorageSnapshot(object):
             In order to free the memory taken by the snapshot, all references
             returned by :property:`self.storage` have to be unrefed too.
         """
-        self._storage_snap = None
+        with self._lock:
+            # A copy in progress is dropped once it is finished.
+            self._storage_snap = None
+            self._spare_copy = None
+            self._generation += 1
+
+    def drop_spare_copy(self):
+        """Drop the spare copy of the snapshot and abandon a copy in progress."""
+        with self._lock:
+            self._spare_copy = None
+            self._generation += 1
+
+    def _get_thread_name(self, generation):
+        """Return the name of the thread copying the given generation."""
+        return "%s-%d" % (THREAD_STORAGE_SNAPSHOT, generation)
+
+    def prepare_spare_copy(self):
+        """Start to copy the snapshot in a background thread.
+
+        The copy is used by the next reset. Call :meth:`drop_spare_copy`
+        if no reset is expected anymore.
+        """
+        with self._lock:
+            snapshot = self._storage_snap
+            generation = self._generation
+
+            if not snapshot or self._spare_copy:
+                return
+
+        name = self._get_thread_name(generation)
+
+        if threadMgr.get(name):
+            return
+
+        threadMgr.add(AnacondaThread(name=name,
+                                     target=self._copy_snapshot,
+                                     args=(snapshot, generation)))
+
+    def _copy_snapshot(self, snapshot, generation):
+        """Copy the snapshot and keep it as the spare copy."""
+        try:
+            spare_copy = snapshot.copy()
+        except Exception as e:  # pylint: disable=broad-except
+            # The copy will be created on demand.
+            log.warning("Failed to copy the storage snapshot: %s", e)
+            return
+
+        with self._lock:
+            # Drop the copy of a disposed or replaced snapshot.
+            if self._generation == generation:
+                self._spare_copy = spare_copy
+
+    def _take_spare_copy(self, dispose):
+        """Return a copy of the snapshot that can be modified.
+
+        :param bool dispose: whether the snapshot will be disposed
+        """
+        # Don't wait for the spare copy if the snapshot itself can be used.
+        # Otherwise, the copy in progress is done sooner than a new one.
+        if not dispose:
+            with self._lock:
+                generation = self._generation
+
+            threadMgr.wait(self._get_thread_name(generation))
+
+        with self._lock:
+            new_copy, self._spare_copy = self._spare_copy, None
+
+            if not new_copy and dispose:
+                new_copy, self._storage_snap = self._storage_snap, None
+
+        if not new_copy:
+            log.debug("No spare copy of the storage snapshot is available.")
+            new_copy = self._storage_snap.copy()
+
+        return new_copy
 
     def reset_to_snapshot(self, storage, dispose=False):
         """
@@ -783,10 +876,10 @@ class StorageSnapshot(object):
         if not self.created:
             raise ValueError("No snapshot created, cannot reset")
 
-        # we need to create a new copy from the snapshot first -- simple
-        # assignment from the snapshot would result in snapshot being modified
-        # by further changes of 'storage'
-        new_copy = self._storage_snap.copy()
+        # we need to use a copy of the snapshot -- simple assignment from the
+        # snapshot would result in snapshot being modified by further changes
+        # of 'storage'
+        new_copy = self._take_spare_copy(dispose)
         storage.devicetree = new_copy.devicetree
         storage.roots = new_copy.roots
         storage.fsset = new_copy.fsset
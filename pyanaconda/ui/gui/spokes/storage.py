@@ -616,6 +616,9 @@ class StorageSpoke(NormalSpoke, StorageCheckHandler):
     def refresh(self):
         self._back_clicked = False
 
+        # the storage might be reset to the snapshot when leaving the spoke
+        on_disk_storage.prepare_spare_copy()
+
         self.disks = getDisks(self.storage.devicetree)
 
         # synchronize our local data store with the global ksdata
@@ -1008,12 +1011,14 @@ class StorageSpoke(NormalSpoke, StorageCheckHandler):
             on_disk_storage.create_snapshot(self.storage)
 
         if self.autopart_missing_passphrase:
+            on_disk_storage.drop_spare_copy()
             self._setup_passphrase()
             NormalSpoke.on_back_clicked(self, button)
             return
 
         # No disks selected?  The user wants to back out of the storage spoke.
         if not self.selected_disks:
+            on_disk_storage.drop_spare_copy()
             NormalSpoke.on_back_clicked(self, button)
             return
 
@@ -1049,6 +1054,9 @@ class StorageSpoke(NormalSpoke, StorageCheckHandler):
             on_disk_storage.reset_to_snapshot(self.storage)
             self.disks = getDisks(self.storage.devicetree)
         else:
+            # don't keep the spare copy of the snapshot after leaving the spoke
+            on_disk_storage.drop_spare_copy()
+
             # Remove all non-existing devices if autopart was active when we last
             # refreshed.
             if self._previous_autopart:
@@ -140,48 +140,94 @@ def guess_username(fullname):
     username = strip_accents(username)
     return username
 
+class AccountDatabase(object):
+    """An index of an account database like /etc/passwd or /etc/group.
+
+       The file is parsed once and parsed again only when it changes. The
+       tools of shadow-utils replace the file with a new one, so a change
+       of the inode, size or modification time marks a new content.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._stamp = None
+        self._by_name = {}
+        self._by_id = {}
+
+    def _refresh(self):
+        st = os.stat(self._path)
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+        if stamp == self._stamp:
+            return
+
+        self._by_name = {}
+        self._by_id = {}
+
+        with open(self._path, "r") as f:
+            for line in f:
+                fields = line.rstrip("\n").split(":")
+                if len(fields) < 3:
+                    continue
+
+                # The first entry wins, the same as in the libc lookups.
+                self._by_name.setdefault(fields[0], fields)
+                self._by_id.setdefault(fields[2], fields)
+
+        self._stamp = stamp
+
+    def invalidate(self):
+        """Parse the file again on the next lookup."""
+        self._stamp = None
+
+    def get_by_name(self, name):
+        """Return the fields of the entry with the given name or None."""
+        self._refresh()
+        return self._by_name.get(name)
+
+    def get_by_id(self, entry_id):
+        """Return the fields of the entry with the given ID or None."""
+        self._refresh()
+        return self._by_id.get(str(entry_id))
+
+
 class Users(object):
+    def __init__(self):
+        # account databases of the roots
+        self._databases = {}
+
+    def _getDatabase(self, root, name):
+        key = (root, name)
+        if key not in self._databases:
+            self._databases[key] = AccountDatabase(root + "/etc/" + name)
+
+        return self._databases[key]
+
+    def _invalidateDatabases(self, root):
+        """Invalidate the account databases after a change by an external tool."""
+        for name in ("passwd", "group"):
+            self._getDatabase(root, name).invalidate()
+
     def _getpwnam(self, user_name, root):
         """Like pwd.getpwnam, but is able to use a different root.
 
            Also just returns the pwd structure as a list, because of laziness.
         """
-        with open(root + "/etc/passwd", "r") as f:
-            for line in f:
-                fields = line.split(":")
-                if fields[0] == user_name:
-                    return fields
-
-        return None
+        return self._getDatabase(root, "passwd").get_by_name(user_name)
 
     def _getgrnam(self, group_name, root):
         """Like grp.getgrnam, but able to use a different root.
 
             Just returns the grp structure as a list, same reason as above.
         """
-        with open(root + "/etc/group", "r") as f:
-            for line in f:
-                fields = line.split(":")
-                if fields[0] == group_name:
-                    return fields
-
-        return None
+        return self._getDatabase(root, "group").get_by_name(group_name)
 
     def _getgrgid(self, gid, root):
         """Like grp.getgrgid, but able to use a different root.
 
            Just returns the fields as a list of strings.
         """
-        # Conver the probably-int GID to a string
-        gid = str(gid)
-
-        with open(root + "/etc/group", "r") as f:
-            for line in f:
-                fields = line.split(":")
-                if fields[2] == gid:
-                    return fields
-
-        return None
+        return self._getDatabase(root, "group").get_by_id(gid)
 
     @contextmanager
     def _ensureLoginDefs(self, root):
@@ -225,6 +271,8 @@ class Users(object):
         with self._ensureLoginDefs(root):
             status = util.execWithRedirect("groupadd", args)
 
+        self._invalidateDatabases(root)
+
         if status == 4:
             raise ValueError("GID %s already exists" % kwargs.get("gid"))
         elif status == 9:
@@ -232,6 +280,63 @@ class Users(object):
         elif status != 0:
             raise OSError("Unable to create group %s: status=%s" % (group_name, status))
 
+    def createAccounts(self, groups=(), users=(), ssh_keys=(), root=None):
+        """Create many groups, users and SSH keys in one pass.
+
+           The account databases are indexed once and the passwords of all
+           users are set by a single chpasswd call. The accounts that can't be
+           created are skipped and their errors are returned.
+
+           :param groups: a list of tuples of a group name and kwargs of createGroup
+           :param users: a list of tuples of a user name and kwargs of createUser
+           :param ssh_keys: a list of tuples of a user name and an SSH key
+           :param str root: The directory of the system to create the accounts in.
+                            Defaults to util.getSysroot().
+           :returns: a list of ValueError exceptions of the skipped accounts
+        """
+        root = root or util.getSysroot()
+        errors = []
+        passwords = []
+        user_names = []
+        ssh_dirs = []
+
+        with self._ensureLoginDefs(root):
+            for (group_name, kwargs) in groups:
+                kwargs = dict(kwargs, root=root)
+                try:
+                    self.createGroup(group_name, **kwargs)
+                except ValueError as e:
+                    errors.append(e)
+
+            for (user_name, kwargs) in users:
+                kwargs = dict(kwargs, root=root)
+                try:
+                    self._createUser(user_name, kwargs)
+                except ValueError as e:
+                    errors.append(e)
+                    continue
+
+                entry = self._getPasswordEntry(user_name, kwargs.get("password", False),
+                                               kwargs.get("isCrypted", False),
+                                               kwargs.get("lock", False),
+                                               kwargs.get("algo", None))
+                if entry:
+                    passwords.append(entry)
+                user_names.append(user_name)
+
+            self._setPasswords(passwords, user_names, root)
+
+        for (user_name, key) in ssh_keys:
+            try:
+                ssh_dirs.extend(self._setUserSshKey(user_name, key, root))
+            except ValueError as e:
+                errors.append(e)
+
+        if ssh_dirs:
+            util.execWithRedirect("restorecon", ["-r"] + ssh_dirs)
+
+        return errors
+
     def createUser(self, user_name, *args, **kwargs):
         """Create a new user on the system with the given name.  Optional kwargs:
 
@@ -264,6 +369,21 @@ class Users(object):
                              available one is used.
         """
 
+        self._createUser(user_name, kwargs)
+
+        pw = kwargs.get("password", False)
+        crypted = kwargs.get("isCrypted", False)
+        algo = kwargs.get("algo", None)
+        lock = kwargs.get("lock", False)
+
+        self.setUserPassword(user_name, pw, crypted, lock, algo,
+                             kwargs.get("root", util.getSysroot()))
+
+    def _createUser(self, user_name, kwargs):
+        """Create a new user without setting its password.
+
+           See createUser for the supported kwargs.
+        """
         root = kwargs.get("root", util.getSysroot())
 
         if self.checkUserExists(user_name, root):
@@ -346,6 +466,8 @@ class Users(object):
         with self._ensureLoginDefs(root):
             status = util.execWithRedirect("useradd", args)
 
+        self._invalidateDatabases(root)
+
         if status == 4:
             raise ValueError("UID %s already exists" % kwargs.get("uid"))
         elif status == 6:
@@ -375,41 +497,47 @@ class Users(object):
                 log.critical("Unable to change owner of existing home directory: %s", e.strerror)
                 raise
 
-        pw = kwargs.get("password", False)
-        crypted = kwargs.get("isCrypted", False)
-        algo = kwargs.get("algo", None)
-        lock = kwargs.get("lock", False)
-
-        self.setUserPassword(user_name, pw, crypted, lock, algo, root)
-
     def checkUserExists(self, username, root=None):
-        if self._getpwnam(username, root):
+        if self._getpwnam(username, root or util.getSysroot()):
             return True
 
         return False
 
-    def setUserPassword(self, username, password, isCrypted, lock, algo=None, root="/"):
+    def _getPasswordEntry(self, username, password, isCrypted, lock, algo=None):
+        """Return the chpasswd entry of the password or None to keep it."""
         # Only set the password if it is a string, including the empty string.
-        # Otherwise leave it alone (defaults to locked for new users) and reset sp_lstchg
-        if password or password == "":
-            if password == "":
-                log.info("user account %s setup with no password", username)
-            elif not isCrypted:
-                password = cryptPassword(password, algo)
+        # Otherwise leave it alone (defaults to locked for new users)
+        if not password and password != "":
+            return None
+
+        if password == "":
+            log.info("user account %s setup with no password", username)
+        elif not isCrypted:
+            password = cryptPassword(password, algo)
+
+        if lock:
+            password = "!" + password
+            log.info("user account %s locked", username)
 
-            if lock:
-                password = "!" + password
-                log.info("user account %s locked", username)
+        return "%s:%s\n" % (username, password)
 
+    def _setPasswords(self, entries, usernames, root):
+        """Set the passwords with one chpasswd call and reset sp_lstchg of the users."""
+        if entries:
             proc = util.startProgram(["chpasswd", "-R", root, "-e"], stdin=subprocess.PIPE)
-            proc.communicate(("%s:%s\n" % (username, password)).encode("utf-8"))
+            proc.communicate("".join(entries).encode("utf-8"))
             if proc.returncode != 0:
                 raise OSError("Unable to set password for new user: status=%s" % proc.returncode)
 
         # Reset sp_lstchg to an empty string. On systems with no rtc, this
         # field can be set to 0, which has a special meaning that the password
         # must be reset on the next login.
-        util.execWithRedirect("chage", ["-R", root, "-d", "", username])
+        for username in usernames:
+            util.execWithRedirect("chage", ["-R", root, "-d", "", username])
+
+    def setUserPassword(self, username, password, isCrypted, lock, algo=None, root="/"):
+        entry = self._getPasswordEntry(username, password, isCrypted, lock, algo)
+        self._setPasswords([entry] if entry else [], [username], root)
 
     def setRootPassword(self, password, isCrypted=False, isLocked=False, algo=None, root="/"):
         return self.setUserPassword("root", password, isCrypted, isLocked, algo, root)
@@ -417,6 +545,14 @@ class Users(object):
     def setUserSshKey(self, username, key, **kwargs):
         root = kwargs.get("root", util.getSysroot())
 
+        for sshdir in self._setUserSshKey(username, key, root):
+            util.execWithRedirect("restorecon", ["-r", sshdir])
+
+    def _setUserSshKey(self, username, key, root):
+        """Add the SSH key of the user.
+
+           :returns: a list of directories that need the SELinux context restored
+        """
         pwent = self._getpwnam(username, root)
         if not pwent:
             raise ValueError("setUserSshKey: user %s does not exist" % username)
@@ -442,4 +578,6 @@ class Users(object):
         # Only change ownership if we created it
         if not authfile_existed:
             os.chown(authfile, int(uid), int(gid))
-            util.execWithRedirect("restorecon", ["-r", sshdir])
+            return [sshdir]
+
+        return []
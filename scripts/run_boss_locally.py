@@ -65,11 +65,11 @@ def distribute_kickstart(ks_path):
     else:
         unprocessed_kickstart = boss_object.UnprocessedKickstart
         print("distribute_kickstart: SplitKickstart({}):\n{}".format(tmpfile, unprocessed_kickstart))
-        timeout = 10
-        while not boss_object.AllModulesAvailable and timeout > 0:
-            print("distribute_kickstart: waiting for modules to start")
-            time.sleep(1)
-            timeout = timeout - 1
+        print("distribute_kickstart: waiting for modules to start")
+        while not boss_object.ModulesStartupFinished:
+            time.sleep(0.1)
+        metrics = boss_object.ModulesStartupMetrics
+        print("distribute_kickstart: ModulesStartupMetrics: {}".format(metrics))
         errors = boss_object.DistributeKickstart()
         print("distribute_kickstart: DistributeKickstart() errors: {}".format(errors))
         unprocessed_kickstart = boss_object.UnprocessedKickstart
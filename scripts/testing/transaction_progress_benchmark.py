@@ -0,0 +1,85 @@
+#!/bin/python3
+#
+# Measure the throughput of the transaction progress reporting.
+#
+# Replay a synthetic RPM transaction through the progress display of the DNF
+# payload and receive the messages like the installer does.
+#
+# For detailed help call ./transaction_progress_benchmark.py -h
+#
+
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+from argparse import ArgumentParser
+
+
+def _resolve_top_dir():
+    top_dir = os.path.dirname(os.path.realpath(__file__))
+    # go up two dirs to get top path
+    top_dir = os.path.split(top_dir)[0]
+    return os.path.split(top_dir)[0]
+
+
+class DummyPackage(object):
+    def __init__(self, name, arch="x86_64"):
+        self.name = name
+        self.arch = arch
+        self.evr = "1.0-1.fc28"
+        self.buildtime = 1520000000
+
+    def returnIdSum(self):
+        return ("sha256", hashlib.sha256(self.name.encode()).hexdigest())
+
+
+def replay_transaction(display, packages):
+    total = len(packages)
+    for i, pkg in enumerate(packages, start=1):
+        display.progress(pkg, display.PKG_INSTALL, 0, 100, i, total)
+        display.progress(pkg, display.PKG_INSTALL, 100, 100, i, total)
+    display.progress(None, display.TRANS_POST, 0, 0, total, total)
+    for pkg in packages:
+        display.progress(pkg, display.PKG_SCRIPTLET, 0, 0, total, total)
+    for i, pkg in enumerate(packages, start=1):
+        display.progress(pkg, display.PKG_VERIFY, 0, 0, i, total)
+
+
+def run_benchmark(count):
+    from pyanaconda.payload import dnfpayload
+
+    packages = [DummyPackage("package-%d" % i) for i in range(count)]
+    queue_instance = multiprocessing.Queue()
+    batcher = dnfpayload.ProgressBatcher(queue_instance)
+    display = dnfpayload.PayloadRPMDisplay(batcher)
+    messages = 0
+
+    start = time.time()
+    batcher.start()
+    replay_transaction(display, packages)
+    batcher.put(dnfpayload.encode_progress_event(dnfpayload.PROGRESS_QUIT, "DNF quit"))
+    batcher.stop()
+
+    for (event, _message) in dnfpayload.DNFPayload._transaction_messages(queue_instance):
+        messages += 1
+        if event == "quit":
+            break
+
+    return messages, time.time() - start
+
+
+def parse_args():
+    parser = ArgumentParser(description="Measure the throughput of the transaction progress.")
+    parser.add_argument("-n", "--packages", type=int, default=5000,
+                        help="number of packages in the transaction (default: 5000)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.path.insert(0, _resolve_top_dir())
+
+    messages, elapsed = run_benchmark(args.packages)
+    print("%d packages, %d messages in %.2f s (%.0f messages/s)"
+          % (args.packages, messages, elapsed, messages / elapsed))
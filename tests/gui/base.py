@@ -322,8 +322,8 @@ class DogtailTestCase(unittest.TestCase):
             for log in glob.glob("/tmp/*.log"):
                 shutil.copy(log, NOSE_RESULTS_DIR)
 
-            if os.path.exists("/tmp/memory.dat"):
-                shutil.copy("/tmp/memory.dat", NOSE_RESULTS_DIR)
+            if os.path.exists("/tmp/anaconda-resources.json"):
+                shutil.copy("/tmp/anaconda-resources.json", NOSE_RESULTS_DIR)
 
             # anaconda writes out traceback files with restricted permissions, so
             # we have to go out of our way to grab them.
@@ -348,7 +348,7 @@ class DogtailTestCase(unittest.TestCase):
                 os.remove(f)
             for f in glob.glob("/tmp/anaconda-tb-*"):
                 os.remove(f)
-            os.remove("/tmp/memory.dat")
+            os.remove("/tmp/anaconda-resources.json")
         except OSError:
             pass
 
@@ -18,12 +18,15 @@
 # Red Hat Author(s): Vendula Poncova <vponcova@redhat.com>
 #
 
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from pyanaconda.dbus.typing import *  # pylint: disable=wildcard-import
 from pyanaconda.dbus.xml import XMLGenerator
 from pyanaconda.dbus.interface import DBusSpecification, DBusSpecificationError, dbus_interface, \
-    dbus_class, dbus_signal
+    dbus_class, dbus_signal, DBusSpecificationCache
 
 
 class InterfaceGeneratorTestCase(unittest.TestCase):
@@ -637,3 +640,89 @@ class InterfaceGeneratorTestCase(unittest.TestCase):
         '''
 
         self._compare(ClassWithStandard, expected_xml)
+
+
+class CachedClass(object):
+
+    def Method(self, a: Int) -> Str:
+        pass
+
+
+class OtherCachedClass(object):
+
+    def Method(self, a: Int) -> Str:
+        pass
+
+
+class SpecificationCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._cache_dir = self._tmp_dir.name
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def _get_path(self, cache, cls):
+        return os.path.join(self._cache_dir, cache.get_key(cls, "Interface") + ".xml")
+
+    def key_test(self):
+        """Test the keys of the cache."""
+        cache = DBusSpecificationCache(self._cache_dir)
+        key = cache.get_key(CachedClass, "Interface")
+
+        self.assertEqual(key, cache.get_key(CachedClass, "Interface"))
+        self.assertNotEqual(key, cache.get_key(CachedClass, "Other"))
+        self.assertNotEqual(key, cache.get_key(OtherCachedClass, "Interface"))
+
+        # The classes without a source file are not cached.
+        cls = type("DynamicClass", (object, ), {"__module__": "dynamic_module"})
+        self.assertIsNone(cache.get_key(cls, "Interface"))
+
+    def cache_test(self):
+        """Test the cached specification."""
+        cache = DBusSpecificationCache(self._cache_dir, validate=False)
+        expected = DBusSpecification().generate_specification(CachedClass, "Interface")
+        self.assertEqual(cache.get_specification(CachedClass, "Interface"), expected)
+
+        path = self._get_path(cache, CachedClass)
+        with open(path) as f:
+            self.assertEqual(f.read(), expected)
+
+        # The cached specification is used.
+        with open(path, "w") as f:
+            f.write("<node/>")
+
+        self.assertEqual(cache.get_specification(CachedClass, "Interface"), "<node/>")
+
+    def validation_test(self):
+        """Test the validation of the cached specification."""
+        cache = DBusSpecificationCache(self._cache_dir, validate=True)
+        expected = DBusSpecification().generate_specification(CachedClass, "Interface")
+
+        path = self._get_path(cache, CachedClass)
+        with open(path, "w") as f:
+            f.write("<node/>")
+
+        self.assertEqual(cache.get_specification(CachedClass, "Interface"), expected)
+
+        with open(path) as f:
+            self.assertEqual(f.read(), expected)
+
+    def disabled_cache_test(self):
+        """Test the disabled cache."""
+        cache = DBusSpecificationCache()
+        expected = DBusSpecification().generate_specification(CachedClass, "Interface")
+
+        with patch.object(cache, "get_key") as get_key:
+            self.assertEqual(cache.get_specification(CachedClass, "Interface"), expected)
+            get_key.assert_not_called()
+
+    def unwritable_cache_test(self):
+        """Test the cache in a directory that can't be created."""
+        path = os.path.join(self._cache_dir, "file")
+        open(path, "w").close()
+
+        cache = DBusSpecificationCache(os.path.join(path, "cache"))
+        expected = DBusSpecification().generate_specification(CachedClass, "Interface")
+        self.assertEqual(cache.get_specification(CachedClass, "Interface"), expected)
@@ -18,6 +18,8 @@
 # with the express permission of Red Hat, Inc.
 #
 
+import threading
+import time
 import unittest
 
 from pyanaconda.installation_tasks import Task
@@ -369,3 +371,63 @@ class InstallTasksTestCase(unittest.TestCase):
         self.assertEqual(self._test_variable1, 3)
         self.assertEqual(self._test_variable2, 2)
         self.assertEqual(self._test_variable3, 1)
+
+    def parallel_task_queue_test(self):
+        """Check that independent tasks of a parallel queue run concurrently."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        queue = TaskQueue(name="parallel queue", max_workers=3)
+        for i in range(3):
+            # the tasks would time out if they didn't run at the same time
+            queue.append(Task("wait %d" % i, barrier.wait))
+
+        queue.task_started.connect(lambda x: self._increment_var1())
+        queue.task_completed.connect(lambda x: self._increment_var2())
+        queue.start()
+
+        self.assertTrue(queue.done)
+        self.assertFalse(barrier.broken)
+        self.assertEqual(self._test_variable1, 3)
+        self.assertEqual(self._test_variable2, 3)
+
+    def parallel_task_queue_dependencies_test(self):
+        """Check that a parallel queue respects dependencies and resources."""
+        events = []
+        lock = threading.Lock()
+
+        def record(name, delay=0.0):
+            with lock:
+                events.append(("start", name))
+            time.sleep(delay)
+            with lock:
+                events.append(("stop", name))
+
+        queue = TaskQueue(name="parallel queue", max_workers=4)
+        group = TaskQueue(name="group", status_message="processing group")
+        first = Task("first", record, ("first", 0.1))
+        group.append(first)
+        group.append(Task("second", record, ("second", 0.1)))
+        queue.append(group)
+        queue.append(Task("after first", record, ("after first",), depends_on=[first]))
+        queue.append(Task("unit 1", record, ("unit 1", 0.1), resources=["units"]))
+        queue.append(Task("unit 2", record, ("unit 2",), resources=["units"]))
+        queue.append(Task("after all", record, ("after all",), depends_on=list(queue)))
+
+        queue.start()
+
+        self.assertEqual(len(events), 12)
+        self.assertLess(events.index(("stop", "first")), events.index(("start", "after first")))
+        self.assertLess(events.index(("stop", "unit 1")), events.index(("start", "unit 2")))
+        self.assertEqual(events[-2:], [("start", "after all"), ("stop", "after all")])
+
+    def parallel_task_queue_deadlock_test(self):
+        """Check that a parallel queue fails on dependencies that can't be done."""
+        queue = TaskQueue(name="parallel queue", max_workers=2)
+        queue.append(Task("independent", self._increment_var1))
+        queue.append(Task("blocked", self._increment_var2, depends_on=[Task("outside")]))
+
+        with self.assertRaises(RuntimeError):
+            queue.start()
+
+        self.assertEqual(self._test_variable1, 1)
+        self.assertEqual(self._test_variable2, 0)
@@ -22,6 +22,7 @@ import tempfile
 import signal
 import shutil
 from threading import Lock
+from mock import patch
 
 from pyanaconda.errors import ExitError
 from .test_constants import ANACONDA_TEST_DIR
@@ -95,6 +96,44 @@ class RunProgramTests(unittest.TestCase):
         # incorrect calling should return rc!=0
         self.assertNotEqual(util.execWithRedirect('ls', ['--asdasd']), 0)
 
+        # error should raise OSError
+        with self.assertRaises(OSError):
+            util.execWithRedirect('asdasdadasd', [])
+
+    def exec_with_redirect_stream_test(self):
+        """Test the streamed output of execWithRedirect."""
+        lines = []
+
+        def handle_line(line):
+            lines.append(line)
+            return True
+
+        # check the lines are passed to the handler
+        self.assertEqual(util.execWithRedirect("/bin/sh", ["-c", "echo one; echo two >&2; echo -n three"],
+                                               handle_line=handle_line), 0)
+        self.assertEqual(lines, ["one", "two", "three"])
+
+        # check the output is written to stdout
+        with tempfile.TemporaryFile(mode="w+t") as stdout:
+            util.execWithRedirect("/bin/sh", ["-c", "echo one; echo -n two"], stdout=stdout)
+            stdout.seek(0)
+            self.assertEqual(stdout.read(), "one\ntwo\n")
+
+        # check the binary output is written to stdout
+        with tempfile.TemporaryFile(mode="w+b") as stdout:
+            util.execWithRedirect("echo", ["-en", r"\xa0\xa1\xa2"], stdout=stdout, binary_output=True)
+            stdout.seek(0)
+            self.assertEqual(stdout.read(), b"\xa0\xa1\xa2")
+
+        # check long lines are split
+        lines = []
+        util.execWithRedirect("head", ["-c", str(util.PROGRAM_LINE_LIMIT * 2 + 10), "/dev/zero"],
+                              handle_line=handle_line)
+        self.assertEqual(len(lines), 3)
+
+        # check the return code of a killed process
+        self.assertEqual(util.execWithRedirect("/bin/sh", ["-c", "kill -9 $$"]), -signal.SIGKILL)
+
     def exec_with_capture_test(self):
         """Test execWithCapture."""
 
@@ -456,6 +495,45 @@ done
             proc.communicate()
         self.assertRaises(ExitError, WatchProcesses.watch_process, proc, "test2")
 
+class ServicesTests(unittest.TestCase):
+
+    def _systemctl(self, command, argv):
+        self.calls.append(argv[:-2])
+        # The missing service can't be enabled or disabled.
+        return 1 if "missing.service" in argv else 0
+
+    def _configure_services(self, enabled=(), disabled=()):
+        self.calls = []
+        with patch("pyanaconda.core.util.execWithRedirect", side_effect=self._systemctl), \
+             patch("pyanaconda.core.util.getSysroot", return_value="/mnt/sysimage"):
+            util.configure_services(enabled=enabled, disabled=disabled)
+
+    def configure_services_test(self):
+        """Test the batched configuration of services."""
+        self._configure_services(enabled=["a.service", "b.service"], disabled=["c.service"])
+        self.assertEqual(self.calls, [["disable", "c.service"],
+                                      ["enable", "a.service", "b.service"]])
+
+        # nothing to do
+        self._configure_services()
+        self.assertEqual(self.calls, [])
+
+    def configure_services_failed_test(self):
+        """Test the batched configuration of services with a failure."""
+        # The failed disabling is ignored.
+        self._configure_services(disabled=["c.service", "missing.service"])
+        self.assertEqual(self.calls, [["disable", "c.service", "missing.service"],
+                                      ["disable", "c.service"],
+                                      ["disable", "missing.service"]])
+
+        # The failed enabling is reported.
+        with self.assertRaises(ValueError) as cm:
+            self._configure_services(enabled=["a.service", "missing.service"])
+
+        self.assertEqual(str(cm.exception), "Error enabling service missing.service: 1")
+        self.assertEqual(self.calls[-1], ["enable", "missing.service"])
+
+
 class MiscTests(unittest.TestCase):
     def get_dir_size_test(self):
         """Test the getDirSize."""
@@ -221,10 +221,31 @@ class KickstartManagerTestCase(unittest.TestCase):
         expected_errors = {("1", 5, 'ks.manager.test.include1.cfg'),
                            ("3", 42, 'ks.manager.test.include.cfg')}
         actual_errors = set()
-        for service_name, (lineno, file_name), _msg in errors:
-            actual_errors.add((service_name, lineno, file_name))
+        for error in errors:
+            actual_errors.add((error["module_name"], error["line_number"], error["file_name"]))
         self.assertEqual(actual_errors, expected_errors)
 
+        # The handled elements are cached.
+        module1.kickstart_commands = []
+        self.assertEqual(manager._get_handled_elements(m1_observer)[0], ["network", "firewall"])
+
+    def distribute_error_test(self):
+        manager = KickstartManager()
+        module1 = TestModule(commands=["network"])
+        module2 = TestModule(commands=["firewall"], error=TimeoutError("Timeout was reached"))
+        m1_observer = TestModuleObserver("1", "1", module1)
+        m2_observer = TestModuleObserver("2", "2", module2)
+        manager.module_observers = [m1_observer, m2_observer]
+
+        with self._create_ks_files(self._kickstart_include) as filename:
+            manager.split(filename)
+        errors = manager.distribute()
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(errors[1]["module_name"], "2")
+        self.assertEqual(errors[1]["error_message"], "Timeout was reached")
+        self.assertEqual(errors[1]["file_name"], filename)
+
     def unknown_section_split_test(self):
         ks_content = """
 network --device=ens3
@@ -266,18 +287,22 @@ class TestModuleObserver(DBusObjectObserver):
 
 class TestModule(object):
 
-    def __init__(self, commands=None, sections=None, addons=None):
+    def __init__(self, commands=None, sections=None, addons=None, error=None):
         self.kickstart_commands = commands or []
         self.kickstart_sections = sections or []
         self.kickstart_addons = addons or []
         self.kickstart = ""
+        self.error = error
 
+    @property
     def KickstartSections(self):
         return self.kickstart_sections
 
+    @property
     def KickstartAddons(self):
         return self.kickstart_addons
 
+    @property
     def KickstartCommands(self):
         return self.kickstart_commands
 
@@ -293,6 +318,13 @@ class TestModule(object):
                 break
         return (lineno, msg)
 
-    def ConfigureWithKickstart(self, kickstart):
+    def ReadKickstart(self, kickstart, callback, callback_args=(), timeout=None):
         self.kickstart = kickstart
-        return self.configure_with_kickstart(kickstart)
+
+        if self.error:
+            callback(*callback_args, None, self.error)
+            return
+
+        lineno, msg = self.configure_with_kickstart(kickstart)
+        result = {"success": not lineno, "line_number": lineno, "error_message": msg}
+        callback(*callback_args, result, None)
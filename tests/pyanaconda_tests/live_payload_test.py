@@ -0,0 +1,100 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import unittest
+from mock import Mock
+
+import requests
+
+from pyanaconda.payload.livepayload import LiveImageKSPayload
+
+DATA = bytes(range(256)) * 4
+
+
+class DummyResponse(object):
+    def __init__(self, status_code, data, headers=None, fail_at=None):
+        self.status_code = status_code
+        self.headers = {"content-length": str(len(data))}
+        self.headers.update(headers or {})
+        self._data = data
+        self._fail_at = fail_at
+
+    def iter_content(self, _size):
+        # Use small chunks, so the download can be interrupted.
+        size = 256
+        for offset in range(0, len(self._data), size):
+            if self._fail_at is not None and offset >= self._fail_at:
+                raise requests.exceptions.ConnectionError("interrupted")
+            yield self._data[offset:offset + size]
+
+    def close(self):
+        pass
+
+
+class URLImageDownloadTestCase(unittest.TestCase):
+
+    def _get_payload(self, responses):
+        payload = LiveImageKSPayload.__new__(LiveImageKSPayload)
+        payload.data = Mock()
+        payload.data.method.url = "http://example.com/image.tar"
+        payload.data.method.noverifyssl = False
+        payload._proxies = {}
+        payload._session = Mock()
+        payload._session.get.side_effect = responses
+        return payload
+
+    def _download(self, payload, restartable=True):
+        chunks = []
+
+        def restart():
+            chunks.clear()
+
+        for buf in payload._iter_url_image(Mock(), Mock(), restart if restartable else None):
+            chunks.append(buf)
+
+        return b"".join(chunks)
+
+    def resume_test(self):
+        """Resume an interrupted download."""
+        payload = self._get_payload([
+            DummyResponse(200, DATA, fail_at=512),
+            DummyResponse(206, DATA[512:], {"Content-Range": "bytes 512-1023/1024"}),
+        ])
+
+        self.assertEqual(self._download(payload), DATA)
+        self.assertEqual(payload._session.get.call_args[1]["headers"], {"Range": "bytes=512-"})
+
+    def ignored_range_test(self):
+        """Restart a download if the server ignores the range."""
+        payload = self._get_payload([
+            DummyResponse(200, DATA, fail_at=512),
+            DummyResponse(200, DATA),
+            DummyResponse(200, DATA),
+        ])
+
+        self.assertEqual(self._download(payload), DATA)
+        self.assertEqual(payload._session.get.call_args[1]["headers"], {})
+
+    def wrong_range_test(self):
+        """Don't append a response with a wrong range."""
+        payload = self._get_payload([
+            DummyResponse(200, DATA, fail_at=512),
+            DummyResponse(206, DATA, {"Content-Range": "bytes 0-1023/1024"}),
+        ])
+
+        self.assertRaises(requests.exceptions.RequestException,
+                          self._download, payload, restartable=False)
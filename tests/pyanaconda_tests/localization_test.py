@@ -19,7 +19,10 @@
 from pyanaconda import localization
 from pyanaconda.core.util import execWithCaptureBinary
 import locale as locale_mod
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 class ParsingTests(unittest.TestCase):
     def invalid_langcodes_test(self):
@@ -163,3 +166,51 @@ class LangcodeLocaleMatchingTests(unittest.TestCase):
             order = localization.resolve_date_format(1, 2, 3, fail_safe=False)[0]
             for i in (1, 2, 3):
                 self.assertIn(i, order)
+
+class LocalizationIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._tmp_dir.name, "index.json")
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def index_test(self):
+        """The index should answer the same as langtable."""
+        index = localization.LocalizationIndex(self._path)
+        index.add_languages(["cs", "sr"])
+
+        self.assertEqual(index.languages, {"cs", "sr"})
+        self.assertTrue(os.path.exists(self._path))
+
+        for locale in ("cs", "cs_CZ.UTF-8", "sr_RS.UTF-8@latin"):
+            parts = localization.parse_langcode(locale)
+            self.assertEqual(index.get_entry(parts), localization._query_langtable(parts))
+
+        # A new index is loaded from the file without langtable.
+        index = localization.LocalizationIndex(self._path)
+        with patch("pyanaconda.localization._query_langtable") as query:
+            entry = index.get_entry(localization.parse_langcode("cs_CZ.UTF-8"))
+            index.add_languages(["cs"])
+            query.assert_not_called()
+
+        self.assertIn("cs_CZ.UTF-8", entry.locales)
+        self.assertEqual(index.languages, {"cs", "sr"})
+
+    def missing_index_test(self):
+        """Langtable should be used if the langcode is not indexed."""
+        with patch("pyanaconda.localization._index", localization.LocalizationIndex(self._path)):
+            self.assertEqual(localization.get_english_name("cs_CZ.UTF-8"), "Czech (Czechia)")
+            self.assertIn("cs_CZ.UTF-8", localization.get_territory_locales("CZ"))
+            self.assertRaises(localization.InvalidLocaleSpec, localization.get_locale_keyboards, "_CZ")
+
+        self.assertFalse(os.path.exists(self._path))
+
+    def outdated_index_test(self):
+        """An index of another version of langtable should be ignored."""
+        index = localization.LocalizationIndex(self._path)
+        index.add_languages(["cs"])
+
+        with patch("pyanaconda.localization._get_langtable_version", return_value="0.0.0"):
+            index = localization.LocalizationIndex(self._path)
+            self.assertEqual(index.languages, set())
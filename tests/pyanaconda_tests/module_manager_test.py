@@ -0,0 +1,111 @@
+#
+# Copyright (C) 2017  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pyanaconda.dbus.constants import DBUS_START_REPLY_SUCCESS
+from pyanaconda.modules.boss.module_manager import ModuleManager
+
+
+class TestModuleObserver(object):
+
+    def __init__(self, service_name):
+        self.service_name = service_name
+        self.is_service_available = False
+        self.service_available = MagicMock()
+        self.service_unavailable = MagicMock()
+        self.proxy = MagicMock()
+
+    def connect_once_available(self):
+        pass
+
+
+class ModuleManagerTestCase(unittest.TestCase):
+
+    def _patch(self, name, **kwargs):
+        patcher = patch("pyanaconda.modules.boss.module_manager." + name, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def setUp(self):
+        self.dbus = self._patch("DBus")
+        self.timeout_add = self._patch("timeout_add_seconds", return_value=1)
+        self.source_remove = self._patch("source_remove")
+
+        self.manager = ModuleManager()
+        self.observers = [TestModuleObserver("A"), TestModuleObserver("B")]
+        self.manager.module_observers.extend(self.observers)
+
+        self.ready = []
+        self.manager.modules_ready.connect(self.ready.append)
+
+    def _start_module(self, observer):
+        self.manager._start_modules_callback(observer, DBUS_START_REPLY_SUCCESS, None)
+        observer.is_service_available = True
+        self.manager._process_module_is_available(observer)
+        self.manager._ping_module_callback(observer, None, None)
+
+    def modules_ready_test(self):
+        """Test the startup of ready modules."""
+        self.manager.start_modules(timeout=5)
+        self.timeout_add.assert_called_once_with(5, self.manager._startup_deadline_callback)
+        self.assertEqual(self.dbus.get_dbus_proxy.return_value.StartServiceByName.call_count, 2)
+
+        self._start_module(self.observers[0])
+        self.assertFalse(self.manager.startup_finished)
+        self.assertEqual(self.ready, [])
+
+        self._start_module(self.observers[1])
+        self.assertTrue(self.manager.startup_finished)
+        self.assertEqual(self.ready, [True])
+        self.source_remove.assert_called_once_with(1)
+
+        self.manager.process_module_kickstarted(self.observers[0])
+        metrics = self.manager.startup_metrics
+        self.assertEqual(set(metrics), {"A", "B"})
+        self.assertEqual(set(metrics["A"]), {"activation", "ping", "kickstart"})
+        self.assertEqual(set(metrics["B"]), {"activation", "ping"})
+        self.assertLessEqual(metrics["A"]["activation"], metrics["A"]["ping"])
+
+    def modules_deadline_test(self):
+        """Test the startup deadline of modules."""
+        self.manager.start_modules()
+        self._start_module(self.observers[0])
+
+        self.assertFalse(self.manager._startup_deadline_callback())
+        self.assertTrue(self.manager.startup_finished)
+        self.assertEqual(self.ready, [False])
+        self.source_remove.assert_not_called()
+
+        # The late module is still timed, but the signal is not emitted again.
+        self._start_module(self.observers[1])
+        self.assertEqual(self.ready, [False])
+        self.assertIn("ping", self.manager.startup_metrics["B"])
+
+    def failed_ping_test(self):
+        """Test a module that fails to reply to ping."""
+        self.manager.start_modules()
+        self._start_module(self.observers[0])
+
+        observer = self.observers[1]
+        observer.is_service_available = True
+        self.manager._ping_module_callback(observer, None, Exception("Failed."))
+
+        self.assertFalse(self.manager.check_modules_readiness())
+        self.assertFalse(self.manager.startup_finished)
@@ -19,6 +19,7 @@
 from pyanaconda import nm
 import unittest
 import socket
+from mock import patch, Mock
 
 class UtilityFunctionsTests(unittest.TestCase):
 
@@ -42,3 +43,111 @@ class UtilityFunctionsTests(unittest.TestCase):
         self.assertEqual(nm.nm_ipv4_to_dbus_int("192.168.102.1"),
                          socket.ntohl(3232261633))
 
+
+class ProxyPoolTests(unittest.TestCase):
+
+    def pool_test(self):
+        pool = nm.ProxyPool(size=2)
+        create = Mock(side_effect=lambda: Mock())
+
+        proxy = pool.get("a", create)
+        self.assertIs(pool.get("a", create), proxy)
+        self.assertEqual(create.call_count, 1)
+
+        pool.get("b", create)
+        pool.get("c", create)
+        self.assertEqual(create.call_count, 3)
+
+        # The least recently used proxy was dropped.
+        self.assertIsNot(pool.get("a", create), proxy)
+        self.assertEqual(create.call_count, 4)
+
+        # Failures are not kept.
+        self.assertIsNone(pool.get("d", lambda: None))
+
+class SettingsCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = {
+            "/con/1": {"connection": {"uuid": "uuid-1", "interface-name": "ens3"},
+                       "802-3-ethernet": {"mac-address": [82, 84, 0, 18, 52, 86]}},
+            "/con/2": {"connection": {"uuid": "uuid-2", "interface-name": "ens4"}},
+            "/con/3": {"connection": {"uuid": "uuid-3"}, "vlan": {"id": 222}},
+        }
+        self.get_settings = Mock(side_effect=lambda path: self.connections[path])
+
+        patcher = patch("pyanaconda.nm._get_proxy", side_effect=self._get_proxy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch("pyanaconda.nm.Gio.bus_get_sync")
+        self.bus = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cache = nm.SettingsCache()
+
+    def _get_proxy(self, object_path, interface_name):
+        proxy = Mock()
+        proxy.ListConnections.side_effect = lambda: list(self.connections)
+        proxy.GetSettings.side_effect = lambda: self.get_settings(object_path)
+        return proxy
+
+    def find_test(self):
+        cache = self.cache
+        self.assertEqual(cache.find("uuid-2", "connection", "uuid"), ["/con/2"])
+        self.assertEqual(cache.find("ens3", "connection", "interface-name"), ["/con/1"])
+        self.assertEqual(cache.find(222, "vlan", "id"), ["/con/3"])
+        self.assertEqual(cache.find("52:54:00:12:34:56", "802-3-ethernet", "mac-address",
+                                    nm._format_hwaddr), ["/con/1"])
+        self.assertEqual(cache.find("ens5", "connection", "interface-name"), [])
+        self.assertEqual(cache.find("UUID-1", "connection", "uuid", str.upper), ["/con/1"])
+
+        # The settings were read only once.
+        self.assertEqual(self.get_settings.call_count, 3)
+
+    def connections_test(self):
+        cache = self.cache
+        self.assertEqual(list(cache.get_all()), ["/con/1", "/con/2", "/con/3"])
+
+        # The list of connections is checked on every lookup.
+        del self.connections["/con/2"]
+        self.connections["/con/4"] = {"connection": {"uuid": "uuid-4"}}
+        self.assertEqual(cache.find("uuid-2", "connection", "uuid"), [])
+        self.assertEqual(cache.find("uuid-4", "connection", "uuid"), ["/con/4"])
+        self.assertEqual(self.get_settings.call_count, 4)
+
+    def signals_test(self):
+        cache = self.cache
+        self.assertEqual(cache.find("ens4", "connection", "interface-name"), ["/con/2"])
+
+        connection = self.bus.return_value
+        self.assertEqual(connection.signal_subscribe.call_count, 2)
+        callback = connection.signal_subscribe.call_args_list[0][0][-1]
+
+        # The connection was updated.
+        self.connections["/con/2"] = {"connection": {"uuid": "uuid-2", "interface-name": "ens5"}}
+        callback(connection, "sender", "/con/2", "interface", "Updated", None)
+
+        self.assertEqual(cache.find("ens4", "connection", "interface-name"), [])
+        self.assertEqual(cache.find("ens5", "connection", "interface-name"), ["/con/2"])
+        self.assertEqual(self.get_settings.call_count, 4)
+
+    def invalidate_test(self):
+        with patch("pyanaconda.nm._settings_cache", self.cache):
+            self.assertEqual(nm.nm_get_settings("ens4", "connection", "interface-name"),
+                             [self.connections["/con/2"]])
+
+            # The ifcfg file of the connection was changed without a signal.
+            self.connections["/con/2"] = {"connection": {"uuid": "uuid-2",
+                                                         "interface-name": "ens5"}}
+            nm.nm_invalidate_settings()
+
+            self.assertEqual(nm.nm_get_settings("ens4", "connection", "interface-name"), [])
+            self.assertEqual(self.cache.find("ens5", "connection", "interface-name"), ["/con/2"])
+
+    def s390_setting_test(self):
+        self.get_settings.side_effect = lambda path: None
+
+        # The connection has been deleted.
+        with patch("pyanaconda.nm._settings_cache", self.cache):
+            self.assertFalse(nm._is_s390_setting("/con/1"))
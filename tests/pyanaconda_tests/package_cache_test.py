@@ -0,0 +1,175 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from blivet.size import Size
+from pyanaconda.payload.package_cache import PackageCache
+
+
+class DummyPackage(object):
+    def __init__(self, download_dir, name, checksum, local=False, size=100):
+        self._path = os.path.join(download_dir, name + ".rpm")
+        self._checksum = checksum
+        self._local = local
+        self._size = size
+
+    def _is_local_pkg(self):
+        return self._local
+
+    def returnIdSum(self):
+        return ("sha256", self._checksum)
+
+    def localPkg(self):
+        return self._path
+
+    def verifyLocalPkg(self):
+        return os.path.getsize(self._path) == self._size
+
+    def download(self, size):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "wb") as f:
+            f.write(b"x" * size)
+
+
+class PackageCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.mkdtemp(suffix="pyanaconda_tests")
+        self._cache_dir = os.path.join(self._temp_dir, "cache")
+        self._download_dir = os.path.join(self._temp_dir, "download")
+
+    def tearDown(self):
+        shutil.rmtree(self._temp_dir)
+
+    def fetch_and_store_test(self):
+        """Test that downloaded packages are served from the cache."""
+        cache = PackageCache(self._cache_dir, Size("1 MiB"))
+        pkg = DummyPackage(self._download_dir, "foo", "abcd")
+
+        # The package is not cached yet.
+        self.assertFalse(cache.fetch(pkg))
+        pkg.download(100)
+        cache.store(pkg)
+
+        # The package is cached now.
+        shutil.rmtree(self._download_dir)
+        self.assertTrue(cache.fetch(pkg))
+        self.assertEqual(os.path.getsize(pkg.localPkg()), 100)
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def content_addressed_test(self):
+        """Test that packages are cached under their checksums."""
+        cache = PackageCache(self._cache_dir, Size("1 MiB"))
+        pkg = DummyPackage(self._download_dir, "foo", "abcd")
+        pkg.download(100)
+        cache.store(pkg)
+
+        # The same package from a different repository.
+        other = DummyPackage(os.path.join(self._download_dir, "other"), "foo", "abcd")
+        self.assertTrue(cache.fetch(other))
+
+        # A different build of the package.
+        other = DummyPackage(self._download_dir, "foo", "efgh")
+        self.assertFalse(cache.fetch(other))
+
+    def evict_test(self):
+        """Test that the least recently used packages are evicted."""
+        cache = PackageCache(self._cache_dir, Size("250 B"))
+        packages = [DummyPackage(self._download_dir, name, name * 4) for name in "abc"]
+
+        for pkg in packages:
+            pkg.download(100)
+            cache.store(pkg)
+
+        # Make the first package the least recently used one.
+        past = time.time() - 100
+        for pkg in packages[:2]:
+            path = cache._get_package_path(pkg)
+            os.utime(path, (past, past))
+            past += 10
+
+        cache.evict()
+        shutil.rmtree(self._download_dir)
+
+        self.assertFalse(cache.fetch(packages[0]))
+        self.assertTrue(cache.fetch(packages[1]))
+        self.assertTrue(cache.fetch(packages[2]))
+
+    def local_package_test(self):
+        """Test that packages of local repositories are not cached."""
+        cache = PackageCache(self._cache_dir, Size("1 MiB"))
+        pkg = DummyPackage(self._download_dir, "foo", "abcd")
+        pkg.download(100)
+        cache.store(pkg)
+
+        # The package in the installation source is never replaced.
+        local = DummyPackage(os.path.join(self._download_dir, "source"), "foo", "abcd", True)
+        local.download(50)
+        self.assertFalse(cache.fetch(local))
+        self.assertEqual(os.path.getsize(local.localPkg()), 50)
+
+        cache.store(DummyPackage(self._download_dir, "bar", "efgh", True))
+        self.assertFalse(os.path.exists(cache._get_cache_path("sha256", "efgh")))
+
+    def fetch_error_test(self):
+        """Test that a failed fetch is a miss."""
+        cache = PackageCache(self._cache_dir, Size("1 MiB"))
+        pkg = DummyPackage(self._download_dir, "foo", "abcd")
+        pkg.download(100)
+        cache.store(pkg)
+
+        with patch.object(PackageCache, "_link_or_copy", side_effect=FileNotFoundError()):
+            self.assertFalse(cache.fetch(pkg))
+
+        self.assertEqual(cache.misses, 1)
+
+    def invalid_package_test(self):
+        """Test that invalid packages are removed from the cache."""
+        cache = PackageCache(self._cache_dir, Size("1 MiB"))
+        pkg = DummyPackage(self._download_dir, "foo", "abcd")
+        pkg.download(100)
+        cache.store(pkg)
+
+        # The cached package is truncated.
+        cache_path = cache._get_package_path(pkg)
+        os.truncate(cache_path, 50)
+        shutil.rmtree(self._download_dir)
+
+        self.assertFalse(cache.fetch(pkg))
+        self.assertFalse(os.path.exists(cache_path))
+        self.assertFalse(os.path.exists(pkg.localPkg()))
+        self.assertEqual(cache.misses, 1)
+
+    def evict_part_test(self):
+        """Test that packages being stored are not evicted."""
+        cache = PackageCache(self._cache_dir, Size("0 B"))
+        path = cache._get_cache_path("sha256", "abcd") + ".part"
+        os.makedirs(os.path.dirname(path))
+
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+
+        cache.evict()
+        self.assertTrue(os.path.exists(path))
@@ -0,0 +1,186 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyanaconda.payload import parallel_copy
+from pyanaconda.payload.parallel_copy import ParallelCopy
+
+
+class ParallelCopyTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._source = os.path.join(self._tmp_dir, "source")
+        self._target = os.path.join(self._tmp_dir, "target")
+        os.mkdir(self._target)
+
+        self._make_file("etc/hostname", b"localhost\n", 0o644)
+        self._make_file("etc/machine-id", b"1234\n", 0o444)
+        self._make_file("usr/bin/tool", b"#!/bin/sh\n", 0o4755)
+        self._make_file("usr/lib/big", os.urandom(1024 * 1024), 0o600)
+        self._make_file("boot/vmlinuz-1", b"kernel", 0o644)
+        self._make_file("boot/vmlinuz-0-rescue-1", b"rescue", 0o644)
+        self._make_file("proc/version", b"proc", 0o644)
+        self._make_file("usr/share/empty", b"", 0o640)
+
+        os.symlink("../bin/tool", self._path("usr/lib/link"))
+        os.link(self._path("usr/lib/big"), self._path("usr/lib/big.hardlink"))
+        os.mkdir(self._path("var"))
+        os.chmod(self._path("var"), 0o1777)
+        os.utime(self._path("etc/hostname"), ns=(1000000000, 2000000000))
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp_dir)
+
+    def _path(self, name, root=None):
+        return os.path.join(root or self._source, name)
+
+    def _make_file(self, name, data, mode):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+        os.chmod(path, mode)
+
+    def _read(self, name):
+        with open(self._path(name, self._target), "rb") as f:
+            return f.read()
+
+    def _run_copy(self, workers=None):
+        ParallelCopy(self._source, self._target,
+                     ["/proc/", "/boot/*rescue*", "/etc/machine-id"],
+                     workers=workers).run()
+
+    def copy_test(self):
+        """Test the copy of a directory tree."""
+        self._run_copy(workers=4)
+
+        for name in ("etc/hostname", "usr/bin/tool", "usr/lib/big", "usr/share/empty"):
+            source_st = os.lstat(self._path(name))
+            target_st = os.lstat(self._path(name, self._target))
+            self.assertEqual(source_st.st_mode, target_st.st_mode)
+            self.assertEqual(source_st.st_uid, target_st.st_uid)
+            self.assertEqual(source_st.st_gid, target_st.st_gid)
+            self.assertEqual(source_st.st_mtime_ns, target_st.st_mtime_ns)
+
+            with open(self._path(name), "rb") as f:
+                self.assertEqual(f.read(), self._read(name))
+
+        self.assertEqual(os.lstat(self._path("var", self._target)).st_mode & 0o7777, 0o1777)
+        self.assertEqual(os.lstat(self._path("etc/hostname", self._target)).st_mtime_ns,
+                         2000000000)
+
+    def links_test(self):
+        """Test the copy of symlinks and hardlinks."""
+        self._run_copy()
+
+        self.assertEqual(os.readlink(self._path("usr/lib/link", self._target)), "../bin/tool")
+        self.assertTrue(os.path.samefile(self._path("usr/lib/big", self._target),
+                                         self._path("usr/lib/big.hardlink", self._target)))
+
+    def excludes_test(self):
+        """Test the excluded files."""
+        self._run_copy()
+
+        self.assertFalse(os.path.exists(self._path("proc", self._target)))
+        self.assertFalse(os.path.exists(self._path("etc/machine-id", self._target)))
+        self.assertFalse(os.path.exists(self._path("boot/vmlinuz-0-rescue-1", self._target)))
+        self.assertTrue(os.path.exists(self._path("boot/vmlinuz-1", self._target)))
+
+    def patterns_test(self):
+        """Test the rsync patterns of excluded files."""
+        copy = ParallelCopy(self._source, self._target,
+                            ["/boot/*rescue*", "/usr/**/cache/", "lib/*.so", "core.[0-9]"])
+
+        # The wildcard * doesn't match a slash.
+        self.assertTrue(copy._is_excluded("/boot/vmlinuz-0-rescue-1", False))
+        self.assertFalse(copy._is_excluded("/boot/loader/entries/0-rescue.conf", False))
+        self.assertFalse(copy._is_excluded("/var/boot/vmlinuz-0-rescue-1", False))
+
+        # The wildcard ** matches anything and the pattern matches directories.
+        self.assertTrue(copy._is_excluded("/usr/share/app/cache", True))
+        self.assertFalse(copy._is_excluded("/usr/share/app/cache", False))
+
+        # The unanchored patterns match the trailing components.
+        self.assertTrue(copy._is_excluded("/usr/lib/libc.so", False))
+        self.assertFalse(copy._is_excluded("/usr/lib/python/libc.so", False))
+        self.assertFalse(copy._is_excluded("/usr/mylib/libc.so", False))
+        self.assertTrue(copy._is_excluded("/var/core.1", False))
+        self.assertFalse(copy._is_excluded("/var/core.x", False))
+
+    def special_hardlinks_test(self):
+        """Test the copy of hardlinked special files."""
+        os.mkfifo(self._path("var/fifo"))
+        os.link(self._path("var/fifo"), self._path("var/fifo.hardlink"))
+        self._run_copy()
+
+        self.assertTrue(os.path.samefile(self._path("var/fifo", self._target),
+                                         self._path("var/fifo.hardlink", self._target)))
+
+    def overwrite_test(self):
+        """Test the copy over existing files."""
+        os.makedirs(self._path("usr/lib", self._target))
+        with open(self._path("usr/lib/big", self._target), "wb") as f:
+            f.write(b"old data")
+        os.symlink("nowhere", self._path("usr/lib/link", self._target))
+
+        self._run_copy()
+
+        self.assertEqual(len(self._read("usr/lib/big")), 1024 * 1024)
+        self.assertEqual(os.readlink(self._path("usr/lib/link", self._target)), "../bin/tool")
+
+    def work_units_test(self):
+        """Test the copy split into many small work units."""
+        for i in range(50):
+            self._make_file("usr/share/data/%d" % i, b"%d" % i, 0o644)
+
+        files = parallel_copy.WORK_UNIT_FILES
+        parallel_copy.WORK_UNIT_FILES = 3
+
+        try:
+            self._run_copy(workers=8)
+        finally:
+            parallel_copy.WORK_UNIT_FILES = files
+
+        for i in range(50):
+            self.assertEqual(self._read("usr/share/data/%d" % i), b"%d" % i)
+
+    def progress_test(self):
+        """Test the progress of the copy."""
+        class Progress(object):
+            def __init__(self):
+                self.total_size = None
+                self.sizes = []
+
+            def start(self, total_size):
+                self.total_size = total_size
+
+            def update(self, size):
+                self.sizes.append(size)
+
+        progress = Progress()
+        ParallelCopy(self._source, self._target, ["/proc/"], progress=progress).run()
+
+        # The hardlink is copied only once.
+        self.assertEqual(progress.total_size, 1024 * 1024 + 37)
+        self.assertEqual(sum(progress.sizes), progress.total_size)
@@ -25,9 +25,16 @@ import tempfile
 import os
 import hashlib
 import shutil
-
-from pyanaconda.payload.dnfpayload import RepoMDMetaHash
+import multiprocessing
+import threading
+import time
+import queue
+from mock import patch, PropertyMock, Mock, mock_open
+from timer import timer
+
+from pyanaconda.payload.dnfpayload import RepoMDMetaHash, RepoMetadataCache
 from pyanaconda.payload import PayloadRequirements, PayloadRequirementsMissingApply
+from pyanaconda.payload import PackagePayload, NoSuchGroup, PayloadError
 
 
 class PickLocation(unittest.TestCase):
@@ -84,6 +91,356 @@ class PickLocation(unittest.TestCase):
         self.assertEqual(mpoint, None)
 
 
+class SpacePackage(object):
+    def __init__(self, name, installsize, files):
+        self.name = name
+        self.reponame = "anaconda"
+        self.installsize = installsize
+        self._files = files
+        self.files_read = 0
+
+    @property
+    def files(self):
+        self.files_read += 1
+        return ["/usr/share/%s/%d" % (self.name, i) for i in range(self._files)]
+
+    def __str__(self):
+        return self.name
+
+
+class SpaceRequiredTests(unittest.TestCase):
+    def _get_payload(self, packages):
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload._base = Mock()
+        payload._base.transaction = [Mock(installed=pkg) for pkg in packages]
+        payload._space_estimate = None
+        payload._file_counts = {}
+        payload.txID = 1
+        return payload
+
+    def space_required_test(self):
+        """Estimate the space required by the transaction."""
+        packages = [SpacePackage("a", 1000000, 10), SpacePackage("b", 2000000, 5)]
+        payload = self._get_payload(packages)
+
+        expected = (Size(3000000) + 15 * dnfpayload.BONUS_SIZE_ON_FILE) * 1.1
+        self.assertEqual(payload._spaceRequired(), expected)
+
+        # The estimate of the same transaction is reused.
+        self.assertEqual(payload._spaceRequired(), expected)
+        self.assertEqual([pkg.files_read for pkg in packages], [1, 1])
+
+        # The file lists of known packages are not read again.
+        packages.append(SpacePackage("c", 0, 1))
+        payload._base.transaction = [Mock(installed=pkg) for pkg in packages]
+        payload.txID = 2
+
+        expected = (Size(3000000) + 16 * dnfpayload.BONUS_SIZE_ON_FILE) * 1.1
+        self.assertEqual(payload._spaceRequired(), expected)
+        self.assertEqual([pkg.files_read for pkg in packages], [1, 1, 1])
+
+    def no_transaction_test(self):
+        """Estimate the space required without a transaction."""
+        payload = self._get_payload([])
+        payload._base.transaction = None
+        self.assertEqual(payload._spaceRequired(), Size("3000 MB"))
+
+    @patch("pyanaconda.payload.dnfpayload.os.statvfs")
+    def df_map_test(self, statvfs):
+        """Read the free space of mount points."""
+        mounts = "proc /proc proc rw 0 0\n" \
+                 "/dev/sda1 / ext4 rw 0 0\n" \
+                 "/dev/sda2 /mnt/my\\040home xfs rw 0 0\n"
+
+        def _statvfs(path):
+            blocks = 0 if path == "/proc" else 100
+            return Mock(f_frsize=4096, f_bavail=10, f_bfree=20, f_blocks=blocks)
+
+        statvfs.side_effect = _statvfs
+
+        with patch("pyanaconda.payload.dnfpayload.open", mock_open(read_data=mounts), create=True):
+            df_map = dnfpayload._df_map()
+
+        self.assertEqual(df_map, {"/": Size(40960), "/mnt/my home": Size(40960)})
+
+
+class DummyCompsId(object):
+    def __init__(self, name, default=False):
+        self.name = name
+        self.default = default
+
+
+class DummyGroup(object):
+    def __init__(self, id_, name, visible=True, group_ids=(), option_ids=()):
+        self.id = id_
+        self.name = name
+        self.ui_name = name
+        self.ui_description = "Description of %s" % name
+        self.visible = visible
+        self.group_ids = group_ids
+        self.option_ids = option_ids
+
+
+class CompsIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.comps = Mock()
+        self.comps.groups_iter.return_value = iter([
+            DummyGroup("core", "Core"),
+            DummyGroup("gnome-desktop", "GNOME", visible=False),
+            DummyGroup("office", "Office Suite"),
+        ])
+        self.comps.environments = [
+            DummyGroup("workstation-environment", "Workstation",
+                       group_ids=[DummyCompsId("core"), DummyCompsId("gnome-desktop")],
+                       option_ids=[DummyCompsId("office", default=True)]),
+            DummyGroup("minimal-environment", "Minimal Install",
+                       group_ids=[DummyCompsId("core")]),
+        ]
+        self.comps.group_by_pattern.return_value = None
+        self.comps.environment_by_pattern.return_value = None
+
+        self.payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        self.payload._base = Mock(comps=self.comps)
+        self.payload._comps_index = None
+
+    def lookup_test(self):
+        """Look up groups and environments in the comps index."""
+        payload = self.payload
+
+        self.assertEqual(payload.groups, ["core", "gnome-desktop", "office"])
+        self.assertEqual(payload.environments, ["workstation-environment", "minimal-environment"])
+        self.assertEqual(payload.groupId("Office Suite"), "office")
+        self.assertEqual(payload.groupDescription("core"), ("Core", "Description of Core"))
+        self.assertFalse(payload._isGroupVisible("gnome-desktop"))
+        self.assertEqual(payload.environmentId("Workstation"), "workstation-environment")
+        self.assertEqual(payload.environmentGroups("workstation-environment"),
+                         ["core", "gnome-desktop", "office"])
+        self.assertEqual(payload.environmentGroups("workstation-environment", optional=False),
+                         ["core", "gnome-desktop"])
+        self.assertTrue(payload.environmentHasOption("workstation-environment", "office"))
+        self.assertFalse(payload.environmentHasOption("minimal-environment", "office"))
+        self.assertTrue(payload.environmentOptionIsDefault("workstation-environment", "office"))
+
+        # The comps are not searched for known ids and names.
+        self.comps.group_by_pattern.assert_not_called()
+        self.comps.environment_by_pattern.assert_not_called()
+        self.assertEqual(self.comps.groups_iter.call_count, 1)
+
+    def pattern_test(self):
+        """Look up unknown patterns in comps."""
+        payload = self.payload
+
+        self.assertRaises(NoSuchGroup, payload.groupId, "off*")
+        self.comps.group_by_pattern.assert_called_once_with("off*")
+
+        self.assertRaises(NoSuchGroup, payload.environmentDescription, "none")
+        self.comps.environment_by_pattern.assert_called_once_with("none")
+
+    def invalidation_test(self):
+        """Create the comps index again for new comps."""
+        payload = self.payload
+        self.assertEqual(len(payload.groups), 3)
+
+        comps = Mock(environments=[])
+        comps.groups_iter.return_value = iter([DummyGroup("core", "Core")])
+        payload._base.comps = comps
+
+        self.assertEqual(payload.groups, ["core"])
+        self.assertEqual(payload.environments, [])
+
+class SoftwareSelectionCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        self.payload._base = Mock(transaction=[])
+        self.payload._base.resolve.side_effect = self._resolve
+        self.payload._resolved_selections = dnfpayload.collections.OrderedDict()
+        self.payload.txID = None
+        self.payload.data = Mock()
+        self.payload.data.packages = Mock(nocore=False, default=False, environment="minimal",
+                                          excludedGroupList=[], groupList=[],
+                                          excludedList=[], packageList=["vim"])
+        self.payload.instclass = Mock(ignoredPackages=[])
+        self.payload.requirements = PayloadRequirements()
+        self.payload.requirements.set_apply_callback(Mock())
+        self.payload._apply_selections = Mock()
+
+        patcher = patch.object(dnfpayload.DNFPayload, "spaceRequired", new_callable=PropertyMock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _resolve(self):
+        # Every resolution creates a new transaction.
+        self.payload._base._goal = Mock()
+        self.payload._base._transaction = Mock()
+        self.payload._base._comps_trans = Mock()
+        return True
+
+    def cached_selection_test(self):
+        """Reuse the resolved transaction of the same selection."""
+        payload = self.payload
+        payload.checkSoftwareSelection()
+        transaction = payload._base._transaction
+
+        payload._base._transaction = None
+        payload.checkSoftwareSelection()
+
+        self.assertEqual(payload._base.resolve.call_count, 1)
+        self.assertEqual(payload._apply_selections.call_count, 1)
+        self.assertIs(payload._base._transaction, transaction)
+        self.assertTrue(payload.requirements.applied)
+        self.assertEqual(payload.txID, 2)
+
+        # A different selection is resolved again.
+        payload.data.packages.packageList = ["vim", "emacs"]
+        payload.checkSoftwareSelection()
+        self.assertEqual(payload._base.resolve.call_count, 2)
+        self.assertIsNot(payload._base._transaction, transaction)
+
+        # The previous selection is still known.
+        payload.data.packages.packageList = ["vim"]
+        payload.checkSoftwareSelection()
+        self.assertEqual(payload._base.resolve.call_count, 2)
+        self.assertIs(payload._base._transaction, transaction)
+
+    def cached_error_test(self):
+        """Reuse the dependency error of the same selection."""
+        payload = self.payload
+        payload._base.resolve.side_effect = dnfpayload.dnf.exceptions.DepsolveError("conflict")
+
+        for _i in range(2):
+            with self.assertRaises(dnfpayload.payload.DependencyError):
+                payload.checkSoftwareSelection()
+
+        self.assertEqual(payload._base.resolve.call_count, 1)
+
+    def limit_test(self):
+        """Keep only a limited number of resolved selections."""
+        payload = self.payload
+
+        for i in range(dnfpayload.RESOLVED_SELECTIONS_LIMIT + 1):
+            payload.data.packages.packageList = ["package-%d" % i]
+            payload.checkSoftwareSelection()
+
+        self.assertEqual(len(payload._resolved_selections), dnfpayload.RESOLVED_SELECTIONS_LIMIT)
+
+        # The oldest selection is resolved again.
+        payload.data.packages.packageList = ["package-0"]
+        payload.checkSoftwareSelection()
+        self.assertEqual(payload._base.resolve.call_count,
+                         dnfpayload.RESOLVED_SELECTIONS_LIMIT + 2)
+
+
+class PipelineBatches(unittest.TestCase):
+    def _check_batches(self, dependencies, batches):
+        """Check that no batch requires packages from the following batches."""
+        installed = set()
+        for batch in batches:
+            installed.update(batch)
+            for pkg in batch:
+                self.assertTrue(dependencies[pkg] <= installed)
+
+        self.assertEqual(installed, set(dependencies))
+
+    def ordered_batches_test(self):
+        """Split a dependency chain into ordered batches."""
+        dependencies = {"a": {"b"}, "b": {"c"}, "c": {"d"}, "d": set()}
+        batches = dnfpayload._pipeline_batches(dependencies, 2)
+
+        self.assertEqual(batches, [["d", "c"], ["b", "a"]])
+        self._check_batches(dependencies, batches)
+
+    def cyclic_batches_test(self):
+        """Keep packages that require each other in the same batch."""
+        dependencies = {"a": {"b"}, "b": {"c"}, "c": {"b", "d"}, "d": set(), "e": {"a"}}
+        batches = dnfpayload._pipeline_batches(dependencies, 1)
+
+        self.assertEqual(len(batches), 4)
+        self.assertEqual(sorted(batches[1]), ["b", "c"])
+        self._check_batches(dependencies, batches)
+
+    def long_chain_batches_test(self):
+        """Split a dependency chain longer than the recursion limit."""
+        dependencies = {i: {i + 1} for i in range(5000)}
+        dependencies[5000] = {"external"}
+        batches = dnfpayload._pipeline_batches(dependencies, 1000)
+
+        self.assertEqual(len(batches), 6)
+        self._check_batches({k: v - {"external"} for k, v in dependencies.items()}, batches)
+
+
+class PipelinedInstallTests(unittest.TestCase):
+    def _get_base(self, nevras):
+        base = Mock()
+        base._goal.group_members = {"a"}
+        # The reset drops the comps transaction.
+        base.reset.side_effect = lambda **kwargs: setattr(base, "_comps_trans", None)
+        base.sack.query.return_value.available.return_value.filter.side_effect = \
+            lambda nevra: [nevra]
+        base.transaction.install_set = [Mock(__str__=Mock(return_value=n)) for n in nevras]
+        return base
+
+    def prepare_batch_test(self):
+        """Prepare a transaction of a batch."""
+        base = self._get_base(["a-1.0-1.noarch"])
+        comps_trans = base._comps_trans
+
+        dnfpayload._prepare_batch_transaction(base, ["a-1.0-1.noarch"], {"a"})
+        self.assertFalse(base.conf.install_weak_deps)
+        self.assertEqual(base._goal.group_members, {"a"})
+        base.package_install.assert_called_once_with("a-1.0-1.noarch", strict=True)
+
+        # The comps transaction is replayed by the final batch.
+        self.assertIsNone(base._comps_trans)
+        dnfpayload._prepare_batch_transaction(base, ["a-1.0-1.noarch"], {"a"}, comps_trans)
+        self.assertIs(base._comps_trans, comps_trans)
+
+    def unexpected_packages_test(self):
+        """Refuse a batch that requires packages of other batches."""
+        base = self._get_base(["a-1.0-1.noarch", "b-1.0-1.noarch"])
+        self.assertRaises(PayloadError, dnfpayload._prepare_batch_transaction,
+                          base, ["a-1.0-1.noarch"])
+
+    def batch_transactions_test(self):
+        """Run transactions of batches in one process."""
+        base = self._get_base(["a-1.0-1.noarch"])
+        comps_trans = base._comps_trans
+        replayed = []
+
+        def do_transaction(display):
+            replayed.append(base._comps_trans is comps_trans)
+            display.done = True
+
+        base.do_transaction.side_effect = do_transaction
+
+        requests = queue.Queue()
+        requests.put((["a-1.0-1.noarch"], 0, 2, False))
+        requests.put((["a-1.0-1.noarch"], 1, 2, True))
+        requests.put(None)
+
+        messages = queue.Queue()
+        dnfpayload.do_batch_transactions(base, messages, requests)
+
+        self.assertEqual(replayed, [False, True])
+        base.close.assert_called_once_with()
+
+        events = []
+        while not messages.empty():
+            events.extend(dnfpayload.decode_progress_events(messages.get()))
+        self.assertEqual(events, [("quit", "DNF quit")])
+
+    def download_error_test(self):
+        """Report any error of the download thread."""
+        payload = dnfpayload.DNFPayload.__new__(dnfpayload.DNFPayload)
+        payload._download_packages = Mock(side_effect=[None, RuntimeError("Fatal error.")])
+
+        downloaded = queue.Queue()
+        payload._download_batches([["a"], ["b"], ["c"]], downloaded)
+
+        self.assertIsNone(downloaded.get_nowait())
+        self.assertIsInstance(downloaded.get_nowait(), RuntimeError)
+        self.assertTrue(downloaded.empty())
+
+
 class DummyRepo(object):
     def __init__(self):
         self.id = "anaconda"
@@ -150,6 +507,172 @@ or it should be. Nah it's just a test!
         os.remove(self._md_file)
         self.assertFalse(r.verify_repoMD())
 
+class RepoMetadataCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.mkdtemp(suffix="pyanaconda_tests")
+
+        # the remote repository
+        self._repo_dir = os.path.join(self._temp_dir, "repo")
+        os.makedirs(os.path.join(self._repo_dir, "repodata"))
+        self._write_repomd(self._repo_dir, "repomd content")
+
+        # the DNF cache
+        self._cache_dir = os.path.join(self._temp_dir, "cache", "anaconda-1234")
+        os.makedirs(os.path.join(self._cache_dir, "repodata"))
+        self._write_repomd(self._cache_dir, "repomd content")
+        with open(os.path.join(self._temp_dir, "cache", "anaconda.solv"), "w") as f:
+            f.write("solv content")
+
+        self._dummyRepo = DummyRepo()
+        self._dummyRepo.baseurl = ["file://" + self._repo_dir]
+        self._dummyRepo.metadata_expire = None
+        self._dummyRepo._cachedir = self._cache_dir
+
+        self._cache = RepoMetadataCache(os.path.join(self._temp_dir, "snapshots"))
+
+    def tearDown(self):
+        shutil.rmtree(self._temp_dir)
+
+    def _write_repomd(self, path, content):
+        with open(os.path.join(path, "repodata", "repomd.xml"), "w") as f:
+            f.write(content)
+
+    def _store_snapshot(self):
+        r = RepoMDMetaHash(DummyPayload(), self._dummyRepo)
+        r.store_repoMD_hash()
+        self._cache.store(self._dummyRepo, r.repoMD_hash)
+        shutil.rmtree(os.path.join(self._temp_dir, "cache"))
+
+    def restore_unchanged_repo_test(self):
+        """Test that metadata of an unchanged repo are restored."""
+        self._store_snapshot()
+        self.assertTrue(self._cache.restore(DummyPayload(), self._dummyRepo))
+        self.assertEqual(self._dummyRepo.metadata_expire, -1)
+
+        with open(os.path.join(self._cache_dir, "repodata", "repomd.xml")) as f:
+            self.assertEqual(f.read(), "repomd content")
+
+        with open(os.path.join(self._temp_dir, "cache", "anaconda.solv")) as f:
+            self.assertEqual(f.read(), "solv content")
+
+    def restore_changed_repo_test(self):
+        """Test that metadata of a changed repo are not restored."""
+        self._store_snapshot()
+        self._write_repomd(self._repo_dir, "new repomd content")
+        self.assertFalse(self._cache.restore(DummyPayload(), self._dummyRepo))
+        self.assertIsNone(self._dummyRepo.metadata_expire)
+
+    def restore_unavailable_repo_test(self):
+        """Test that metadata of an unavailable repo are not restored."""
+        self._store_snapshot()
+        shutil.rmtree(self._repo_dir)
+        self.assertFalse(self._cache.restore(DummyPayload(), self._dummyRepo))
+
+    @patch.object(RepoMDMetaHash, "store_repoMD_hash")
+    def restore_without_snapshot_test(self, store_repoMD_hash):
+        """Test that repomd.xml is not downloaded without a snapshot."""
+        self.assertFalse(self._cache.has_snapshot(self._dummyRepo))
+        self.assertFalse(self._cache.restore(DummyPayload(), self._dummyRepo))
+        store_repoMD_hash.assert_not_called()
+
+
+class DummyPackage(object):
+    def __init__(self, name, arch="x86_64"):
+        self.name = name
+        self.arch = arch
+        self.evr = "1.0-1.fc28"
+        self.buildtime = 1520000000
+
+    def returnIdSum(self):
+        return ("sha256", hashlib.sha256(self.name.encode()).hexdigest())
+
+
+class TransactionProgressTests(unittest.TestCase):
+
+    def _replay_transaction(self, display, packages):
+        """Replay a transaction of the given packages."""
+        total = len(packages)
+        for i, pkg in enumerate(packages, start=1):
+            display.progress(pkg, display.PKG_INSTALL, 0, 100, i, total)
+            display.progress(pkg, display.PKG_INSTALL, 100, 100, i, total)
+        display.progress(None, display.TRANS_POST, 0, 0, total, total)
+        for pkg in packages:
+            display.progress(pkg, display.PKG_SCRIPTLET, 0, 0, total, total)
+        for i, pkg in enumerate(packages, start=1):
+            display.progress(pkg, display.PKG_VERIFY, 0, 0, i, total)
+
+    def _receive_messages(self, queue_instance):
+        messages = []
+        for message in dnfpayload.DNFPayload._transaction_messages(queue_instance):
+            messages.append(message)
+            if message[0] == "quit":
+                return messages
+
+    def messages_test(self):
+        """Test the messages of the transaction progress protocol."""
+        queue_instance = multiprocessing.Queue()
+        batcher = dnfpayload.ProgressBatcher(queue_instance)
+        display = dnfpayload.PayloadRPMDisplay(batcher)
+        pkg = DummyPackage("bash")
+        checksum = pkg.returnIdSum()[1]
+
+        self._replay_transaction(display, [pkg])
+        display.error("Some error")
+        batcher.put(dnfpayload.encode_progress_event(dnfpayload.PROGRESS_QUIT, "DNF quit"))
+        batcher.stop()
+
+        details = "bash-1.0-1.fc28.x86_64 1520000000 %s" % checksum
+        self.assertEqual(self._receive_messages(queue_instance), [
+            ("install", "bash.x86_64 (1/1)"),
+            ("log", "Installed: %s" % details),
+            ("post", None),
+            ("log", "Post installation setup phase started."),
+            ("log", "Configuring (running scriptlet for): %s" % details),
+            ("configure", "bash.x86_64"),
+            ("verify", "bash.x86_64 (1/1)"),
+            ("log", "Verifying: %s" % details),
+            ("done", None),
+            ("error", "Some error"),
+            ("quit", "DNF quit"),
+        ])
+
+    def pipelined_messages_test(self):
+        """Test the progress of a batch of the pipelined installation."""
+        queue_instance = multiprocessing.Queue()
+        batcher = dnfpayload.ProgressBatcher(queue_instance)
+        display = dnfpayload.PayloadRPMDisplay(batcher, ts_offset=10, ts_total=20)
+
+        self._replay_transaction(display, [DummyPackage("bash")])
+        batcher.put(dnfpayload.encode_progress_event(dnfpayload.PROGRESS_QUIT, "DNF quit"))
+        batcher.stop()
+
+        messages = self._receive_messages(queue_instance)
+        self.assertIn(("install", "bash.x86_64 (11/20)"), messages)
+        self.assertIn(("verify", "bash.x86_64 (11/20)"), messages)
+
+    def batched_messages_test(self):
+        """Test the batched messages of a transaction of many packages."""
+        packages = [DummyPackage("package-%d" % i) for i in range(50)]
+        queue_instance = multiprocessing.Queue()
+        batcher = dnfpayload.ProgressBatcher(queue_instance)
+        display = dnfpayload.PayloadRPMDisplay(batcher)
+
+        with timer(10):
+            batcher.start()
+            self._replay_transaction(display, packages)
+            batcher.put(dnfpayload.encode_progress_event(dnfpayload.PROGRESS_QUIT, "DNF quit"))
+            batcher.stop()
+            messages = self._receive_messages(queue_instance)
+
+        # Every package is installed, configured and verified in order.
+        self.assertEqual(len(messages), 50 * 6 + 4)
+        self.assertEqual([message for (event, message) in messages if event == "install"],
+                         ["package-%d.x86_64 (%d/50)" % (i, i + 1) for i in range(50)])
+        self.assertEqual([message for (event, message) in messages if event == "verify"],
+                         ["package-%d.x86_64 (%d/50)" % (i, i + 1) for i in range(50)])
+        self.assertEqual(messages[-2:], [("done", None), ("quit", "DNF quit")])
+
+
 class  PayloadRequirementsTestCase(unittest.TestCase):
 
     def requirements_test(self):
@@ -246,3 +769,66 @@ class  PayloadRequirementsTestCase(unittest.TestCase):
         self.assertFalse(reqs.applied)
         self.assertTrue(reqs.apply())
         self.assertTrue(reqs.applied)
+
+
+class RecreateInitrdsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._lock = threading.Lock()
+        self._running = 0
+        self._max_running = 0
+        self._commands = []
+
+    def _exec_in_sysroot(self, command, argv, handle_line=None):
+        with self._lock:
+            self._commands.append((command, argv))
+            self._running += 1
+            self._max_running = max(self._max_running, self._running)
+
+        time.sleep(0.05)
+        if handle_line:
+            handle_line("%s output" % command)
+
+        with self._lock:
+            self._running -= 1
+
+        # The initrd of the broken kernel fails.
+        return 1 if command == "dracut" and "broken" in argv else 0
+
+    def _recreate_initrds(self, kernels, jobs):
+        with patch("pyanaconda.payload.util.execInSysroot", side_effect=self._exec_in_sysroot), \
+             patch("pyanaconda.payload.os.path.exists", return_value=True), \
+             patch("pyanaconda.payload.flags") as flags, \
+             patch.object(PackagePayload, "kernelVersionList", new_callable=PropertyMock) as kernels_mock:
+            flags.imageInstall = False
+            flags.initramfs_jobs = jobs
+            kernels_mock.return_value = kernels
+            PackagePayload.recreateInitrds(PackagePayload.__new__(PackagePayload))
+
+    def parallel_test(self):
+        """Test the parallel recreation of initrds."""
+        self._recreate_initrds(["4.16.1", "4.16.2", "broken", "4.16.3"], jobs=2)
+        self.assertEqual(self._max_running, 2)
+
+        # The boot loader entries of the created initrds are updated.
+        updates = [argv[1] for (command, argv) in self._commands if command == "new-kernel-pkg"]
+        self.assertEqual(updates, ["4.16.1", "4.16.2", "4.16.3"])
+
+    def negative_jobs_test(self):
+        """Test the recreation of initrds with a negative number of jobs."""
+        self._recreate_initrds(["4.16.1", "4.16.2"], jobs=-2)
+        self.assertEqual(self._max_running, 1)
+        self.assertEqual(len(self._commands), 6)
+
+    def serial_test(self):
+        """Test the recreation of initrds one by one."""
+        self._recreate_initrds(["4.16.1", "4.16.2"], jobs=1)
+        self.assertEqual(self._max_running, 1)
+        self.assertEqual(self._commands, [
+            ("depmod", ["-a", "4.16.1"]),
+            ("dracut", ["-f", "/boot/initramfs-4.16.1.img", "4.16.1"]),
+            ("depmod", ["-a", "4.16.2"]),
+            ("dracut", ["-f", "/boot/initramfs-4.16.2.img", "4.16.2"]),
+            ("new-kernel-pkg", ["--update", "4.16.1"]),
+            ("new-kernel-pkg", ["--update", "4.16.2"]),
+        ])
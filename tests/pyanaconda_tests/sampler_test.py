@@ -0,0 +1,150 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from pyanaconda.core.sampler import ResourceSampler, summarize_samples
+from pyanaconda.installation_tasks import Task, TaskQueue
+
+
+class ResourceSamplerTestCase(unittest.TestCase):
+
+    def _burn_cpu(self, seconds=0.2):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            pass
+
+    def sample_test(self):
+        """Test a sample of the system resources."""
+        sampler = ResourceSampler()
+        sampler.sample()
+        self._burn_cpu()
+        sample = sampler.sample()
+
+        self.assertEqual(len(sampler.samples), 2)
+        busy, iowait, total = sample.cpu
+        self.assertGreater(busy, 0)
+        self.assertGreaterEqual(total, busy + iowait)
+
+        # This process has been active.
+        processes = {process.pid: process for process in sample.processes}
+        self.assertIn(os.getpid(), processes)
+        self.assertGreater(processes[os.getpid()].cpu, 0)
+        self.assertGreater(processes[os.getpid()].rss, 0)
+        self.assertGreater(sum(thread.cpu for thread in sample.threads), 0)
+
+    def new_process_test(self):
+        """Test a sample of a process started since the previous sample."""
+        sampler = ResourceSampler()
+        first = sampler.sample()
+
+        # Nothing is counted before the first sample.
+        self.assertNotIn(os.getpid(), {process.pid for process in first.processes})
+
+        code = "import time\nend = time.monotonic() + 0.2\nwhile time.monotonic() < end: pass\n" \
+               "time.sleep(10)"
+        child = subprocess.Popen([sys.executable, "-c", code])
+
+        try:
+            time.sleep(0.5)
+            sample = sampler.sample()
+        finally:
+            child.kill()
+            child.wait()
+
+        # The child has appeared only in this sample, but its usage is counted.
+        processes = {process.pid: process for process in sample.processes}
+        self.assertIn(child.pid, processes)
+        self.assertGreater(processes[child.pid].cpu, 0)
+
+    def capacity_test(self):
+        """Test the ring buffer of samples."""
+        sampler = ResourceSampler(capacity=3)
+
+        for _i in range(5):
+            sampler.sample()
+
+        self.assertEqual(len(sampler.samples), 3)
+
+    def thread_test(self):
+        """Test the sampler thread."""
+        sampler = ResourceSampler()
+        sampler.start(0.01)
+        self.assertTrue(sampler.running)
+        time.sleep(0.1)
+        sampler.stop()
+
+        self.assertFalse(sampler.running)
+        self.assertGreater(len(sampler.samples), 2)
+
+        data = json.loads(sampler.to_json())
+        self.assertEqual(data["interval"], 0.01)
+        self.assertEqual(len(data["samples"]), len(sampler.samples))
+
+    def tasks_test(self):
+        """Test the tagging of samples with tasks."""
+        sampler = ResourceSampler()
+
+        queue = TaskQueue("Queue")
+        queue.append(Task("Task 1", sampler.sample))
+        queue.append(Task("Task 2", sampler.sample))
+        sampler.record_task_queue(queue)
+        queue.start()
+        sampler.sample()
+
+        self.assertEqual([sample.tasks for sample in sampler.samples],
+                         [("Task 1",), ("Task 2",), ()])
+
+    def summary_test(self):
+        """Test the summary of samples."""
+        def sample(timestamp, tasks, cpu, net=(0, 0), processes=()):
+            return {"time": timestamp, "tasks": tasks, "cpu": cpu, "net": net,
+                    "processes": processes, "threads": []}
+
+        data = {"cpus": 4, "samples": [
+            sample(0, [], [0, 0, 0]),
+            # one CPU of four is busy
+            sample(1, ["Compute"], [100, 0, 400], processes=[[1, "python3", 100, 1000, 0, 0]]),
+            sample(2, ["Compute"], [100, 0, 400], processes=[[1, "python3", 100, 1000, 0, 0]]),
+            # one CPU of four waits for I/O
+            sample(3, ["Copy"], [20, 100, 400], processes=[[2, "rsync", 20, 1000, 0, 4096]]),
+            # download
+            sample(4, ["Download"], [4, 0, 400], net=[10 * 1024 * 1024, 1024]),
+            sample(5, [], [0, 0, 400]),
+        ]}
+
+        summaries = {summary.name: summary for summary in summarize_samples(data)}
+        self.assertEqual(list(summaries), ["Compute", "Copy", "Download", "(no task)"])
+
+        self.assertEqual(summaries["Compute"].duration, 2)
+        self.assertEqual(summaries["Compute"].cpu, 1.0)
+        self.assertEqual(summaries["Compute"].processes, ["python3"])
+        self.assertEqual(summaries["Compute"].bound, "cpu")
+
+        self.assertEqual(summaries["Copy"].iowait, 1.0)
+        self.assertEqual(summaries["Copy"].write, 4096)
+        self.assertEqual(summaries["Copy"].bound, "disk")
+
+        self.assertEqual(summaries["Download"].received, 10 * 1024 * 1024)
+        self.assertEqual(summaries["Download"].bound, "network")
+
+        self.assertEqual(summaries["(no task)"].bound, "idle")
@@ -0,0 +1,125 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from requests.exceptions import RequestException
+
+from pyanaconda.payload.segmented_download import SegmentedDownload, RangeNotSupported
+
+DATA = os.urandom(1024 * 1024 + 123)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serve DATA with optional support for range requests."""
+
+    def do_GET(self):
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+
+        if self.path in ("/ranges", "/shifted") and match:
+            start, end = int(match.group(1)), min(int(match.group(2)), len(DATA) - 1)
+
+            # Serve other bytes than requested after the first segment.
+            if self.path == "/shifted" and start:
+                start += 1
+
+            body = DATA[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, len(DATA)))
+        else:
+            body = DATA
+            self.send_response(200)
+
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SegmentedDownloadTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp_dir = tempfile.mkdtemp()
+        self._server = HTTPServer(("127.0.0.1", 0), RangeHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+        self._url = "http://127.0.0.1:%d" % self._server.server_port
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        shutil.rmtree(self._tmp_dir)
+
+    def download_test(self):
+        """Test the download in parallel segments."""
+        path = os.path.join(self._tmp_dir, "image")
+        sizes = []
+
+        download = SegmentedDownload(self._url + "/ranges", path,
+                                     connections=4, segment_size=100 * 1024)
+        checksum = download.run(sizes.append, sizes.append)
+
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+        self.assertEqual(checksum, hashlib.sha256(DATA).hexdigest())
+        self.assertEqual(sizes[0], len(DATA))
+        self.assertEqual(sum(sizes[1:]), len(DATA))
+
+    def no_ranges_test(self):
+        """Test the download from a server without range support."""
+        path = os.path.join(self._tmp_dir, "image")
+        download = SegmentedDownload(self._url + "/plain", path)
+
+        with self.assertRaises(RangeNotSupported):
+            download.run()
+
+    def cancel_test(self):
+        """Test that a failed segment stops the rest of the download."""
+        path = os.path.join(self._tmp_dir, "image")
+        sizes = []
+
+        def update(size):
+            sizes.append(size)
+            raise OSError("No space left on device")
+
+        download = SegmentedDownload(self._url + "/ranges", path,
+                                     connections=2, segment_size=100 * 1024)
+
+        with self.assertRaises(OSError):
+            download.run(None, update)
+
+        self.assertLess(len(sizes), 4)
+
+    def wrong_range_test(self):
+        """Test the download from a server that returns wrong ranges."""
+        path = os.path.join(self._tmp_dir, "image")
+        download = SegmentedDownload(self._url + "/shifted", path,
+                                     connections=2, segment_size=100 * 1024)
+
+        with self.assertRaises(RequestException):
+            download.run()
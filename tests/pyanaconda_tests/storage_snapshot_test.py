@@ -0,0 +1,119 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import unittest
+from mock import Mock
+
+from pyanaconda.storage_utils import StorageSnapshot
+from pyanaconda.threading import threadMgr
+
+
+class StorageSnapshotTestCase(unittest.TestCase):
+
+    def _get_storage(self):
+        storage = Mock()
+        storage.copy.side_effect = self._get_storage
+        return storage
+
+    def _wait_for_copy(self, snapshot):
+        threadMgr.wait(snapshot._get_thread_name(snapshot._generation))
+
+    def reset_test(self):
+        """Test the reset to a snapshot."""
+        storage = self._get_storage()
+        snapshot = StorageSnapshot(storage)
+        self.assertTrue(snapshot.created)
+        self.assertEqual(storage.copy.call_count, 1)
+
+        # No spare copy is kept by default.
+        snap = snapshot.storage
+        self.assertIsNone(snapshot._spare_copy)
+        self.assertEqual(snap.copy.call_count, 0)
+
+        # The reset copies the snapshot.
+        snapshot.reset_to_snapshot(storage)
+        self.assertEqual(snap.copy.call_count, 1)
+        self.assertIsNone(snapshot._spare_copy)
+
+        # The reset uses the prepared spare copy only once.
+        snapshot.prepare_spare_copy()
+        self._wait_for_copy(snapshot)
+        spare_copy = snapshot._spare_copy
+        self.assertIsNotNone(spare_copy)
+        self.assertEqual(snap.copy.call_count, 2)
+
+        snapshot.reset_to_snapshot(storage)
+        self.assertIs(storage.devicetree, spare_copy.devicetree)
+        self.assertIs(storage.roots, spare_copy.roots)
+        self.assertIs(storage.fsset, spare_copy.fsset)
+        self.assertIsNone(snapshot._spare_copy)
+        self.assertEqual(snap.copy.call_count, 2)
+
+    def reset_and_dispose_test(self):
+        """Test the reset to a snapshot that is disposed."""
+        storage = self._get_storage()
+        snapshot = StorageSnapshot(storage)
+        snap = snapshot.storage
+
+        # The snapshot itself is used without a copy.
+        snapshot.reset_to_snapshot(storage, dispose=True)
+
+        self.assertFalse(snapshot.created)
+        self.assertIs(storage.devicetree, snap.devicetree)
+        self.assertEqual(snap.copy.call_count, 0)
+        self.assertRaises(ValueError, snapshot.reset_to_snapshot, storage)
+
+    def dispose_test(self):
+        """Test the disposal of a snapshot."""
+        storage = self._get_storage()
+        snapshot = StorageSnapshot(storage)
+        snapshot.prepare_spare_copy()
+        generation = snapshot._generation
+
+        # The copy in progress is abandoned and dropped once it is finished.
+        snapshot.dispose_snapshot()
+        threadMgr.wait(snapshot._get_thread_name(generation))
+
+        self.assertFalse(snapshot.created)
+        self.assertIsNone(snapshot._spare_copy)
+
+    def drop_test(self):
+        """Test the drop of a spare copy."""
+        storage = self._get_storage()
+        snapshot = StorageSnapshot(storage)
+        snapshot.prepare_spare_copy()
+        generation = snapshot._generation
+
+        # The copy in progress is abandoned too.
+        snapshot.drop_spare_copy()
+        threadMgr.wait(snapshot._get_thread_name(generation))
+
+        self.assertTrue(snapshot.created)
+        self.assertIsNone(snapshot._spare_copy)
+
+    def create_test(self):
+        """Test the creation of a new snapshot."""
+        storage = self._get_storage()
+        snapshot = StorageSnapshot(storage)
+        snapshot.prepare_spare_copy()
+        self._wait_for_copy(snapshot)
+        self.assertIsNotNone(snapshot._spare_copy)
+
+        # The spare copy of the previous snapshot is dropped.
+        snapshot.dispose_snapshot()
+        snapshot.create_snapshot(storage)
+        self.assertIsNone(snapshot._spare_copy)
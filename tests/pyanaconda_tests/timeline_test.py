@@ -0,0 +1,102 @@
+#
+# Copyright (C) 2018  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from pyanaconda.core.timeline import Timeline
+from pyanaconda.installation_tasks import Task, TaskQueue
+
+
+class TimelineTestCase(unittest.TestCase):
+
+    def _get_events(self, timeline, phase="X"):
+        data = json.loads(timeline.to_json())
+        return [event for event in data["traceEvents"] if event["ph"] == phase]
+
+    def phase_test(self):
+        """Test the recording of a phase."""
+        timeline = Timeline()
+
+        with timeline.phase("Write boot loader", "bootloader", {"device": "sda"}):
+            pass
+
+        events = self._get_events(timeline)
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["name"], "Write boot loader")
+        self.assertEqual(events[0]["cat"], "bootloader")
+        self.assertEqual(events[0]["args"], {"device": "sda"})
+        self.assertEqual(events[0]["tid"], threading.get_ident())
+        self.assertGreaterEqual(events[0]["dur"], 0)
+
+        metadata = self._get_events(timeline, "M")
+        self.assertEqual(metadata[0]["args"]["name"], threading.current_thread().name)
+
+    def failed_phase_test(self):
+        """Test the recording of a failed phase."""
+        timeline = Timeline()
+
+        with self.assertRaises(RuntimeError):
+            with timeline.phase("Fail", "test"):
+                raise RuntimeError()
+
+        self.assertEqual(len(self._get_events(timeline)), 1)
+
+    def task_queue_test(self):
+        """Test the recording of a task queue."""
+        timeline = Timeline()
+
+        queue = TaskQueue("Main queue")
+        nested = TaskQueue("Nested queue", max_workers=2)
+        nested.append(Task("Task 1", lambda: None))
+        nested.append(Task("Task 2", lambda: None))
+        queue.append(nested)
+
+        timeline.record_task_queue(queue)
+        queue.start()
+
+        events = {event["name"]: event for event in self._get_events(timeline)}
+        self.assertEqual(set(events), {"Main queue", "Nested queue", "Task 1", "Task 2"})
+        self.assertEqual(events["Nested queue"]["cat"], "queue")
+        self.assertEqual(events["Task 1"]["cat"], "task")
+
+        # The nested queue is inside of the main queue.
+        main, nested = events["Main queue"], events["Nested queue"]
+        self.assertLessEqual(main["ts"], nested["ts"])
+        self.assertGreaterEqual(main["ts"] + main["dur"], nested["ts"] + nested["dur"])
+
+    def write_test(self):
+        """Test the writing of a timeline."""
+        timeline = Timeline()
+
+        with timeline.phase("Phase", "test"):
+            pass
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "timeline.json")
+            timeline.write(path)
+
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+            with open(path) as f:
+                data = json.load(f)
+
+        self.assertEqual(data["displayTimeUnit"], "ms")
+        self.assertEqual(len(data["traceEvents"]), 2)
@@ -353,3 +353,39 @@ class UserCreateTest(unittest.TestCase):
         grp_fields = self._readFields("/etc/group", "test_group")
         self.assertIsNotNone(grp_fields)
         self.assertEqual(grp_fields[2], "1047")
+
+    def create_accounts_test(self):
+        """Create groups, users and SSH keys at once."""
+        errors = self.users.createAccounts(
+            groups=[("group1", {"gid": 5000}), ("group2", {})],
+            users=[("user1", {"groups": ["group1"], "password": "password"}),
+                   ("user2", {"uid": 1500, "password": "password", "lock": True}),
+                   ("user1", {})],
+            root=self.tmpdir)
+
+        # the second user1 is skipped
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(str(errors[0]), "User user1 already exists")
+
+        self.assertEqual(self._readFields("/etc/group", "group1")[2], "5000")
+        self.assertIsNotNone(self._readFields("/etc/group", "group2"))
+        self.assertIn("user1", self._readFields("/etc/group", "group1")[3])
+        self.assertEqual(self._readFields("/etc/passwd", "user2")[2], "1500")
+
+        # the passwords are set for both users
+        shadow_fields = self._readFields("/etc/shadow", "user1")
+        self.assertEqual(crypt.crypt("password", shadow_fields[1]), shadow_fields[1])
+        self.assertEqual(shadow_fields[2], "")
+        self.assertTrue(self._readFields("/etc/shadow", "user2")[1].startswith("!"))
+
+    def account_database_test(self):
+        """Test the index of an account database."""
+        database = users.AccountDatabase(self.tmpdir + "/etc/group")
+        self.assertIsNone(database.get_by_name("test_group"))
+
+        self.users.createGroup("test_group", gid=5000, root=self.tmpdir)
+
+        # the changed file is indexed again
+        self.assertEqual(database.get_by_name("test_group")[2], "5000")
+        self.assertEqual(database.get_by_id(5000)[0], "test_group")
+        self.assertIsNone(database.get_by_id(5001))